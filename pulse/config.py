@@ -25,3 +25,54 @@ PULSE_TEST_ALLOW_PROD_WRITES = os.getenv("PULSE_TEST_ALLOW_PROD_WRITES", "").low
 # Display timezone and format used for date/time text in notifications.
 NOTIFICATION_TIMEZONE = os.getenv("NOTIFICATION_TIMEZONE", "Asia/Calcutta")
 NOTIFICATION_DATETIME_FORMAT = os.getenv("NOTIFICATION_DATETIME_FORMAT", "%d-%m-%Y %H:%M:%S %Z")
+
+# Shared HTTP transport used by every GristClient.
+GRIST_HTTP_POOL_CONNECTIONS = int(os.getenv("GRIST_HTTP_POOL_CONNECTIONS", "4"))
+GRIST_HTTP_POOL_MAXSIZE = int(os.getenv("GRIST_HTTP_POOL_MAXSIZE", "16"))
+GRIST_HTTP_CONNECT_TIMEOUT = float(os.getenv("GRIST_HTTP_CONNECT_TIMEOUT", "5"))
+GRIST_HTTP_READ_TIMEOUT = float(os.getenv("GRIST_HTTP_READ_TIMEOUT", "30"))
+GRIST_HTTP_MAX_RETRIES = int(os.getenv("GRIST_HTTP_MAX_RETRIES", "3"))
+GRIST_HTTP_BACKOFF_FACTOR = float(os.getenv("GRIST_HTTP_BACKOFF_FACTOR", "0.5"))
+# Max records sent per bulk PATCH/PUT request.
+GRIST_WRITE_CHUNK_SIZE = int(os.getenv("GRIST_WRITE_CHUNK_SIZE", "100"))
+
+# Opt-in table snapshot cache for GristClient reads.
+GRIST_CACHE_DEFAULT_TTL_SECONDS = float(os.getenv("GRIST_CACHE_DEFAULT_TTL_SECONDS", "5"))
+GRIST_CACHE_TABLE_TTLS = os.getenv("GRIST_CACHE_TABLE_TTLS", "")
+GRIST_CACHE_MAX_TABLES = int(os.getenv("GRIST_CACHE_MAX_TABLES", "64"))
+# Share one in-flight GET between concurrent identical Grist reads.
+GRIST_COALESCE_READS = os.getenv("GRIST_COALESCE_READS", "true").lower() in ("1", "true", "yes")
+# Column metadata is reloaded after this long (or on explicit invalidation).
+GRIST_SCHEMA_TTL_SECONDS = float(os.getenv("GRIST_SCHEMA_TTL_SECONDS", "3600"))
+
+# Write-behind buffer for Activity_Log / BatchStatusHistory inserts.
+GRIST_WRITE_BEHIND_BATCH_SIZE = int(os.getenv("GRIST_WRITE_BEHIND_BATCH_SIZE", "50"))
+GRIST_WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv("GRIST_WRITE_BEHIND_FLUSH_SECONDS", "2"))
+# Rows still unsent at shutdown are spooled here and replayed on the next start.
+GRIST_WRITE_BEHIND_SPOOL_DIR = os.getenv("GRIST_WRITE_BEHIND_SPOOL_DIR", "artifacts/write_behind")
+
+# Local LRU copy of downloaded attachments (cut-list PDFs), bounded by total size.
+GRIST_ATTACHMENT_CACHE_DIR = os.getenv("GRIST_ATTACHMENT_CACHE_DIR", "artifacts/attachment_cache")
+GRIST_ATTACHMENT_CACHE_MAX_BYTES = int(os.getenv("GRIST_ATTACHMENT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Per-doc request limiter and circuit breaker in front of Grist.
+GRIST_RATE_LIMIT_PER_SECOND = float(os.getenv("GRIST_RATE_LIMIT_PER_SECOND", "10"))
+GRIST_RATE_LIMIT_BURST = int(os.getenv("GRIST_RATE_LIMIT_BURST", "20"))
+# Requests that would queue longer than this behind the limiter fail fast instead.
+GRIST_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("GRIST_RATE_LIMIT_MAX_WAIT_SECONDS", "10"))
+# Blocking calls made on the bot's event loop thread wait at most this long (about two request
+# slots at the default rate) before failing fast, so the limiter never freezes the bot.
+GRIST_RATE_LIMIT_LOOP_MAX_WAIT_SECONDS = float(os.getenv("GRIST_RATE_LIMIT_LOOP_MAX_WAIT_SECONDS", "0.25"))
+GRIST_BREAKER_FAILURE_THRESHOLD = int(os.getenv("GRIST_BREAKER_FAILURE_THRESHOLD", "5"))
+GRIST_BREAKER_RESET_SECONDS = float(os.getenv("GRIST_BREAKER_RESET_SECONDS", "30"))
+
+# Grist call metrics: a periodic stdout summary, plus Prometheus text on 127.0.0.1:<port>
+# only when GRIST_METRICS_PORT is set (opt-in; unset or 0 keeps the endpoint off).
+GRIST_METRICS_PORT = int(os.getenv("GRIST_METRICS_PORT") or 0)
+GRIST_METRICS_SUMMARY_SECONDS = float(os.getenv("GRIST_METRICS_SUMMARY_SECONDS", "600"))
+
+# Background job pipeline (post-approval cut lists, PDFs, notifications).
+# Unfinished jobs are journaled here and resumed on the next start.
+PULSE_JOB_JOURNAL_DIR = os.getenv("PULSE_JOB_JOURNAL_DIR", "artifacts/jobs")
+PULSE_JOB_MAX_ATTEMPTS = int(os.getenv("PULSE_JOB_MAX_ATTEMPTS", "3"))
+PULSE_JOB_RETRY_SECONDS = float(os.getenv("PULSE_JOB_RETRY_SECONDS", "2"))
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from pulse.config import GRIST_ATTACHMENT_CACHE_DIR, GRIST_ATTACHMENT_CACHE_MAX_BYTES
+
+_UNSAFE_NAME_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class AttachmentCache:
+    """On-disk copies of Grist attachments, keyed by (doc, attachment id).
+
+    Grist attachments are immutable, so a cached file never goes stale; the
+    directory is kept under ``max_bytes`` by evicting the least recently used
+    files. Downloads stream into a temp file that is renamed into place once
+    complete, so a reader never sees a partial PDF.
+    """
+
+    def __init__(self, directory: str | Path = GRIST_ATTACHMENT_CACHE_DIR, max_bytes: int = GRIST_ATTACHMENT_CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: OrderedDict[Path, int] | None = None
+        self._lock = threading.Lock()
+        self._key_locks: dict[Path, threading.Lock] = {}
+        self._async_key_locks: dict[Path, asyncio.Lock] = {}
+
+    def path_for(self, doc_id, attachment_id) -> Path:
+        doc = _UNSAFE_NAME_CHARS.sub("_", str(doc_id))
+        return self.directory / doc / f"{int(attachment_id)}.bin"
+
+    def get(self, doc_id, attachment_id) -> Path | None:
+        path = self.path_for(doc_id, attachment_id)
+        with self._lock:
+            entries = self._load_entries()
+            if path not in entries:
+                return None
+            if not path.exists():
+                del entries[path]
+                return None
+            entries.move_to_end(path)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def fetch(self, doc_id, attachment_id, download) -> Path:
+        """Return the cached file, calling ``download(handle)`` to fill it on a miss."""
+        cached = self.get(doc_id, attachment_id)
+        if cached is not None:
+            return cached
+        path = self.path_for(doc_id, attachment_id)
+        with self._key_lock(path):
+            cached = self.get(doc_id, attachment_id)
+            if cached is not None:
+                return cached
+            tmp = self._tmp_path(path)
+            try:
+                with tmp.open("wb") as handle:
+                    download(handle)
+                os.replace(tmp, path)
+            finally:
+                tmp.unlink(missing_ok=True)
+            self._add(path)
+        return path
+
+    async def fetch_async(self, doc_id, attachment_id, download) -> Path:
+        """Awaitable ``fetch``; ``download(handle)`` is a coroutine function."""
+        cached = self.get(doc_id, attachment_id)
+        if cached is not None:
+            return cached
+        path = self.path_for(doc_id, attachment_id)
+        async with self._async_key_lock(path):
+            cached = self.get(doc_id, attachment_id)
+            if cached is not None:
+                return cached
+            tmp = self._tmp_path(path)
+            try:
+                with tmp.open("wb") as handle:
+                    await download(handle)
+                os.replace(tmp, path)
+            finally:
+                tmp.unlink(missing_ok=True)
+            self._add(path)
+        return path
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(self._load_entries().values())
+
+    def clear(self) -> None:
+        with self._lock:
+            entries = self._load_entries()
+            for path in list(entries):
+                path.unlink(missing_ok=True)
+            entries.clear()
+
+    def _tmp_path(self, path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.part")
+
+    def _key_lock(self, path: Path) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(path, threading.Lock())
+
+    def _async_key_lock(self, path: Path) -> asyncio.Lock:
+        with self._lock:
+            return self._async_key_locks.setdefault(path, asyncio.Lock())
+
+    def _add(self, path: Path) -> None:
+        size = path.stat().st_size
+        with self._lock:
+            entries = self._load_entries()
+            entries[path] = size
+            entries.move_to_end(path)
+            self._evict(entries, keep=path)
+            self._key_locks.pop(path, None)
+            self._async_key_locks.pop(path, None)
+
+    def _evict(self, entries: OrderedDict[Path, int], keep: Path) -> None:
+        total = sum(entries.values())
+        for path in list(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            total -= entries.pop(path)
+            # Unlinking is safe even while a sender still has the file open.
+            path.unlink(missing_ok=True)
+
+    def _load_entries(self) -> OrderedDict[Path, int]:
+        # Files left by an earlier run seed the LRU order by their last access time.
+        if self._entries is None:
+            found = []
+            if self.directory.exists():
+                for path in self.directory.glob("*/*.bin"):
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    found.append((stat.st_mtime, path, stat.st_size))
+            found.sort(key=lambda item: item[0])
+            self._entries = OrderedDict((path, size) for _, path, size in found)
+        return self._entries
+
+
+_shared_cache: AttachmentCache | None = None
+_shared_lock = threading.Lock()
+
+
+def attachment_cache() -> AttachmentCache:
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = AttachmentCache()
+        return _shared_cache
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+
+
+class _FieldsView(Mapping):
+    __slots__ = ("_table", "_pos")
+
+    def __init__(self, table: "ColumnarTable", pos: int):
+        self._table = table
+        self._pos = pos
+
+    def __getitem__(self, column):
+        return self._table.columns[column][self._pos]
+
+    def __iter__(self):
+        return iter(self._table.columns)
+
+    def __len__(self):
+        return len(self._table.columns)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class RecordView(Mapping):
+    """Read-only ``{"id": ..., "fields": {...}}`` view over one row of a ColumnarTable."""
+
+    __slots__ = ("_table", "_pos")
+
+    def __init__(self, table: "ColumnarTable", pos: int):
+        self._table = table
+        self._pos = pos
+
+    def __getitem__(self, key):
+        if key == "id":
+            return self._table.ids[self._pos]
+        if key == "fields":
+            return _FieldsView(self._table, self._pos)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(("id", "fields"))
+
+    def __len__(self):
+        return 2
+
+    def __repr__(self):
+        return repr({"id": self["id"], "fields": dict(self["fields"])})
+
+
+def _compact(values: list) -> list:
+    # JSON decoding allocates a new str per cell; share repeated values such as statuses.
+    seen: dict = {}
+    for pos, value in enumerate(values):
+        if isinstance(value, str):
+            values[pos] = seen.setdefault(value, value)
+    return values
+
+
+class ColumnarTable:
+    """Grist table held as column arrays plus an id -> row position index."""
+
+    __slots__ = ("ids", "columns", "stale_age", "_index")
+
+    def __init__(self, ids: list, columns: dict[str, list], stale_age: float | None = None):
+        self.ids = ids
+        self.columns = columns
+        # Set when served from the last good snapshot while Grist was unavailable.
+        self.stale_age = stale_age
+        self._index = None
+
+    @property
+    def stale(self) -> bool:
+        return self.stale_age is not None
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "ColumnarTable":
+        """Build from Grist's column-oriented ``/tables/{table}/data`` response."""
+        columns = {str(name): _compact(list(values)) for name, values in payload.items() if name != "id"}
+        return cls(list(payload.get("id") or []), columns)
+
+    @classmethod
+    def from_records(cls, records: list[dict]) -> "ColumnarTable":
+        names: dict[str, None] = {}
+        for record in records:
+            names.update(dict.fromkeys(record.get("fields", {})))
+        columns = {name: _compact([record.get("fields", {}).get(name) for record in records]) for name in names}
+        return cls([record.get("id") for record in records], columns)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        for pos in range(len(self.ids)):
+            yield RecordView(self, pos)
+
+    @property
+    def index(self) -> dict:
+        if self._index is None:
+            self._index = {record_id: pos for pos, record_id in enumerate(self.ids)}
+        return self._index
+
+    def column(self, name: str) -> list:
+        values = self.columns.get(name)
+        return values if values is not None else [None] * len(self.ids)
+
+    def get(self, record_id) -> RecordView | None:
+        pos = self.index.get(record_id)
+        return RecordView(self, pos) if pos is not None else None
+
+    def value(self, record_id, column: str, default=None):
+        pos = self.index.get(record_id)
+        values = self.columns.get(column)
+        if pos is None or values is None:
+            return default
+        return values[pos]
+
+    def to_records(self) -> list[dict]:
+        names = list(self.columns)
+        return [
+            {"id": record_id, "fields": {name: self.columns[name][pos] for name in names}}
+            for pos, record_id in enumerate(self.ids)
+        ]
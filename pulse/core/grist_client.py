@@ -1,19 +1,200 @@
-import requests
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import weakref
 from pathlib import Path
 
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from pulse.config import (
+    GRIST_COALESCE_READS,
+    GRIST_HTTP_BACKOFF_FACTOR,
+    GRIST_HTTP_CONNECT_TIMEOUT,
+    GRIST_HTTP_MAX_RETRIES,
+    GRIST_HTTP_POOL_CONNECTIONS,
+    GRIST_HTTP_POOL_MAXSIZE,
+    GRIST_HTTP_READ_TIMEOUT,
+    GRIST_RATE_LIMIT_LOOP_MAX_WAIT_SECONDS,
+    GRIST_WRITE_CHUNK_SIZE,
+)
+from pulse.core.columnar import ColumnarTable
+from pulse.core.metrics import grist_metrics
+from pulse.core.resilience import _retry_after_seconds, guard_for, is_transient_error
+from pulse.core.single_flight import AsyncSingleFlight, SingleFlight
+from pulse.core.table_cache import snapshot_cache
+from pulse.core.unit_of_work import current_unit_of_work
 from pulse.runtime import allow_prod_writes_in_test, is_test_mode, test_doc_id
 
 
-class GristClient:
+_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+_session = None
+_session_lock = threading.Lock()
+
+
+class _GristRetry(Retry):
+    # POST/PATCH are not idempotent; only retry them when Grist rejected the
+    # call before applying it (rate limited).
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 429 and str(method or "").upper() in ("POST", "PATCH"):
+            return bool(self.total)
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def _build_session():
+    retry = _GristRetry(
+        total=GRIST_HTTP_MAX_RETRIES,
+        connect=GRIST_HTTP_MAX_RETRIES,
+        read=GRIST_HTTP_MAX_RETRIES,
+        status=GRIST_HTTP_MAX_RETRIES,
+        backoff_factor=GRIST_HTTP_BACKOFF_FACTOR,
+        status_forcelist=_RETRY_STATUS_CODES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=GRIST_HTTP_POOL_CONNECTIONS,
+        pool_maxsize=GRIST_HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_http_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def close_http_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
 
-    def __init__(self, server, doc_id, api_key):
+
+_IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+_ATTACHMENT_CHUNK_SIZE = 64 * 1024
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client():
+    # httpx pools are bound to the event loop that opened their connections.
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=GRIST_HTTP_POOL_CONNECTIONS * GRIST_HTTP_POOL_MAXSIZE,
+                max_keepalive_connections=GRIST_HTTP_POOL_MAXSIZE,
+            ),
+            timeout=httpx.Timeout(GRIST_HTTP_READ_TIMEOUT, connect=GRIST_HTTP_CONNECT_TIMEOUT),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def aclose_async_http_client():
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _is_retryable_status(method, status_code):
+    if status_code not in _RETRY_STATUS_CODES:
+        return False
+    return status_code == 429 or str(method or "").upper() in _IDEMPOTENT_METHODS
+
+
+def _is_retryable_transport_error(method, exc):
+    # A failed connect never reached Grist, so even writes are safe to resend.
+    if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout)):
+        return True
+    return str(method or "").upper() in _IDEMPOTENT_METHODS
+
+
+def _backoff_delay(attempt):
+    return GRIST_HTTP_BACKOFF_FACTOR * (2 ** attempt)
+
+
+def _record_value(record, column):
+    if column == "id":
+        return record.get("id")
+    return record.get("fields", {}).get(column)
+
+
+def _sort_value(value):
+    if value is None:
+        return (0, 0, "")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value, "")
+    return (2, 0, str(value))
+
+
+class StaleRecords(list):
+    """Records served from the last good snapshot while Grist is unavailable."""
+
+    stale = True
+
+    def __init__(self, records, stale_age):
+        super().__init__(records)
+        self.stale_age = stale_age
+
+
+def is_stale(result):
+    return bool(getattr(result, "stale", False))
+
+
+def _apply_query(records, filter=None, sort=None, limit=None):
+    """Apply Grist-style filter/sort/limit to an in-memory list of records."""
+    result = list(records)
+    if filter:
+        allowed = {column: list(values) for column, values in filter.items()}
+        result = [
+            record
+            for record in result
+            if all(_record_value(record, column) in values for column, values in allowed.items())
+        ]
+    if sort:
+        keys = sort.split(",") if isinstance(sort, str) else list(sort)
+        for key in reversed([item.strip() for item in keys if item.strip()]):
+            column = key.lstrip("-")
+            result.sort(key=lambda record: _sort_value(_record_value(record, column)), reverse=key.startswith("-"))
+    if limit:
+        result = result[: int(limit)]
+    return result
+
+
+# Concurrent identical reads share one in-flight GET (threads and event loops).
+_read_flight = SingleFlight()
+_async_read_flight = AsyncSingleFlight()
+
+
+class _GristClientBase:
+
+    def __init__(self, server, doc_id, api_key, use_cache=False):
         self.server = server
         self.doc_id = doc_id
         self.api_key = api_key
+        self.use_cache = use_cache
 
     def _headers(self):
         return {"Authorization": f"Bearer {self.api_key}"}
 
+    def _doc_url(self, path):
+        return f"{self.server}/api/docs/{self.doc_id}/{path}"
+
     def _assert_write_allowed(self):
         if not is_test_mode():
             return
@@ -27,88 +208,646 @@ class GristClient:
             "Use PULSE_TEST_DOC_ID or set PULSE_TEST_ALLOW_PROD_WRITES=true to override."
         )
 
-    def get_records(self, table):
-        url = f"{self.server}/api/docs/{self.doc_id}/tables/{table}/records"
-        r = requests.get(url, headers=self._headers())
-        r.raise_for_status()
-        return r.json()["records"]
+    def _cache_key(self, table, kind=None):
+        key = (self.server, self.doc_id, table)
+        return key + (kind,) if kind else key
+
+    def _read_key(self, table, params, kind="records"):
+        # The write generation keeps readers that arrive after a write off an older in-flight GET.
+        generation = snapshot_cache.generation(self._cache_key(table))
+        return (self.server, self.doc_id, self.api_key, table, kind, generation, tuple(sorted((params or {}).items())))
+
+    def invalidate_cache(self, table=None):
+        snapshot_cache.invalidate(self.server, self.doc_id, table)
+        unit = current_unit_of_work()
+        if unit is not None:
+            unit.forget(self.server, self.doc_id, table)
+
+    def _unit_for(self, table=None):
+        # Anything about to be read from Grist must first see this update's queued patches.
+        unit = current_unit_of_work()
+        if unit is not None and unit.has_pending(self.server, self.doc_id, table):
+            unit.flush(self.server, self.doc_id, table)
+        return unit
+
+    @property
+    def guard(self):
+        return guard_for(self.server, self.doc_id)
+
+    def _observe(self, method, url, started, response, payload, nbytes=None):
+        status = response.status_code if response is not None else "error"
+        if nbytes is None:
+            nbytes = len(response.content) if response is not None else 0
+        rows = len(payload.get("records") or []) if isinstance(payload, dict) else 0
+        grist_metrics.observe(self.doc_id, url, method, time.perf_counter() - started, status, nbytes, rows)
+
+    def _count_rows(self, method, url, rows):
+        grist_metrics.add_rows(self.doc_id, url, method, rows)
+
+    def _stale_records(self, table, filter=None, sort=None, limit=None):
+        entry = snapshot_cache.get_stale(self._cache_key(table))
+        if entry is None:
+            return None
+        age, records = entry
+        return StaleRecords(_apply_query(records, filter, sort, limit), age)
+
+    def _stale_table(self, table):
+        entry = snapshot_cache.get_stale(self._cache_key(table, "columns"))
+        if entry is None:
+            return None
+        age, cached = entry
+        return ColumnarTable(cached.ids, cached.columns, stale_age=age)
+
+    def _cached_records(self, table, filter=None, sort=None, limit=None):
+        cached = snapshot_cache.get(self._cache_key(table))
+        if cached is None:
+            return None
+        if filter is None and sort is None and limit is None:
+            return list(cached)
+        return _apply_query(cached, filter, sort, limit)
+
+    @staticmethod
+    def _records_params(filter=None, sort=None, limit=None):
+        params = {}
+        if filter is not None:
+            params["filter"] = json.dumps(filter)
+        if sort is not None:
+            params["sort"] = sort if isinstance(sort, str) else ",".join(sort)
+        if limit is not None:
+            params["limit"] = int(limit)
+        return params or None
+
+    @staticmethod
+    def _sql_payload(query, args=None):
+        payload = {"sql": query}
+        if args:
+            payload["args"] = list(args)
+        return payload
+
+    @staticmethod
+    def _patch_payloads(updates, chunk_size=None):
+        chunk_size = max(1, int(chunk_size or GRIST_WRITE_CHUNK_SIZE))
+        # Grist applies one bulk action per request, which needs a uniform column set.
+        groups = {}
+        for record_id, fields in updates:
+            groups.setdefault(tuple(sorted(fields)), []).append({"id": record_id, "fields": fields})
+        return [
+            {"records": records[start:start + chunk_size]}
+            for records in groups.values()
+            for start in range(0, len(records), chunk_size)
+        ]
+
+    @staticmethod
+    def _upsert_payloads(rows, key_cols, chunk_size=None):
+        chunk_size = max(1, int(chunk_size or GRIST_WRITE_CHUNK_SIZE))
+        records = []
+        for row in rows:
+            require = {column: row[column] for column in key_cols}
+            fields = {column: value for column, value in row.items() if column not in require}
+            records.append({"require": require, "fields": fields})
+        return [{"records": records[start:start + chunk_size]} for start in range(0, len(records), chunk_size)]
+
+    @staticmethod
+    def _table_payload(table_id, columns):
+        return {
+            "tables": [
+                {
+                    "id": table_id,
+                    "columns": columns,
+                }
+            ]
+        }
+
+    @staticmethod
+    def _column_payload(column_id, col_type):
+        return {
+            "columns": [
+                {
+                    "id": column_id,
+                    "fields": {
+                        "type": col_type,
+                    },
+                }
+            ]
+        }
+
+    @staticmethod
+    def _file_ident(path, content):
+        # Grist names stored files by the SHA1 of their bytes plus the original extension.
+        return hashlib.sha1(content).hexdigest() + Path(path).suffix
+
+    @staticmethod
+    def _attachment_id(payload):
+        if isinstance(payload, list) and payload:
+            return int(payload[0])
+        raise ValueError("Attachment upload failed: unexpected response payload.")
+
+
+def _blocking_request_delay(guard) -> float:
+    """Reserve a limiter slot for a blocking call.
+
+    Sleeping on the event loop thread would stall every other update, so there
+    a longer wait fails fast with GristUnavailableError instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return guard.before_request()
+    return guard.before_request(GRIST_RATE_LIMIT_LOOP_MAX_WAIT_SECONDS)
+
+
+class GristClient(_GristClientBase):
+
+    def _request(self, method, url, **kwargs):
+        guard = self.guard
+        delay = _blocking_request_delay(guard)
+        if delay:
+            time.sleep(delay)
+        kwargs.setdefault("timeout", (GRIST_HTTP_CONNECT_TIMEOUT, GRIST_HTTP_READ_TIMEOUT))
+        started = time.perf_counter()
+        response = None
+        try:
+            response = get_http_session().request(method, url, headers=self._headers(), **kwargs)
+        except requests.RequestException as exc:
+            guard.record_error(exc)
+            raise
+        finally:
+            self._observe(method, url, started, response, kwargs.get("json"))
+        guard.record_response(response.status_code, response.headers.get("Retry-After"))
+        response.raise_for_status()
+        return response
+
+    def get_records(self, table, filter=None, sort=None, limit=None):
+        unit = self._unit_for(table)
+        if unit is None or filter is not None or sort is not None or limit is not None:
+            return self._read_records(table, filter, sort, limit)
+        key = self._cache_key(table)
+        records = unit.lookup(key)
+        if records is None:
+            records = self._read_records(table)
+            if is_stale(records):
+                return records
+            unit.remember(key, records)
+        return list(records)
+
+    def _read_records(self, table, filter=None, sort=None, limit=None):
+        if not self.use_cache:
+            return self._fetch_records(table, filter, sort, limit)
+        try:
+            return self._get_cached_records(table, filter, sort, limit)
+        except Exception as exc:
+            stale = self._stale_records(table, filter, sort, limit) if is_transient_error(exc) else None
+            if stale is None:
+                raise
+            return stale
+
+    def _get_cached_records(self, table, filter=None, sort=None, limit=None):
+        cached = self._cached_records(table, filter, sort, limit)
+        if cached is not None:
+            return cached
+        if filter is not None or sort is not None or limit is not None:
+            # Narrow lookups go to the server; only whole-table reads populate the cache.
+            return self._fetch_records(table, filter, sort, limit)
+        key = self._cache_key(table)
+        generation = snapshot_cache.generation(key)
+        records = self._fetch_records(table)
+        snapshot_cache.put(key, records, generation=generation)
+        return list(records)
+
+    def _fetch_records(self, table, filter=None, sort=None, limit=None):
+        params = self._records_params(filter, sort, limit)
+        if not GRIST_COALESCE_READS:
+            return self._get_records(table, params)
+        return list(_read_flight.do(self._read_key(table, params), lambda: self._get_records(table, params)))
+
+    def _get_records(self, table, params):
+        url = self._doc_url(f"tables/{table}/records")
+        records = self._request("GET", url, params=params).json()["records"]
+        self._count_rows("GET", url, len(records))
+        return records
+
+    def get_table(self, table, filter=None, sort=None, limit=None):
+        """Fetch ``table`` column-oriented as a compact ColumnarTable."""
+        whole_table = filter is None and sort is None and limit is None
+        unit = self._unit_for(table)
+        if unit is not None and whole_table:
+            key = self._cache_key(table, "columns")
+            result = unit.lookup(key)
+            if result is None:
+                result = self._read_table(table)
+                if not is_stale(result):
+                    unit.remember(key, result)
+            return result
+        return self._read_table(table, filter, sort, limit)
+
+    def _read_table(self, table, filter=None, sort=None, limit=None):
+        whole_table = filter is None and sort is None and limit is None
+        try:
+            return self._get_cached_table(table, filter, sort, limit)
+        except Exception as exc:
+            stale = self._stale_table(table) if self.use_cache and whole_table and is_transient_error(exc) else None
+            if stale is None:
+                raise
+            return stale
+
+    def _get_cached_table(self, table, filter=None, sort=None, limit=None):
+        whole_table = filter is None and sort is None and limit is None
+        key = self._cache_key(table, "columns")
+        if self.use_cache and whole_table:
+            cached = snapshot_cache.get(key)
+            if cached is not None:
+                return cached
+        generation = snapshot_cache.generation(key)
+        params = self._records_params(filter, sort, limit)
+        if GRIST_COALESCE_READS:
+            result = _read_flight.do(self._read_key(table, params, "columns"), lambda: self._get_table(table, params))
+        else:
+            result = self._get_table(table, params)
+        if self.use_cache and whole_table:
+            snapshot_cache.put(key, result, generation=generation)
+        return result
+
+    def _get_table(self, table, params):
+        url = self._doc_url(f"tables/{table}/data")
+        result = ColumnarTable.from_payload(self._request("GET", url, params=params).json())
+        self._count_rows("GET", url, len(result))
+        return result
+
+    def sql(self, query, args=None):
+        self._unit_for()
+        url = self._doc_url("sql")
+        r = self._request("POST", url, json=self._sql_payload(query, args))
+        rows = [record.get("fields", {}) for record in r.json().get("records", [])]
+        self._count_rows("POST", url, len(rows))
+        return rows
 
     def get_columns(self, table):
-        url = f"{self.server}/api/docs/{self.doc_id}/tables/{table}/columns"
-        r = requests.get(url, headers=self._headers())
-        r.raise_for_status()
+        r = self._request("GET", self._doc_url(f"tables/{table}/columns"))
         payload = r.json()
         return payload.get("columns", [])
 
     def list_tables(self):
-        url = f"{self.server}/api/docs/{self.doc_id}/tables"
-        r = requests.get(url, headers=self._headers())
-        r.raise_for_status()
+        r = self._request("GET", self._doc_url("tables"))
         payload = r.json()
         return payload.get("tables", [])
 
     def patch_record(self, table, record_id, fields):
         self._assert_write_allowed()
-        url = f"{self.server}/api/docs/{self.doc_id}/tables/{table}/records"
         payload = {
             "records": [{"id": record_id, "fields": fields}]
         }
-        r = requests.patch(url, json=payload, headers=self._headers())
-        r.raise_for_status()
+        try:
+            self._request("PATCH", self._doc_url(f"tables/{table}/records"), json=payload)
+        finally:
+            self.invalidate_cache(table)
+        return True
+
+    def patch_records(self, table, updates, chunk_size=None):
+        """Patch many rows; ``updates`` is an iterable of ``(record_id, fields)`` pairs."""
+        self._assert_write_allowed()
+        payloads = self._patch_payloads(updates, chunk_size)
+        try:
+            for payload in payloads:
+                self._request("PATCH", self._doc_url(f"tables/{table}/records"), json=payload)
+        finally:
+            if payloads:
+                self.invalidate_cache(table)
+        return True
+
+    def upsert_records(self, table, rows, key_cols, chunk_size=None):
+        self._assert_write_allowed()
+        payloads = self._upsert_payloads(rows, key_cols, chunk_size)
+        try:
+            for payload in payloads:
+                self._request("PUT", self._doc_url(f"tables/{table}/records"), json=payload)
+        finally:
+            if payloads:
+                self.invalidate_cache(table)
         return True
 
     def add_records(self, table, records):
         self._assert_write_allowed()
-        url = f"{self.server}/api/docs/{self.doc_id}/tables/{table}/records"
         payload = {"records": [{"fields": record} for record in records]}
-        r = requests.post(url, json=payload, headers=self._headers())
-        r.raise_for_status()
+        try:
+            r = self._request("POST", self._doc_url(f"tables/{table}/records"), json=payload)
+        finally:
+            self.invalidate_cache(table)
         return r.json()
 
     def create_table(self, table_id, columns):
         self._assert_write_allowed()
-        url = f"{self.server}/api/docs/{self.doc_id}/tables"
-        payload = {
-            "tables": [
-                {
-                    "id": table_id,
-                    "columns": columns,
-                }
-            ]
-        }
-        r = requests.post(url, json=payload, headers=self._headers())
-        r.raise_for_status()
+        r = self._request("POST", self._doc_url("tables"), json=self._table_payload(table_id, columns))
         return r.json()
 
     def add_column(self, table, column_id, col_type):
         self._assert_write_allowed()
-        url = f"{self.server}/api/docs/{self.doc_id}/tables/{table}/columns"
-        payload = {
-            "columns": [
-                {
-                    "id": column_id,
-                    "fields": {
-                        "type": col_type,
-                    },
-                }
-            ]
-        }
-        r = requests.post(url, json=payload, headers=self._headers())
-        r.raise_for_status()
+        r = self._request("POST", self._doc_url(f"tables/{table}/columns"), json=self._column_payload(column_id, col_type))
+        self.invalidate_cache(table)
         return r.json()
 
     def upload_attachment(self, file_path):
         self._assert_write_allowed()
         path = Path(file_path)
-        url = f"{self.server}/api/docs/{self.doc_id}/attachments"
         with path.open("rb") as file_handle:
-            response = requests.post(
+            response = self._request(
+                "POST",
+                self._doc_url("attachments"),
+                files={"upload": (path.name, file_handle)},
+            )
+        return self._attachment_id(response.json())
+
+    def upload_attachment_once(self, file_path):
+        """Upload unless the doc already stores identical bytes; returns the attachment id."""
+        path = Path(file_path)
+        existing = self._find_attachment(self._file_ident(path, path.read_bytes()))
+        if existing is not None:
+            return existing
+        return self.upload_attachment(path)
+
+    def _find_attachment(self, file_ident):
+        try:
+            records = self._fetch_records("_grist_Attachments", {"fileIdent": [file_ident]}, None, 1)
+        except requests.HTTPError:
+            # No read access to the metadata table: fall back to a plain upload.
+            return None
+        return records[0]["id"] if records else None
+
+    def download_attachment(self, attachment_id):
+        response = self._request("GET", self._doc_url(f"attachments/{attachment_id}/download"))
+        return response.content
+
+    def stream_attachment(self, attachment_id, handle, chunk_size=_ATTACHMENT_CHUNK_SIZE):
+        """Write an attachment into a binary file object chunk by chunk; returns bytes written."""
+        url = self._doc_url(f"attachments/{attachment_id}/download")
+        guard = self.guard
+        delay = _blocking_request_delay(guard)
+        if delay:
+            time.sleep(delay)
+        started = time.perf_counter()
+        response = None
+        written = 0
+        try:
+            response = get_http_session().request(
+                "GET",
                 url,
                 headers=self._headers(),
-                files={"upload": (path.name, file_handle)},
+                stream=True,
+                timeout=(GRIST_HTTP_CONNECT_TIMEOUT, GRIST_HTTP_READ_TIMEOUT),
             )
-        response.raise_for_status()
-        payload = response.json()
-        if isinstance(payload, list) and payload:
-            return int(payload[0])
-        raise ValueError("Attachment upload failed: unexpected response payload.")
+            guard.record_response(response.status_code, response.headers.get("Retry-After"))
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size):
+                handle.write(chunk)
+                written += len(chunk)
+        except requests.RequestException as exc:
+            if response is None:
+                guard.record_error(exc)
+            raise
+        finally:
+            self._observe("GET", url, started, response, None, nbytes=written)
+            if response is not None:
+                response.close()
+        return written
+
+
+class AsyncGristClient(_GristClientBase):
+    """Awaitable counterpart of GristClient for use inside Telegram handlers."""
+
+    async def _request(self, method, url, **kwargs):
+        client = get_async_http_client()
+        guard = self.guard
+        attempt = 0
+        while True:
+            wait = guard.before_request()
+            if wait:
+                await asyncio.sleep(wait)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, headers=self._headers(), **kwargs)
+            except httpx.TransportError as exc:
+                self._observe(method, url, started, None, kwargs.get("json"))
+                guard.record_error(exc)
+                if attempt >= GRIST_HTTP_MAX_RETRIES or not _is_retryable_transport_error(method, exc):
+                    raise
+                delay = _backoff_delay(attempt)
+            else:
+                self._observe(method, url, started, response, kwargs.get("json"))
+                guard.record_response(response.status_code, response.headers.get("Retry-After"))
+                if attempt >= GRIST_HTTP_MAX_RETRIES or not _is_retryable_status(method, response.status_code):
+                    response.raise_for_status()
+                    return response
+                delay = _retry_after_seconds(response.headers.get("Retry-After"))
+                if delay is None:
+                    delay = _backoff_delay(attempt)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def get_records(self, table, filter=None, sort=None, limit=None):
+        unit = self._unit_for(table)
+        if unit is None or filter is not None or sort is not None or limit is not None:
+            return await self._read_records(table, filter, sort, limit)
+        key = self._cache_key(table)
+        records = unit.lookup(key)
+        if records is None:
+            records = await self._read_records(table)
+            if is_stale(records):
+                return records
+            unit.remember(key, records)
+        return list(records)
+
+    async def _read_records(self, table, filter=None, sort=None, limit=None):
+        if not self.use_cache:
+            return await self._fetch_records(table, filter, sort, limit)
+        try:
+            return await self._get_cached_records(table, filter, sort, limit)
+        except Exception as exc:
+            stale = self._stale_records(table, filter, sort, limit) if is_transient_error(exc) else None
+            if stale is None:
+                raise
+            return stale
+
+    async def _get_cached_records(self, table, filter=None, sort=None, limit=None):
+        cached = self._cached_records(table, filter, sort, limit)
+        if cached is not None:
+            return cached
+        if filter is not None or sort is not None or limit is not None:
+            return await self._fetch_records(table, filter, sort, limit)
+        key = self._cache_key(table)
+        generation = snapshot_cache.generation(key)
+        records = await self._fetch_records(table)
+        snapshot_cache.put(key, records, generation=generation)
+        return list(records)
+
+    async def _fetch_records(self, table, filter=None, sort=None, limit=None):
+        params = self._records_params(filter, sort, limit)
+        if not GRIST_COALESCE_READS:
+            return await self._get_records(table, params)
+        records = await _async_read_flight.do(self._read_key(table, params), lambda: self._get_records(table, params))
+        return list(records)
+
+    async def _get_records(self, table, params):
+        url = self._doc_url(f"tables/{table}/records")
+        records = (await self._request("GET", url, params=params)).json()["records"]
+        self._count_rows("GET", url, len(records))
+        return records
+
+    async def get_table(self, table, filter=None, sort=None, limit=None):
+        whole_table = filter is None and sort is None and limit is None
+        unit = self._unit_for(table)
+        if unit is not None and whole_table:
+            key = self._cache_key(table, "columns")
+            result = unit.lookup(key)
+            if result is None:
+                result = await self._read_table(table)
+                if not is_stale(result):
+                    unit.remember(key, result)
+            return result
+        return await self._read_table(table, filter, sort, limit)
+
+    async def _read_table(self, table, filter=None, sort=None, limit=None):
+        whole_table = filter is None and sort is None and limit is None
+        try:
+            return await self._get_cached_table(table, filter, sort, limit)
+        except Exception as exc:
+            stale = self._stale_table(table) if self.use_cache and whole_table and is_transient_error(exc) else None
+            if stale is None:
+                raise
+            return stale
+
+    async def _get_cached_table(self, table, filter=None, sort=None, limit=None):
+        whole_table = filter is None and sort is None and limit is None
+        key = self._cache_key(table, "columns")
+        if self.use_cache and whole_table:
+            cached = snapshot_cache.get(key)
+            if cached is not None:
+                return cached
+        generation = snapshot_cache.generation(key)
+        params = self._records_params(filter, sort, limit)
+        if GRIST_COALESCE_READS:
+            result = await _async_read_flight.do(
+                self._read_key(table, params, "columns"), lambda: self._get_table(table, params)
+            )
+        else:
+            result = await self._get_table(table, params)
+        if self.use_cache and whole_table:
+            snapshot_cache.put(key, result, generation=generation)
+        return result
+
+    async def _get_table(self, table, params):
+        url = self._doc_url(f"tables/{table}/data")
+        result = ColumnarTable.from_payload((await self._request("GET", url, params=params)).json())
+        self._count_rows("GET", url, len(result))
+        return result
+
+    async def sql(self, query, args=None):
+        self._unit_for()
+        url = self._doc_url("sql")
+        r = await self._request("POST", url, json=self._sql_payload(query, args))
+        rows = [record.get("fields", {}) for record in r.json().get("records", [])]
+        self._count_rows("POST", url, len(rows))
+        return rows
+
+    async def get_columns(self, table):
+        r = await self._request("GET", self._doc_url(f"tables/{table}/columns"))
+        return r.json().get("columns", [])
+
+    async def list_tables(self):
+        r = await self._request("GET", self._doc_url("tables"))
+        return r.json().get("tables", [])
+
+    async def patch_record(self, table, record_id, fields):
+        return await self.patch_records(table, [(record_id, fields)])
+
+    async def patch_records(self, table, updates, chunk_size=None):
+        self._assert_write_allowed()
+        payloads = self._patch_payloads(updates, chunk_size)
+        try:
+            for payload in payloads:
+                await self._request("PATCH", self._doc_url(f"tables/{table}/records"), json=payload)
+        finally:
+            if payloads:
+                self.invalidate_cache(table)
+        return True
+
+    async def upsert_records(self, table, rows, key_cols, chunk_size=None):
+        self._assert_write_allowed()
+        payloads = self._upsert_payloads(rows, key_cols, chunk_size)
+        try:
+            for payload in payloads:
+                await self._request("PUT", self._doc_url(f"tables/{table}/records"), json=payload)
+        finally:
+            if payloads:
+                self.invalidate_cache(table)
+        return True
+
+    async def add_records(self, table, records):
+        self._assert_write_allowed()
+        payload = {"records": [{"fields": record} for record in records]}
+        try:
+            r = await self._request("POST", self._doc_url(f"tables/{table}/records"), json=payload)
+        finally:
+            self.invalidate_cache(table)
+        return r.json()
+
+    async def create_table(self, table_id, columns):
+        self._assert_write_allowed()
+        r = await self._request("POST", self._doc_url("tables"), json=self._table_payload(table_id, columns))
+        return r.json()
+
+    async def add_column(self, table, column_id, col_type):
+        self._assert_write_allowed()
+        r = await self._request("POST", self._doc_url(f"tables/{table}/columns"), json=self._column_payload(column_id, col_type))
+        self.invalidate_cache(table)
+        return r.json()
+
+    async def upload_attachment(self, file_path):
+        self._assert_write_allowed()
+        path = Path(file_path)
+        content = await asyncio.to_thread(path.read_bytes)
+        response = await self._request("POST", self._doc_url("attachments"), files={"upload": (path.name, content)})
+        return self._attachment_id(response.json())
+
+    async def upload_attachment_once(self, file_path):
+        """Upload unless the doc already stores identical bytes; returns the attachment id."""
+        path = Path(file_path)
+        content = await asyncio.to_thread(path.read_bytes)
+        existing = await self._find_attachment(self._file_ident(path, content))
+        if existing is not None:
+            return existing
+        return await self.upload_attachment(path)
+
+    async def _find_attachment(self, file_ident):
+        try:
+            records = await self._fetch_records("_grist_Attachments", {"fileIdent": [file_ident]}, None, 1)
+        except httpx.HTTPStatusError:
+            return None
+        return records[0]["id"] if records else None
+
+    async def download_attachment(self, attachment_id):
+        response = await self._request("GET", self._doc_url(f"attachments/{attachment_id}/download"))
+        return response.content
+
+    async def stream_attachment(self, attachment_id, handle, chunk_size=_ATTACHMENT_CHUNK_SIZE):
+        """Write an attachment into a binary file object chunk by chunk; returns bytes written."""
+        url = self._doc_url(f"attachments/{attachment_id}/download")
+        guard = self.guard
+        wait = guard.before_request()
+        if wait:
+            await asyncio.sleep(wait)
+        started = time.perf_counter()
+        response = None
+        written = 0
+        try:
+            async with get_async_http_client().stream("GET", url, headers=self._headers()) as response:
+                guard.record_response(response.status_code, response.headers.get("Retry-After"))
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(chunk_size):
+                    handle.write(chunk)
+                    written += len(chunk)
+        except httpx.TransportError as exc:
+            if response is None:
+                guard.record_error(exc)
+            raise
+        finally:
+            self._observe("GET", url, started, response, None, nbytes=written)
+        return written
@@ -1,42 +1,63 @@
 from pulse.core.grist_client import GristClient
+from pulse.core.resilience import is_transient_error
+from pulse.core.write_behind import write_behind_for
 from pulse.config import PULSE_GRIST_SERVER, PULSE_DOC_ID, PULSE_API_KEY
 from datetime import datetime
 
 
-client = GristClient(PULSE_GRIST_SERVER, PULSE_DOC_ID, PULSE_API_KEY)
+client = GristClient(PULSE_GRIST_SERVER, PULSE_DOC_ID, PULSE_API_KEY, use_cache=True)
 
 
-def _resolve_user_ref(user_value):
-    if user_value is None:
-        return None
-    if isinstance(user_value, int):
-        return user_value
-
-    user_id = str(user_value).strip()
-    if not user_id:
-        return None
-
+def _user_ref_index():
     try:
         users = client.get_records("Users")
-    except Exception:
-        return None
-
+    except Exception as exc:
+        if is_transient_error(exc):
+            raise
+        return {}
+    index = {}
     for user in users:
-        if str(user.get("fields", {}).get("User_ID") or "") == user_id:
-            return user.get("id")
-    return None
+        user_id = str(user.get("fields", {}).get("User_ID") or "").strip()
+        if user_id and isinstance(user.get("id"), int):
+            index.setdefault(user_id, user.get("id"))
+    return index
 
 
-def log_event(user_id, action, result):
-    user_ref = _resolve_user_ref(user_id)
-    payload = {
+def _resolve_user_refs(rows):
+    # One Users lookup per flushed batch instead of one per logged event.
+    pending = [row for row in rows if row.get("User") is not None and not isinstance(row.get("User"), int)]
+    if not pending:
+        return rows
+    index = _user_ref_index()
+    resolved = []
+    for row in rows:
+        user_value = row.get("User")
+        if user_value is not None and not isinstance(user_value, int):
+            row = {**row, "User": index.get(str(user_value).strip())}
+        resolved.append(row)
+    return resolved
+
+
+activity_queue = write_behind_for(client, "Activity_Log", prepare=_resolve_user_refs)
+
+
+def _activity_payload(user_value, action, result):
+    return {
         "Timestamp": datetime.utcnow().isoformat(),
-        "User": user_ref,
+        "User": user_value,
         "Action": action,
         "Result": result,
     }
+
+
+def log_event(user_id, action, result):
     try:
-        client.add_records("Activity_Log", [payload])
+        activity_queue.enqueue(_activity_payload(user_id, action, result))
     except Exception:
         # Activity logging must never break workflow execution.
         pass
+
+
+async def log_event_async(user_id, action, result):
+    # Enqueueing never touches the network, so this is safe on the event loop.
+    log_event(user_id, action, result)
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the Grist latency histogram buckets.
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_call_site: contextvars.ContextVar[str] = contextvars.ContextVar("grist_call_site", default="unattributed")
+
+
+def current_call_site() -> str:
+    return _call_site.get()
+
+
+@contextmanager
+def call_site(label: str):
+    """Attribute Grist calls made inside the block (including awaited ones) to ``label``."""
+    token = _call_site.set(str(label or "unattributed"))
+    try:
+        yield
+    finally:
+        _call_site.reset(token)
+
+
+def instrument_handler(label_for):
+    """Decorate an async handler so its Grist calls are attributed to ``label_for(update, context)``."""
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(update, context, *args, **kwargs):
+            try:
+                label = label_for(update, context)
+            except Exception:
+                label = handler.__name__
+            with call_site(label):
+                return await handler(update, context, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def endpoint_labels(url: str, doc_id) -> tuple[str, str]:
+    """Split a Grist doc URL into ``(table, endpoint)`` labels."""
+    path = str(url).split(f"/api/docs/{doc_id}/", 1)[-1].split("?", 1)[0]
+    parts = [part for part in path.split("/") if part]
+    if len(parts) >= 2 and parts[0] == "tables":
+        return parts[1], parts[2] if len(parts) > 2 else "table"
+    return "", parts[0] if parts else ""
+
+
+class _Series:
+    __slots__ = ("count", "errors", "seconds", "bytes", "rows", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.rows = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+
+class GristMetrics:
+    """Counters and latency histograms for Grist calls, keyed by doc/table/endpoint/method/call site."""
+
+    def __init__(self):
+        self._series: dict[tuple, _Series] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: tuple) -> _Series:
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series()
+        return series
+
+    def observe(self, doc, url, method, seconds, status, nbytes=0, rows=0) -> None:
+        table, endpoint = endpoint_labels(url, doc)
+        key = (str(doc), table, endpoint, str(method).upper(), current_call_site())
+        with self._lock:
+            series = self._get(key)
+            series.count += 1
+            if not isinstance(status, int) or status >= 400:
+                series.errors += 1
+            series.seconds += seconds
+            series.bytes += int(nbytes or 0)
+            series.rows += int(rows or 0)
+            for pos, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    series.buckets[pos] += 1
+                    break
+
+    def add_rows(self, doc, url, method, rows) -> None:
+        table, endpoint = endpoint_labels(url, doc)
+        key = (str(doc), table, endpoint, str(method).upper(), current_call_site())
+        with self._lock:
+            self._get(key).rows += int(rows or 0)
+
+    def snapshot(self) -> dict[tuple, dict]:
+        with self._lock:
+            return {
+                key: {
+                    "count": series.count,
+                    "errors": series.errors,
+                    "seconds": series.seconds,
+                    "bytes": series.bytes,
+                    "rows": series.rows,
+                    "buckets": list(series.buckets),
+                }
+                for key, series in self._series.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP pulse_grist_requests_total Grist API calls.",
+            "# TYPE pulse_grist_requests_total counter",
+        ]
+        data = sorted(self.snapshot().items())
+        for key, values in data:
+            lines.append(f"pulse_grist_requests_total{{{_labels(key)}}} {values['count']}")
+        lines += ["# HELP pulse_grist_request_errors_total Grist API calls that failed.", "# TYPE pulse_grist_request_errors_total counter"]
+        for key, values in data:
+            lines.append(f"pulse_grist_request_errors_total{{{_labels(key)}}} {values['errors']}")
+        lines += ["# HELP pulse_grist_response_bytes_total Bytes received from Grist.", "# TYPE pulse_grist_response_bytes_total counter"]
+        for key, values in data:
+            lines.append(f"pulse_grist_response_bytes_total{{{_labels(key)}}} {values['bytes']}")
+        lines += ["# HELP pulse_grist_rows_total Rows read from or sent to Grist.", "# TYPE pulse_grist_rows_total counter"]
+        for key, values in data:
+            lines.append(f"pulse_grist_rows_total{{{_labels(key)}}} {values['rows']}")
+        lines += ["# HELP pulse_grist_request_seconds Grist API call latency.", "# TYPE pulse_grist_request_seconds histogram"]
+        for key, values in data:
+            labels = _labels(key)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, values["buckets"]):
+                cumulative += count
+                lines.append(f'pulse_grist_request_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'pulse_grist_request_seconds_bucket{{{labels},le="+Inf"}} {values["count"]}')
+            lines.append(f"pulse_grist_request_seconds_sum{{{labels}}} {values['seconds']:.6f}")
+            lines.append(f"pulse_grist_request_seconds_count{{{labels}}} {values['count']}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, top: int = 10) -> str:
+        by_site: dict[tuple, dict] = {}
+        for (doc, table, endpoint, method, site), values in self.snapshot().items():
+            bucket = by_site.setdefault((site, method, table or endpoint), {"count": 0, "seconds": 0.0, "rows": 0})
+            bucket["count"] += values["count"]
+            bucket["seconds"] += values["seconds"]
+            bucket["rows"] += values["rows"]
+        if not by_site:
+            return "Grist calls: none recorded."
+        total = sum(values["count"] for values in by_site.values())
+        lines = [f"Grist calls: {total} total; top call sites by time:"]
+        ranked = sorted(by_site.items(), key=lambda item: item[1]["seconds"], reverse=True)[:top]
+        for (site, method, table), values in ranked:
+            avg_ms = values["seconds"] * 1000 / max(1, values["count"])
+            lines.append(
+                f"  {site} {method} {table}: {values['count']} calls, {values['seconds']:.2f}s, "
+                f"avg {avg_ms:.0f}ms, {values['rows']} rows"
+            )
+        return "\n".join(lines)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key: tuple) -> str:
+    doc, table, endpoint, method, site = key
+    return (
+        f'doc="{_escape(doc)}",table="{_escape(table)}",endpoint="{_escape(endpoint)}",'
+        f'method="{_escape(method)}",site="{_escape(site)}"'
+    )
+
+
+grist_metrics = GristMetrics()
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = grist_metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        return
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer | None:
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, int(port)), _MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, name="grist-metrics", daemon=True).start()
+    return server
+
+
+def start_summary_reporter(interval: float, emit=print) -> threading.Thread | None:
+    if not interval or interval <= 0:
+        return None
+
+    def _run():
+        while True:
+            time.sleep(interval)
+            emit(grist_metrics.summary())
+
+    thread = threading.Thread(target=_run, name="grist-metrics-summary", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+
+import httpx
+import requests
+
+from pulse.config import (
+    GRIST_BREAKER_FAILURE_THRESHOLD,
+    GRIST_BREAKER_RESET_SECONDS,
+    GRIST_RATE_LIMIT_BURST,
+    GRIST_RATE_LIMIT_MAX_WAIT_SECONDS,
+    GRIST_RATE_LIMIT_PER_SECOND,
+)
+
+
+class GristUnavailableError(RuntimeError):
+    """Grist is overloaded or unreachable; the call was not attempted."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+        super().__init__(
+            f"Grist is busy right now. Please try again in about {self.retry_after} seconds."
+        )
+
+
+def _is_overload_status(status_code) -> bool:
+    return status_code == 429 or (isinstance(status_code, int) and status_code >= 500)
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """True for failures worth retrying later: overload, timeouts, connection loss."""
+    if isinstance(exc, GristUnavailableError):
+        return True
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout, httpx.TransportError)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return _is_overload_status(exc.response.status_code)
+    if isinstance(exc, httpx.HTTPStatusError):
+        return _is_overload_status(exc.response.status_code)
+    return False
+
+
+def _retry_after_seconds(value) -> float | None:
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket whose refill rate halves on throttling and creeps back on success."""
+
+    def __init__(self, rate: float, burst: int, clock=time.monotonic):
+        self.max_rate = max(0.1, float(rate))
+        self.min_rate = self.max_rate / 16
+        self.rate = self.max_rate
+        self.burst = max(1, int(burst))
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: float) -> float | None:
+        """Take a token; return how long to wait before using it, or None if that exceeds ``max_wait``."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            wait = max(self._blocked_until - now, -(self._tokens - 1) / self.rate, 0.0)
+            if wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+    def throttled(self, retry_after: float | None = None) -> None:
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            pause = retry_after if retry_after is not None else 1 / self.rate
+            self._blocked_until = max(self._blocked_until, now + pause)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(self._clock())
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class CircuitBreaker:
+    """Opens after consecutive overload failures, then lets one probe through per reset window."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock=time.monotonic):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self._clock = clock
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = self._clock()
+            # A probe that never reported back does not keep the breaker half-open forever.
+            if now - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._opened_at = now
+                return True
+            return False
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def failed(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class DocGuard:
+    """Limiter + breaker shared by every client talking to one Grist document."""
+
+    def __init__(
+        self,
+        rate: float = GRIST_RATE_LIMIT_PER_SECOND,
+        burst: int = GRIST_RATE_LIMIT_BURST,
+        max_wait: float = GRIST_RATE_LIMIT_MAX_WAIT_SECONDS,
+        failure_threshold: int = GRIST_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = GRIST_BREAKER_RESET_SECONDS,
+        clock=time.monotonic,
+    ):
+        self.limiter = TokenBucket(rate, burst, clock=clock)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, clock=clock)
+        self.max_wait = float(max_wait)
+
+    def before_request(self, max_wait: float | None = None) -> float:
+        """Return the delay to observe before sending, or raise if the call should not be made.
+
+        ``max_wait`` tightens the configured limit for this call only.
+        """
+        if not self.breaker.allow():
+            raise GristUnavailableError(self.breaker.retry_in())
+        limit = self.max_wait if max_wait is None else min(self.max_wait, max_wait)
+        delay = self.limiter.reserve(limit)
+        if delay is None:
+            raise GristUnavailableError(limit)
+        return delay
+
+    def record_response(self, status_code, retry_after=None) -> None:
+        if status_code == 429:
+            self.limiter.throttled(_retry_after_seconds(retry_after))
+        if _is_overload_status(status_code):
+            self.breaker.failed()
+            return
+        self.limiter.succeeded()
+        self.breaker.succeeded()
+
+    def record_error(self, exc: BaseException) -> None:
+        if is_transient_error(exc):
+            self.breaker.failed()
+
+
+_guards: dict = {}
+_guards_lock = threading.Lock()
+
+
+def guard_for(server, doc_id) -> DocGuard:
+    key = (server, doc_id)
+    with _guards_lock:
+        guard = _guards.get(key)
+        if guard is None:
+            guard = DocGuard()
+            _guards[key] = guard
+        return guard
+
+
+def reset_guards() -> None:
+    with _guards_lock:
+        _guards.clear()
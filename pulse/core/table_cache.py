@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from pulse.config import GRIST_CACHE_DEFAULT_TTL_SECONDS, GRIST_CACHE_MAX_TABLES, GRIST_CACHE_TABLE_TTLS
+
+
+# Reference tables change rarely; transactional tables fall back to the default TTL.
+DEFAULT_TABLE_TTLS = {
+    "ProcessMaster": 300.0,
+    "ProcessStage": 300.0,
+    "ProcessStageUserAssignment": 120.0,
+    "ProductPartMSList": 300.0,
+    "ProductionConfig": 300.0,
+    "Roles": 120.0,
+    "Role_Permissions": 120.0,
+    "Users": 60.0,
+    "UserRoleAssignment": 60.0,
+    "Notification_Events": 120.0,
+    "Notification_Subscriptions": 60.0,
+}
+
+
+def _parse_table_ttls(raw: str) -> dict[str, float]:
+    if not raw:
+        return {}
+    try:
+        payload = json.loads(raw)
+    except ValueError:
+        return {}
+    if not isinstance(payload, dict):
+        return {}
+    result: dict[str, float] = {}
+    for table, ttl in payload.items():
+        try:
+            result[str(table)] = float(ttl)
+        except (TypeError, ValueError):
+            continue
+    return result
+
+
+class TableSnapshotCache:
+    """Process-wide cache of full-table snapshots keyed by (server, doc, table[, kind]).
+
+    Write generations are tracked per (server, doc, table), so invalidating a table
+    drops every snapshot kind held for it. Expired and invalidated snapshots are
+    kept (within the LRU bound) as the last good copy for ``get_stale``.
+    """
+
+    def __init__(self, default_ttl: float, table_ttls: dict[str, float] | None = None, max_entries: int = 64, clock=time.monotonic):
+        self.default_ttl = float(default_ttl)
+        self.table_ttls = dict(table_ttls or {})
+        self.max_entries = max(1, int(max_entries))
+        self._clock = clock
+        self._entries: OrderedDict[tuple, tuple[float, list, bool]] = OrderedDict()
+        self._generations: dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def ttl_for(self, table: str) -> float:
+        return float(self.table_ttls.get(table, self.default_ttl))
+
+    def generation(self, key: tuple) -> int:
+        with self._lock:
+            return self._generations.get(key[:3], 0)
+
+    def get(self, key: tuple) -> list | None:
+        ttl = self.ttl_for(key[2])
+        if ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, records, fresh = entry
+            if not fresh or self._clock() - stored_at > ttl:
+                return None
+            self._entries.move_to_end(key)
+            return records
+
+    def get_stale(self, key: tuple) -> tuple[float, list] | None:
+        """Return ``(age_seconds, records)`` for the last snapshot stored, fresh or not."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, records, _ = entry
+            return self._clock() - stored_at, records
+
+    def put(self, key: tuple, records: list, generation: int | None = None) -> None:
+        if self.ttl_for(key[2]) <= 0:
+            return
+        with self._lock:
+            # A write landed while this snapshot was being fetched; it may already be stale.
+            if generation is not None and generation != self._generations.get(key[:3], 0):
+                return
+            self._entries[key] = (self._clock(), records, True)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, server, doc_id, table: str | None = None) -> None:
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == server and key[1] == doc_id and (table is None or key[2] == table)]
+            tables = {key[:3] for key in keys}
+            if table is not None:
+                tables.add((server, doc_id, table))
+            for key in keys:
+                stored_at, records, _ = self._entries[key]
+                self._entries[key] = (stored_at, records, False)
+            for base in tables:
+                self._generations[base] = self._generations.get(base, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for base in {key[:3] for key in self._entries}:
+                self._generations[base] = self._generations.get(base, 0) + 1
+            self._entries.clear()
+
+
+snapshot_cache = TableSnapshotCache(
+    GRIST_CACHE_DEFAULT_TTL_SECONDS,
+    {**DEFAULT_TABLE_TTLS, **_parse_table_ttls(GRIST_CACHE_TABLE_TTLS)},
+    max_entries=GRIST_CACHE_MAX_TABLES,
+)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import contextvars
+from contextlib import contextmanager
+
+_current: contextvars.ContextVar[UnitOfWork | None] = contextvars.ContextVar("pulse_unit_of_work", default=None)
+
+
+class UnitOfWork:
+    """Read identity map and deferred-patch queue for one bot update.
+
+    The first whole-table read of each (server, doc, table[, kind]) is kept and
+    served to every later read in the same update. Patches handed to
+    ``defer_patch`` are merged per row and written in one bulk call per table
+    when the unit flushes; any read that would go to Grist for a table with
+    pending patches flushes them first.
+    """
+
+    def __init__(self):
+        self._reads: dict[tuple, object] = {}
+        self._pending: dict[tuple, tuple[object, dict[int, dict]]] = {}
+
+    def lookup(self, key: tuple):
+        return self._reads.get(key)
+
+    def remember(self, key: tuple, value) -> None:
+        self._reads[key] = value
+
+    def forget(self, server, doc_id, table: str | None = None) -> None:
+        for key in [key for key in self._reads if key[0] == server and key[1] == doc_id and (table is None or key[2] == table)]:
+            del self._reads[key]
+
+    def defer_patch(self, key: tuple, updates, write) -> None:
+        """Queue ``(row_id, fields)`` updates for the table ``key``; ``write(updates)`` sends them."""
+        _, rows = self._pending.setdefault(key, (write, {}))
+        for row_id, fields in updates:
+            rows[row_id] = {**rows.get(row_id, {}), **fields}
+
+    def has_pending(self, server, doc_id, table: str | None = None) -> bool:
+        return any(key[0] == server and key[1] == doc_id and (table is None or key[2] == table) for key in self._pending)
+
+    def flush(self, server=None, doc_id=None, table: str | None = None) -> None:
+        """Write queued patches, all of them or only those for one doc/table."""
+        keys = [
+            key
+            for key in self._pending
+            if (server is None or key[0] == server) and (doc_id is None or key[1] == doc_id) and (table is None or key[2] == table)
+        ]
+        error = None
+        for key in keys:
+            write, rows = self._pending.pop(key)
+            try:
+                write(list(rows.items()))
+            except Exception as exc:
+                # Keep the rows queued and keep writing the other tables; the first failure is re-raised.
+                self._pending[key] = (write, rows)
+                error = error or exc
+        if error is not None:
+            raise error
+
+
+def current_unit_of_work() -> UnitOfWork | None:
+    return _current.get()
+
+
+@contextmanager
+def unit_of_work():
+    """Run the block inside a unit of work, reusing the enclosing one if there is one.
+
+    Queued patches are flushed when the outermost block exits, including on error,
+    so a failing handler keeps the writes it made before failing. Handlers should
+    still flush at their own commit points; this is the backstop. A flush failure
+    never replaces the error the block itself raised.
+    """
+    unit = _current.get()
+    if unit is not None:
+        yield unit
+        return
+    unit = UnitOfWork()
+    token = _current.set(unit)
+    try:
+        yield unit
+    except BaseException:
+        _current.reset(token)
+        try:
+            unit.flush()
+        except Exception as exc:
+            print(f"Unit of work flush failed after handler error: {exc}")
+        raise
+    _current.reset(token)
+    unit.flush()
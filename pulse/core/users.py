@@ -1,8 +1,9 @@
 from pulse.core.grist_client import GristClient
 from pulse.config import PULSE_GRIST_SERVER, PULSE_DOC_ID, PULSE_API_KEY
+from pulse.data.user_directory import pulse_user_directory
 
 
-client = GristClient(PULSE_GRIST_SERVER, PULSE_DOC_ID, PULSE_API_KEY)
+client = GristClient(PULSE_GRIST_SERVER, PULSE_DOC_ID, PULSE_API_KEY, use_cache=True)
 
 
 def _normalize_ref_value(value):
@@ -11,32 +12,22 @@ def _normalize_ref_value(value):
     return value
 
 
-def _build_roles_lookup():
-    roles = client.get_records("Roles")
-    return {r["id"]: r["fields"] for r in roles}
-
-
 def get_user_by_telegram(telegram_id):
-    users = client.get_records("Users")
-    roles_lookup = _build_roles_lookup()
-
-    for u in users:
-        fields = u["fields"]
-        if str(fields.get("Telegram_ID")) == str(telegram_id) and fields.get("Active"):
-            role_ref = _normalize_ref_value(fields.get("Role"))
-            print("DEBUG USER role_ref:", role_ref) # temp
-            role_fields = roles_lookup.get(role_ref, {})
-            print("DEBUG USER role_fields:", role_fields) # temp
-            role_id = role_fields.get("Role_ID")
-            print("DEBUG USER role_id:", role_id) # temp
-            return {
-                "record_id": u["id"],
-                "user_id": fields.get("User_ID"),
-                "name": fields.get("Name"),
-                "role_id": role_id,
-                "role": role_id,
-                "role_ref_id": role_ref,
-                "reports_to": fields.get("Reports_To")
-            }
-
-    return None
+    directory = pulse_user_directory(client)
+    u = directory.active_user_by_telegram_id.get(str(telegram_id))
+    if u is None:
+        return None
+
+    fields = u["fields"]
+    role_ref = _normalize_ref_value(fields.get("Role"))
+    role_fields = directory.role_fields_by_id.get(role_ref, {})
+    role_id = role_fields.get("Role_ID")
+    return {
+        "record_id": u["id"],
+        "user_id": fields.get("User_ID"),
+        "name": fields.get("Name"),
+        "role_id": role_id,
+        "role": role_id,
+        "role_ref_id": role_ref,
+        "reports_to": fields.get("Reports_To")
+    }
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+from pathlib import Path
+
+from pulse.config import (
+    GRIST_WRITE_BEHIND_BATCH_SIZE,
+    GRIST_WRITE_BEHIND_FLUSH_SECONDS,
+    GRIST_WRITE_BEHIND_SPOOL_DIR,
+    GRIST_WRITE_CHUNK_SIZE,
+)
+from pulse.core.resilience import is_transient_error
+
+_MAX_BACKOFF_SECONDS = 60.0
+
+
+class WriteBehindQueue:
+    """Buffers append-only rows for one Grist table and inserts them in bulk.
+
+    Rows are flushed by a background thread once ``batch_size`` rows are waiting
+    or ``flush_interval`` seconds have passed, and once more at interpreter exit.
+    Transient failures keep the rows queued for the next attempt; a row Grist
+    rejects outright is retried on its own so it cannot hold back the rest.
+    A spool left by the last run is renamed to ``<spool>.loading`` on start and
+    only removed once a flush has sent its rows.
+    """
+
+    def __init__(
+        self,
+        client,
+        table: str,
+        batch_size: int = GRIST_WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = GRIST_WRITE_BEHIND_FLUSH_SECONDS,
+        prepare=None,
+        spool_path: str | Path | None = None,
+    ):
+        self.client = client
+        self.table = table
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.01, float(flush_interval))
+        self.prepare = prepare
+        self.spool_path = Path(spool_path) if spool_path else None
+        self._loading_path = self.spool_path.with_name(self.spool_path.name + ".loading") if self.spool_path else None
+        self._spool_loaded = False
+        self.dropped = 0
+        self._rows: list[dict] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._failures = 0
+        self._thread = None
+        self._closed = False
+        self._load_spool()
+
+    def enqueue(self, row: dict) -> None:
+        # Surface TEST-mode write blocking to the caller, as a direct insert would.
+        assert_write_allowed = getattr(self.client, "_assert_write_allowed", None)
+        if assert_write_allowed is not None:
+            assert_write_allowed()
+        with self._lock:
+            self._rows.append(row)
+            self._ensure_thread()
+            if len(self._rows) >= self.batch_size:
+                self._wakeup.notify()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self) -> bool:
+        """Send everything queued so far; returns False if rows had to stay queued."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return True
+            try:
+                if self.prepare is not None:
+                    rows = self.prepare(rows)
+                unsent = self._send(rows)
+            except BaseException:
+                unsent = rows
+                raise
+            finally:
+                if unsent:
+                    self._failures += 1
+                    with self._lock:
+                        self._rows[:0] = unsent
+            if unsent:
+                return False
+            self._failures = 0
+            self._release_spool()
+            return True
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self.flush_interval + 5)
+        try:
+            self.flush()
+        except Exception:
+            pass
+        self._write_spool()
+        # Anything still unsent from the loaded spool was just written back to the spool.
+        self._release_spool()
+
+    def _send(self, rows: list[dict]) -> list[dict]:
+        chunk_size = max(1, min(self.batch_size, GRIST_WRITE_CHUNK_SIZE))
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                self.client.add_records(self.table, chunk)
+            except Exception as exc:
+                if is_transient_error(exc):
+                    return rows[start:]
+                unsent = self._send_one_by_one(chunk)
+                if unsent:
+                    return unsent + rows[start + chunk_size:]
+        return []
+
+    def _send_one_by_one(self, rows: list[dict]) -> list[dict]:
+        for pos, row in enumerate(rows):
+            try:
+                self.client.add_records(self.table, [row])
+            except Exception as exc:
+                if is_transient_error(exc):
+                    return rows[pos:]
+                self.dropped += 1
+        return []
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.table}", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                delay = min(self.flush_interval * (2 ** self._failures), _MAX_BACKOFF_SECONDS)
+                if not self._closed and len(self._rows) < self.batch_size:
+                    self._wakeup.wait(timeout=delay)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                # Rows are back in the queue; the next pass backs off further.
+                continue
+
+    def _load_spool(self) -> None:
+        if self.spool_path is None:
+            return
+        loading = self._loading_path
+        if self.spool_path.exists():
+            if loading.exists():
+                # The last start died before sending what it loaded; keep those rows first.
+                with loading.open("a", encoding="utf-8") as handle:
+                    handle.write(self.spool_path.read_text(encoding="utf-8"))
+                self.spool_path.unlink()
+            else:
+                os.replace(self.spool_path, loading)
+        if not loading.exists():
+            return
+        rows = []
+        for line in loading.read_text(encoding="utf-8").splitlines():
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                continue
+        self._spool_loaded = True
+        with self._lock:
+            self._rows[:0] = rows
+            if rows:
+                self._ensure_thread()
+        if not rows:
+            self._release_spool()
+
+    def _release_spool(self) -> None:
+        if not self._spool_loaded:
+            return
+        self._spool_loaded = False
+        try:
+            self._loading_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _write_spool(self) -> None:
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows or self.spool_path is None:
+            return
+        self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.spool_path.open("a", encoding="utf-8") as handle:
+            for row in rows:
+                handle.write(json.dumps(row, default=str) + "\n")
+
+
+_queues: dict = {}
+_queues_lock = threading.Lock()
+
+
+def write_behind_for(client, table: str, prepare=None) -> WriteBehindQueue:
+    """Return the process-wide queue for ``table`` in ``client``'s document."""
+    server = getattr(client, "server", None)
+    doc_id = getattr(client, "doc_id", None)
+    key = (server, doc_id, table) if server and doc_id else (client, table)
+    with _queues_lock:
+        queue = _queues.get(key)
+        if queue is None:
+            spool_path = None
+            if GRIST_WRITE_BEHIND_SPOOL_DIR and server and doc_id:
+                spool_path = Path(GRIST_WRITE_BEHIND_SPOOL_DIR) / f"{doc_id}_{table}.jsonl"
+            queue = WriteBehindQueue(client, table, prepare=prepare, spool_path=spool_path)
+            _queues[key] = queue
+        return queue
+
+
+def flush_all() -> None:
+    with _queues_lock:
+        queues = list(_queues.values())
+    for queue in queues:
+        queue.flush()
+
+
+@atexit.register
+def _close_all() -> None:
+    with _queues_lock:
+        queues = list(_queues.values())
+    for queue in queues:
+        queue.close()
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from pulse.core.grist_client import is_stale
+from pulse.core.table_cache import snapshot_cache
+from pulse.core.unit_of_work import current_unit_of_work
+
+BATCH_TABLES = ("ProductBatchMaster", "ProductBatchMS", "ProductBatchCNC", "ProductBatchStore")
+
+# Fields whose first non-empty value is a row's status in the status index.
+STATUS_FIELDS = {
+    "ProductBatchMaster": ("approval_status",),
+    "ProductBatchMS": ("status", "current_status"),
+    "ProductBatchCNC": ("status", "current_status"),
+    "ProductBatchStore": ("status", "current_status"),
+}
+
+
+def _ref_id(value) -> int | None:
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return value if isinstance(value, int) else None
+
+
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    return value
+
+
+class IndexedBatchTable:
+    """One ProductBatch* table held in memory with id, batch, batch_no and status indexes.
+
+    Records are replaced, never mutated, when a write is applied, so lists handed
+    out earlier keep the values they were read with.
+    """
+
+    def __init__(self, table: str, records: list[dict], generation: int = 0, loaded_at: float = 0.0):
+        self.table = table
+        self.generation = generation
+        self.loaded_at = loaded_at
+        # Bumped on every applied write so derived indexes can tell the snapshot moved.
+        self.revision = 0
+        self._status_fields = STATUS_FIELDS.get(table, ("status",))
+        self._rows: dict[int, dict] = {}
+        self._by_batch: dict[int, dict[int, None]] = {}
+        self._by_status: dict[str, dict[int, None]] = {}
+        self._by_batch_no: dict[object, int] = {}
+        for record in records:
+            if isinstance(record.get("id"), int):
+                self._insert(record)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def records(self) -> list[dict]:
+        return list(self._rows.values())
+
+    def get(self, row_id) -> dict | None:
+        return self._rows.get(row_id) if isinstance(row_id, int) else None
+
+    def rows_for_batch(self, batch_id) -> list[dict]:
+        return [self._rows[row_id] for row_id in list(self._by_batch.get(batch_id, ()))]
+
+    def rows_with_status(self, status: str) -> list[dict]:
+        return [self._rows[row_id] for row_id in list(self._by_status.get(status, ()))]
+
+    def master_by_batch_no(self, batch_no) -> dict | None:
+        row_id = self._by_batch_no.get(_hashable(batch_no))
+        return self._rows.get(row_id) if row_id is not None else None
+
+    def batch_numbers(self) -> list:
+        return list(self._by_batch_no)
+
+    def status_of(self, record: dict) -> str:
+        fields = record.get("fields", {})
+        for name in self._status_fields:
+            value = fields.get(name)
+            if value:
+                return str(value)
+        return ""
+
+    def copy(self) -> IndexedBatchTable:
+        """An independent copy: patches applied to it leave this table untouched."""
+        clone = object.__new__(IndexedBatchTable)
+        clone.table = self.table
+        clone.generation = self.generation
+        clone.loaded_at = self.loaded_at
+        clone.revision = self.revision
+        clone._status_fields = self._status_fields
+        clone._rows = dict(self._rows)
+        clone._by_batch = {key: dict(members) for key, members in self._by_batch.items()}
+        clone._by_status = {key: dict(members) for key, members in self._by_status.items()}
+        clone._by_batch_no = dict(self._by_batch_no)
+        return clone
+
+    def apply_patch(self, updates) -> None:
+        self.revision += 1
+        for row_id, fields in updates:
+            current = self._rows.get(row_id)
+            if current is None:
+                continue
+            updated = {"id": row_id, "fields": {**current.get("fields", {}), **fields}}
+            # Rows keep their position; only index entries whose key changed move.
+            for old_key, new_key, index in self._index_moves(current, updated):
+                if old_key != new_key:
+                    self._unindex(index, old_key, row_id)
+                    if new_key is not None:
+                        index.setdefault(new_key, {})[row_id] = None
+            if self.table == "ProductBatchMaster" and "batch_no" in fields:
+                old_no = _hashable(current.get("fields", {}).get("batch_no"))
+                if old_no is not None and self._by_batch_no.get(old_no) == row_id:
+                    del self._by_batch_no[old_no]
+                new_no = _hashable(fields["batch_no"])
+                if new_no:
+                    self._by_batch_no.setdefault(new_no, row_id)
+            self._rows[row_id] = updated
+
+    def apply_add(self, row_ids: list[int], rows: list[dict]) -> None:
+        self.revision += 1
+        for row_id, fields in zip(row_ids, rows):
+            if isinstance(row_id, int):
+                self._insert({"id": row_id, "fields": dict(fields)})
+
+    def _batch_key(self, record: dict) -> int | None:
+        if self.table == "ProductBatchMaster":
+            return record["id"]
+        return _ref_id(record.get("fields", {}).get("batch_id"))
+
+    def _index_moves(self, old: dict, new: dict):
+        yield self._batch_key(old), self._batch_key(new), self._by_batch
+        yield self.status_of(old), self.status_of(new), self._by_status
+
+    @staticmethod
+    def _unindex(index: dict, key, row_id: int) -> None:
+        members = index.get(key)
+        if members is not None:
+            members.pop(row_id, None)
+
+    def _insert(self, record: dict) -> None:
+        row_id = record["id"]
+        fields = record.get("fields", {})
+        self._rows[row_id] = record
+        batch_id = self._batch_key(record)
+        if batch_id is not None:
+            self._by_batch.setdefault(batch_id, {})[row_id] = None
+        self._by_status.setdefault(self.status_of(record), {})[row_id] = None
+        batch_no = _hashable(fields.get("batch_no")) if self.table == "ProductBatchMaster" else None
+        if batch_no:
+            self._by_batch_no.setdefault(batch_no, row_id)
+
+
+class BatchSnapshots:
+    """Process-wide indexed snapshots of the ProductBatch tables, one per (server, doc, table).
+
+    A snapshot is reused for the table's snapshot-cache TTL and as long as the
+    table's write generation matches. ``record_write`` folds the caller's own
+    write into the snapshot instead of dropping it; a write made anywhere else
+    in the process bumps the generation and forces a reload.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._entries: dict[tuple, IndexedBatchTable] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(client, table: str) -> tuple | None:
+        # Clients without the snapshot cache enabled get a fresh index per read.
+        if not getattr(client, "use_cache", False):
+            return None
+        return client._cache_key(table)
+
+    def _current(self, key: tuple | None, table: str, private: bool = True) -> IndexedBatchTable | None:
+        if key is None:
+            return None
+        unit = current_unit_of_work()
+        if unit is not None and private:
+            overlay = unit.lookup(key + ("overlay",))
+            if overlay is not None:
+                return overlay
+        # Within a unit of work the snapshot first used stays in use until this update writes the table.
+        pinned = unit.lookup(key + ("indexed",)) if unit is not None else None
+        if pinned is not None:
+            return pinned
+        ttl = snapshot_cache.ttl_for(table)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or ttl <= 0 or self._clock() - entry.loaded_at > ttl:
+            return None
+        if entry.generation != snapshot_cache.generation(key):
+            return None
+        if unit is not None:
+            unit.remember(key + ("indexed",), entry)
+        return entry
+
+    def _build(self, key: tuple | None, table: str, records, generation: int) -> IndexedBatchTable:
+        snapshot = IndexedBatchTable(table, records, generation, self._clock())
+        if key is not None and not is_stale(records):
+            with self._lock:
+                self._entries[key] = snapshot
+            unit = current_unit_of_work()
+            if unit is not None:
+                unit.remember(key + ("indexed",), snapshot)
+        return snapshot
+
+    def get(self, client, table: str, private: bool = True) -> IndexedBatchTable:
+        """Return the table's snapshot; inside a unit of work, with its unsent patches applied.
+
+        ``private=False`` returns the shared snapshot, for indexes that outlive the unit.
+        """
+        key = self._key(client, table)
+        current = self._current(key, table, private)
+        if current is not None:
+            return current
+        generation = snapshot_cache.generation(key) if key is not None else 0
+        return self._build(key, table, client.get_records(table), generation)
+
+    def overlay(self, client, table: str) -> IndexedBatchTable:
+        """Return the current unit of work's private copy of the table, for patches Grist has not accepted yet.
+
+        The shared snapshot only changes in ``record_write``, once the write succeeded.
+        """
+        key = self._key(client, table)
+        unit = current_unit_of_work()
+        overlay = unit.lookup(key + ("overlay",))
+        if overlay is None:
+            base = self.get(client, table)
+            with self._lock:
+                overlay = base.copy()
+            unit.remember(key + ("overlay",), overlay)
+        return overlay
+
+    async def get_async(self, client, table: str) -> IndexedBatchTable:
+        key = self._key(client, table)
+        current = self._current(key, table)
+        if current is not None:
+            return current
+        generation = snapshot_cache.generation(key) if key is not None else 0
+        return self._build(key, table, await client.get_records(table), generation)
+
+    def peek(self, client, table: str) -> IndexedBatchTable | None:
+        """Return the resident snapshot if it is still current, without loading one."""
+        return self._current(self._key(client, table), table)
+
+    def write_token(self, client, table: str):
+        key = self._key(client, table)
+        return None if key is None else snapshot_cache.generation(key)
+
+    def record_write(self, client, table: str, token, apply=None) -> None:
+        """Fold a completed write into the snapshot, or drop it if that is not safe.
+
+        ``token`` is ``write_token()`` taken before the write; if any other write
+        landed in between, the snapshot is dropped rather than patched.
+        """
+        key = self._key(client, table)
+        if key is None:
+            return
+        generation = snapshot_cache.generation(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            if apply is None or entry.generation != token or generation != token + 1:
+                del self._entries[key]
+                return
+            apply(entry)
+            entry.generation = generation
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+batch_snapshots = BatchSnapshots()
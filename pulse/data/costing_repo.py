@@ -58,7 +58,7 @@ class CostingRepo:
         if not part_ids:
             return []
 
-        ms_records = self.client.get_records("ProductPartMSList")
+        ms_records = self.client.get_table("ProductPartMSList")
         filtered: list[dict] = []
 
         for record in ms_records:
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from pulse.core.table_cache import snapshot_cache
+from pulse.data.batch_snapshot import IndexedBatchTable, batch_snapshots
+from pulse.data.process_routing import ProcessRouting, process_routing_for
+from pulse.data.user_directory import CostingUserDirectory, costing_user_directory
+
+MS_PENDING_CONFIRMATION = "Done - Pending Confirmation"
+
+# Why a row shows up in someone's My MS Jobs list, in precedence order.
+REASON_STAGE = "stage"
+REASON_HANDOFF = "handoff"
+REASON_DELEGATE = "delegate"
+REASON_NOTIFIER = "notifier"
+
+_USER_TABLES = ("ProcessStageUserAssignment", "BatchMSDelegation")
+
+
+def normalize_role_name(value: str) -> str:
+    return " ".join(str(value or "").strip().lower().replace("_", " ").replace("-", " ").split())
+
+
+def role_tokens(value: str) -> set[str]:
+    raw = str(value or "")
+    tokens: set[str] = set()
+    for chunk in raw.replace(",", "|").split("|"):
+        normalized = normalize_role_name(chunk)
+        if normalized:
+            tokens.add(normalized)
+    return tokens
+
+
+def is_pending_ms_status(status: str) -> bool:
+    value = str(status or "").strip()
+    if not value:
+        return False
+    if value in ("Cutting Completed", MS_PENDING_CONFIRMATION, "Done", "Completed"):
+        return False
+    return True
+
+
+def _ref(value):
+    if isinstance(value, list):
+        items = value[1:] if value and value[0] == "L" else value
+        value = items[0] if items else None
+    if isinstance(value, dict):
+        value = value.get("id") or value.get("record_id") or value.get("ref")
+    text = str(value or "").strip()
+    return int(text) if text.isdigit() else value
+
+
+def _refs(value) -> list[int]:
+    if value is None:
+        return []
+    items = (value[1:] if value and value[0] == "L" else value) if isinstance(value, list) else [value]
+    return [ref for ref in (_ref(item) for item in items) if isinstance(ref, int)]
+
+
+def _costing_user_id(value, users: CostingUserDirectory) -> str:
+    ref = _ref(value)
+    if isinstance(ref, int):
+        return str(users.user_id_by_record_id.get(ref, "")).strip()
+    text = str(ref or "").strip()
+    return users.user_ids.get(text, text).strip()
+
+
+class MsVisibilityIndex:
+    """Which ProductBatchMS rows each user and role can see in My MS Jobs.
+
+    Rows are indexed by their current stage, the stage they are handed off to
+    and the role tokens allowed to act on them; users are indexed by the stages
+    they are assigned to, the rows delegated to them and the batches they are a
+    notifier on. A lookup joins the two sides instead of evaluating every row.
+    The row side follows the ProductBatchMS snapshot row by row as rows change
+    stage; the user side is rebuilt when its source tables change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._row_source: tuple = ()
+        self._row_records: dict[int, dict] = {}
+        self._row_keys: dict[int, list[tuple[dict, object]]] = {}
+        self._rows_at_stage: dict[tuple, dict[int, None]] = {}
+        self._rows_awaiting: dict[tuple, dict[int, None]] = {}
+        self._rows_by_role_token: dict[str, dict[int, str]] = {}
+        self.user_version: tuple = ()
+        self.user_loaded_at = 0.0
+        self._stages_by_user: dict[str, set[tuple]] = {}
+        self._delegated_rows: dict[str, dict[int, None]] = {}
+        self._notifier_batches: dict[str, dict[int, None]] = {}
+        self._ms_table: IndexedBatchTable | None = None
+
+    def load_users(self, routing: ProcessRouting, assignments, delegations, masters: IndexedBatchTable, users: CostingUserDirectory, version: tuple = (), loaded_at: float = 0.0) -> None:
+        stage_key_by_id = {stage_id: key for key, ids in routing.stage_ids.items() for stage_id in ids}
+        stages_by_user: dict[str, set[tuple]] = {}
+        for row in assignments:
+            fields = row.get("fields", {})
+            if not bool(fields.get("active", True)):
+                continue
+            key = stage_key_by_id.get(_ref(fields.get("process_stage_id")))
+            user_ref = _ref(fields.get("user_id"))
+            user_id = users.user_id_by_record_id.get(user_ref, "") if isinstance(user_ref, int) else ""
+            if key is not None and user_id:
+                stages_by_user.setdefault(user_id, set()).add(key)
+        delegated: dict[str, dict[int, None]] = {}
+        for row in delegations:
+            fields = row.get("fields", {})
+            if not bool(fields.get("active", True)):
+                continue
+            row_id = _ref(fields.get("batch_ms_id"))
+            user_id = _costing_user_id(fields.get("delegated_to_user"), users)
+            if isinstance(row_id, int) and user_id:
+                delegated.setdefault(user_id, {})[row_id] = None
+        notifier_batches: dict[str, dict[int, None]] = {}
+        for master in masters.records():
+            for ref in _refs(master.get("fields", {}).get("notifier_users")):
+                user_id = _costing_user_id(ref, users)
+                if user_id:
+                    notifier_batches.setdefault(user_id, {})[master["id"]] = None
+        with self._lock:
+            self._stages_by_user = stages_by_user
+            self._delegated_rows = delegated
+            self._notifier_batches = notifier_batches
+            self.user_version = version
+            self.user_loaded_at = loaded_at
+
+    def sync_rows(self, routing: ProcessRouting, ms_table: IndexedBatchTable) -> None:
+        """Bring the row side up to date with ``ms_table``, re-indexing only rows that changed."""
+        with self._lock:
+            if self._row_source[:2] != (routing, ms_table):
+                self._row_records = {}
+                self._row_keys = {}
+                self._rows_at_stage = {}
+                self._rows_awaiting = {}
+                self._rows_by_role_token = {}
+            elif self._row_source[2] == ms_table.revision:
+                return
+            current = {record["id"]: record for record in ms_table.records()}
+            for row_id in [row_id for row_id in self._row_records if row_id not in current]:
+                self._unindex_row(row_id)
+            for row_id, record in current.items():
+                # Snapshot records are replaced on write, so identity marks a changed row.
+                if self._row_records.get(row_id) is not record:
+                    self._unindex_row(row_id)
+                    self._index_row(routing, record)
+            self._row_source = (routing, ms_table, ms_table.revision)
+            self._ms_table = ms_table
+
+    def _index_row(self, routing: ProcessRouting, record: dict) -> None:
+        row_id = record["id"]
+        fields = record.get("fields", {})
+        process_seq = fields.get("process_seq")
+        if process_seq in (None, "", 0):
+            process_seq = fields.get("Process_Seq")
+        process_seq = _ref(process_seq)
+        seq_id = routing.seq_id(process_seq)
+        stage_name = str(fields.get("current_stage_name") or "").strip()
+        next_stage = str(fields.get("next_stage_name") or "").strip()
+        status = str(fields.get("current_status") or fields.get("status") or "").strip()
+        current_role = routing.stage_role(process_seq, stage_name)
+        supervisor_role = str(fields.get("current_stage_role_name") or "").strip() or current_role
+
+        keys: list[tuple[dict, object]] = []
+        if seq_id is not None and stage_name:
+            keys.append((self._rows_at_stage, (seq_id, stage_name)))
+        if status == MS_PENDING_CONFIRMATION:
+            if seq_id is not None and next_stage:
+                keys.append((self._rows_awaiting, (seq_id, next_stage)))
+            next_role = routing.stage_role(process_seq, next_stage) if next_stage else ""
+            roles, reason = (current_role, next_role, supervisor_role), REASON_HANDOFF
+        elif is_pending_ms_status(status):
+            roles, reason = (supervisor_role, current_role), REASON_STAGE
+        else:
+            roles, reason = (), REASON_STAGE
+        for token in set().union(*(role_tokens(role) for role in roles)):
+            keys.append((self._rows_by_role_token, token))
+        for index, key in keys:
+            index.setdefault(key, {})[row_id] = reason if index is self._rows_by_role_token else None
+        self._row_keys[row_id] = keys
+        self._row_records[row_id] = record
+
+    def _unindex_row(self, row_id: int) -> None:
+        for index, key in self._row_keys.pop(row_id, ()):
+            members = index.get(key)
+            if members is not None:
+                members.pop(row_id, None)
+                if not members:
+                    del index[key]
+        self._row_records.pop(row_id, None)
+
+    def record(self, row_id: int) -> dict | None:
+        return self._row_records.get(row_id)
+
+    def visible_rows(self, role_name: str, viewer_user_id: str = "") -> dict[int, str]:
+        """Return ``{row_id: reason}`` for the rows ``viewer_user_id`` or ``role_name`` may see."""
+        visible: dict[int, str] = {}
+        viewer = str(viewer_user_id or "").strip()
+        with self._lock:
+            if viewer:
+                for key in self._stages_by_user.get(viewer, ()):
+                    for row_id in self._rows_at_stage.get(key, ()):
+                        visible.setdefault(row_id, REASON_STAGE)
+                for key in self._stages_by_user.get(viewer, ()):
+                    for row_id in self._rows_awaiting.get(key, ()):
+                        visible.setdefault(row_id, REASON_HANDOFF)
+                for row_id in self._delegated_rows.get(viewer, ()):
+                    if row_id in self._row_records:
+                        visible.setdefault(row_id, REASON_DELEGATE)
+                ms_table = self._ms_table
+                for batch_id in self._notifier_batches.get(viewer, ()):
+                    for record in ms_table.rows_for_batch(batch_id) if ms_table is not None else ():
+                        visible.setdefault(record["id"], REASON_NOTIFIER)
+            for token in role_tokens(role_name):
+                for row_id, reason in self._rows_by_role_token.get(token, {}).items():
+                    visible.setdefault(row_id, reason)
+        return visible
+
+
+_indexes: dict[tuple, MsVisibilityIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _read(client, table: str) -> list[dict]:
+    try:
+        return client.get_records(table)
+    except Exception:
+        return []
+
+
+def ms_visibility_for(client, clock=time.monotonic) -> MsVisibilityIndex:
+    """Return the visibility index for ``client``'s doc, synced with the current MS snapshot.
+
+    The user side is rebuilt when the process routing, Costing users, batch
+    masters, stage assignments or delegations change; clients without the
+    snapshot cache enabled build a fresh index on every call.
+    """
+    routing = process_routing_for(client)
+    users = costing_user_directory(client)
+    # The index is shared by every update, so it never sees one update's unsent patches.
+    masters = batch_snapshots.get(client, "ProductBatchMaster", private=False)
+    ms_table = batch_snapshots.get(client, "ProductBatchMS", private=False)
+
+    cached = bool(getattr(client, "use_cache", False))
+    base = client._cache_key("ProductBatchMS")[:2] if cached else None
+    generations = tuple(snapshot_cache.generation(client._cache_key(table)) for table in _USER_TABLES) if cached else ()
+    version = (routing, users, masters, masters.revision, generations)
+    if base is not None:
+        with _indexes_lock:
+            index = _indexes.get(base)
+            if index is None:
+                index = _indexes[base] = MsVisibilityIndex()
+    else:
+        index = MsVisibilityIndex()
+
+    ttl = min(snapshot_cache.ttl_for(table) for table in _USER_TABLES)
+    if index.user_version != version or clock() - index.user_loaded_at > ttl:
+        index.load_users(
+            routing,
+            _read(client, "ProcessStageUserAssignment"),
+            _read(client, "BatchMSDelegation"),
+            masters,
+            users,
+            version,
+            clock(),
+        )
+    index.sync_rows(routing, ms_table)
+    return index
+
+
+def clear_ms_visibility() -> None:
+    with _indexes_lock:
+        _indexes.clear()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from pulse.core.table_cache import snapshot_cache
+
+_ROUTING_TABLES = ("ProcessMaster", "ProcessStage")
+
+
+def _ref_id(value) -> int | None:
+    if isinstance(value, list):
+        value = value[0] if value else None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ProcessRouting:
+    """ProcessMaster and ProcessStage compiled into lookup tables.
+
+    Answers "which stages does this process run, who owns each one, what is it
+    called" without touching Grist or scanning rows. Stages are ordered by
+    ``seq_no`` then row id, and the first row carrying a role wins, matching the
+    scans this replaces.
+    """
+
+    def __init__(self, masters: list[dict], stages: list[dict], version: tuple = (), loaded_at: float = 0.0):
+        self.version = version
+        self.loaded_at = loaded_at
+        self.master_fields: dict[int, dict] = {}
+        self.seq_by_legacy_text: dict[str, int] = {}
+        for record in masters:
+            rec_id = record.get("id")
+            if not isinstance(rec_id, int):
+                continue
+            fields = record.get("fields", {})
+            self.master_fields[rec_id] = fields
+            legacy_text = str(fields.get("legacy_process_seq_text") or "").strip()
+            if legacy_text and legacy_text not in self.seq_by_legacy_text:
+                self.seq_by_legacy_text[legacy_text] = rec_id
+
+        ordered: dict[int, list[tuple[int, int, str]]] = {}
+        self.stage_roles: dict[tuple[int, str], str] = {}
+        self.stage_ids: dict[tuple[int, str], tuple[int, ...]] = {}
+        self.stage_mapping: dict[str, dict] = {}
+        stage_ids: dict[tuple[int, str], list[int]] = {}
+        for record in stages:
+            fields = record.get("fields", {})
+            stage_name = str(fields.get("stage_name") or "").strip()
+            role = str(fields.get("resolved_role_name") or fields.get("supervisor_role") or "").strip()
+            if stage_name and role and stage_name not in self.stage_mapping:
+                self.stage_mapping[stage_name] = {
+                    "supervisor_role": role,
+                    "stage_order_priority": fields.get("seq_no") or fields.get("stage_order_priority"),
+                }
+            seq_id = _ref_id(fields.get("process_seq_id"))
+            if seq_id is None or not stage_name:
+                continue
+            rec_id = record.get("id")
+            seq_no = _ref_id(fields.get("seq_no")) or 0
+            ordered.setdefault(seq_id, []).append((seq_no, int(rec_id or 0), stage_name))
+            if isinstance(rec_id, int):
+                stage_ids.setdefault((seq_id, stage_name), []).append(rec_id)
+            if role:
+                self.stage_roles.setdefault((seq_id, stage_name), role)
+        self.stage_names: dict[int, tuple[str, ...]] = {
+            seq_id: tuple(name for _, _, name in sorted(rows, key=lambda item: (item[0], item[1])))
+            for seq_id, rows in ordered.items()
+        }
+        self.stage_ids = {key: tuple(ids) for key, ids in stage_ids.items()}
+
+    def seq_id(self, process_seq_value) -> int | None:
+        seq_id = _ref_id(process_seq_value)
+        if seq_id is not None:
+            return seq_id
+        if isinstance(process_seq_value, list):
+            process_seq_value = process_seq_value[0] if process_seq_value else None
+        legacy_text = str(process_seq_value or "").strip()
+        return self.seq_by_legacy_text.get(legacy_text) if legacy_text else None
+
+    def display_label(self, process_seq_value) -> str:
+        seq_id = self.seq_id(process_seq_value)
+        if seq_id is not None:
+            fields = self.master_fields.get(seq_id, {})
+            label = str(fields.get("display_label") or "").strip() or str(fields.get("process_name") or "").strip()
+            if label:
+                return label
+        return str(process_seq_value or "").strip()
+
+    def stages_for(self, process_seq_value) -> list[str]:
+        seq_id = self.seq_id(process_seq_value)
+        if seq_id is not None and seq_id in self.stage_names:
+            return list(self.stage_names[seq_id])
+        legacy = str(process_seq_value or "").strip()
+        return [token.strip() for token in legacy.split(" - ") if token.strip()] if legacy else []
+
+    def stage_role(self, process_seq_value, stage_name: str) -> str:
+        stage_name_clean = str(stage_name or "").strip()
+        if not stage_name_clean:
+            return ""
+        seq_id = self.seq_id(process_seq_value)
+        if seq_id is not None:
+            role = self.stage_roles.get((seq_id, stage_name_clean))
+            if role:
+                return role
+        return str(self.stage_mapping.get(stage_name_clean, {}).get("supervisor_role") or "")
+
+
+_routings: dict[tuple, ProcessRouting] = {}
+_routings_lock = threading.Lock()
+
+
+def _load(client, table: str) -> tuple[list[dict], bool]:
+    try:
+        return client.get_records(table), True
+    except Exception:
+        return [], False
+
+
+def process_routing_for(client, clock=time.monotonic) -> ProcessRouting:
+    """Return the compiled routing for ``client``'s doc, rebuilding it when either table changed.
+
+    A compiled routing is reused until the tables' snapshot-cache TTL lapses or a
+    write bumps their generation. Clients without the snapshot cache enabled
+    compile a fresh routing on every call.
+    """
+    cached = bool(getattr(client, "use_cache", False))
+    keys = [client._cache_key(table) for table in _ROUTING_TABLES] if cached else []
+    version = tuple(snapshot_cache.generation(key) for key in keys)
+    base = keys[0][:2] if keys else None
+    if base is not None:
+        ttl = min(snapshot_cache.ttl_for(table) for table in _ROUTING_TABLES)
+        with _routings_lock:
+            routing = _routings.get(base)
+        if routing is not None and routing.version == version and clock() - routing.loaded_at <= ttl:
+            return routing
+
+    masters, masters_ok = _load(client, "ProcessMaster")
+    stages, stages_ok = _load(client, "ProcessStage")
+    routing = ProcessRouting(masters, stages, version, clock())
+    # A failed read must not pin an empty routing table; the next lookup retries.
+    if base is not None and masters_ok and stages_ok:
+        with _routings_lock:
+            _routings[base] = routing
+    return routing
+
+
+def clear_process_routings() -> None:
+    with _routings_lock:
+        _routings.clear()
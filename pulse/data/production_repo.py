@@ -1,9 +1,24 @@
 from __future__ import annotations
 
 from datetime import datetime
+from pathlib import Path
 
 from pulse.config import COSTING_API_KEY, COSTING_DOC_ID, PULSE_API_KEY, PULSE_DOC_ID, PULSE_GRIST_SERVER
-from pulse.core.grist_client import GristClient
+from pulse.core.attachment_cache import attachment_cache
+from pulse.core.grist_client import AsyncGristClient, GristClient
+from pulse.core.unit_of_work import current_unit_of_work
+from pulse.core.write_behind import WriteBehindQueue, write_behind_for
+from pulse.data.batch_snapshot import IndexedBatchTable, batch_snapshots
+from pulse.data.ms_visibility import MsVisibilityIndex, ms_visibility_for
+from pulse.data.process_routing import ProcessRouting, process_routing_for
+from pulse.data.schema_registry import SchemaRegistry, schema_registry_for
+from pulse.data.stage_timeline import StageTimelineIndex, stage_timelines_for
+from pulse.data.user_directory import (
+    CostingUserDirectory,
+    PulseUserDirectory,
+    costing_user_directory,
+    pulse_user_directory,
+)
 
 
 class ProductionRepo:
@@ -69,9 +84,12 @@ class ProductionRepo:
         "remarks": "Text",
     }
 
+    CHILD_BATCH_TABLES = ("ProductBatchMS", "ProductBatchCNC", "ProductBatchStore")
+
     def __init__(self):
-        self.costing_client = GristClient(PULSE_GRIST_SERVER, COSTING_DOC_ID, COSTING_API_KEY)
-        self.pulse_client = GristClient(PULSE_GRIST_SERVER, PULSE_DOC_ID, PULSE_API_KEY)
+        self.costing_client = GristClient(PULSE_GRIST_SERVER, COSTING_DOC_ID, COSTING_API_KEY, use_cache=True)
+        self.pulse_client = GristClient(PULSE_GRIST_SERVER, PULSE_DOC_ID, PULSE_API_KEY, use_cache=True)
+        self.async_costing_client = AsyncGristClient(PULSE_GRIST_SERVER, COSTING_DOC_ID, COSTING_API_KEY, use_cache=True)
         self._product_partms_index_cache: dict[int, dict] | None = None
 
     def ensure_ms_workflow_columns(self) -> None:
@@ -82,13 +100,18 @@ class ProductionRepo:
             "supervisor_remarks": "Text",
         }
         existing = self.get_table_columns("ProductBatchMS")
-        for column_id, column_type in required_columns.items():
-            if column_id in existing:
-                continue
+        missing = [column_id for column_id in required_columns if column_id not in existing]
+        for column_id in missing:
             try:
-                self.costing_client.add_column("ProductBatchMS", column_id, column_type)
+                self.costing_client.add_column("ProductBatchMS", column_id, required_columns[column_id])
             except Exception:
                 continue
+        if missing:
+            self.schema.invalidate("ProductBatchMS")
+
+    @property
+    def schema(self) -> SchemaRegistry:
+        return schema_registry_for(self.costing_client)
 
     @staticmethod
     def _normalize_ref(value):
@@ -185,7 +208,7 @@ class ProductionRepo:
         return gauge_map
 
     def get_ms_rows(self, part_ids: list[int]) -> list[dict]:
-        records = self.costing_client.get_records("ProductPartMSList")
+        records = self.costing_client.get_table("ProductPartMSList")
         result = []
         allowed = set(part_ids)
         for record in records:
@@ -200,7 +223,7 @@ class ProductionRepo:
         if self._product_partms_index_cache is not None:
             return self._product_partms_index_cache
         index: dict[int, dict] = {}
-        for record in self.costing_client.get_records("ProductPartMSList"):
+        for record in self.costing_client.get_table("ProductPartMSList"):
             rec_id = record.get("id")
             if not isinstance(rec_id, int):
                 continue
@@ -232,159 +255,47 @@ class ProductionRepo:
         return ", ".join(names)
 
     def get_table_columns(self, table: str) -> set[str]:
-        columns = self.costing_client.get_columns(table)
-        column_ids = set()
-        for column in columns:
-            col_id = column.get("id")
-            if col_id:
-                column_ids.add(str(col_id))
-        return column_ids
+        return set(self.schema.get(table).column_ids)
 
     def get_column_type(self, table: str, column_id: str) -> str:
-        for column in self.costing_client.get_columns(table):
-            if str(column.get("id") or "") != str(column_id):
-                continue
-            return str(column.get("fields", {}).get("type") or "")
-        return ""
+        return self.schema.get(table).column_type(column_id)
 
     def get_writable_table_columns(self, table: str) -> set[str]:
-        columns = self.costing_client.get_columns(table)
-        writable_ids = set()
-        for column in columns:
-            col_id = column.get("id")
-            if not col_id:
-                continue
-            fields = column.get("fields", {})
-            if fields.get("isFormula"):
-                continue
-            writable_ids.add(str(col_id))
-        return writable_ids
+        return set(self.schema.get(table).writable_column_ids)
 
     def filter_table_fields(self, table: str, fields: dict) -> dict:
-        columns = self.get_writable_table_columns(table)
+        columns = self.schema.get(table).writable_column_ids
         return {key: value for key, value in fields.items() if key in columns}
 
     def get_ms_table_column_ids(self) -> set[str]:
         return self.get_table_columns("ProductBatchMS")
 
+    @property
+    def process_routing(self) -> ProcessRouting:
+        return process_routing_for(self.costing_client)
+
     def get_process_stage_mapping(self) -> dict[str, dict]:
         # Phase-1 source: ProcessStage + ProcessMaster definitions.
-        try:
-            stage_rows = self.costing_client.get_records("ProcessStage")
-        except Exception:
-            stage_rows = []
-        mapping = {}
-        for record in stage_rows:
-            fields = record.get("fields", {})
-            stage_name = str(fields.get("stage_name") or "").strip()
-            supervisor_role = str(fields.get("resolved_role_name") or fields.get("supervisor_role") or "").strip()
-            if not stage_name or not supervisor_role:
-                continue
-            if stage_name in mapping:
-                continue
-            mapping[stage_name] = {
-                "supervisor_role": supervisor_role,
-                "stage_order_priority": fields.get("seq_no") or fields.get("stage_order_priority"),
-            }
-        return mapping
-
-    def _process_master_indexes(self) -> tuple[dict[int, dict], dict[str, int]]:
-        by_id: dict[int, dict] = {}
-        by_legacy_text: dict[str, int] = {}
-        try:
-            records = self.costing_client.get_records("ProcessMaster")
-        except Exception:
-            return by_id, by_legacy_text
-
-        for record in records:
-            rec_id = record.get("id")
-            if not isinstance(rec_id, int):
-                continue
-            fields = record.get("fields", {})
-            by_id[rec_id] = fields
-            legacy_text = str(fields.get("legacy_process_seq_text") or "").strip()
-            if legacy_text and legacy_text not in by_legacy_text:
-                by_legacy_text[legacy_text] = rec_id
-        return by_id, by_legacy_text
+        return dict(self.process_routing.stage_mapping)
 
     def get_process_seq_ref_id(self, process_seq_value) -> int | None:
-        normalized = self._normalize_ref(process_seq_value)
-        seq_id = self._safe_int(normalized)
-        if seq_id is not None:
-            return seq_id
-
-        legacy_text = str(normalized or "").strip()
-        if not legacy_text:
-            return None
-        _, by_legacy_text = self._process_master_indexes()
-        return by_legacy_text.get(legacy_text)
+        return self.process_routing.seq_id(process_seq_value)
 
     def get_process_display_label(self, process_seq_value) -> str:
-        seq_id = self.get_process_seq_ref_id(process_seq_value)
-        if seq_id is not None:
-            by_id, _ = self._process_master_indexes()
-            fields = by_id.get(seq_id, {})
-            label = str(fields.get("display_label") or "").strip()
-            if label:
-                return label
-            name = str(fields.get("process_name") or "").strip()
-            if name:
-                return name
-        return str(process_seq_value or "").strip()
+        return self.process_routing.display_label(process_seq_value)
 
     def get_process_stage_names(self, process_seq_value) -> list[str]:
-        seq_id = self.get_process_seq_ref_id(process_seq_value)
-        if seq_id is not None:
-            try:
-                records = self.costing_client.get_records("ProcessStage")
-            except Exception:
-                records = []
-            rows: list[tuple[int, int, str]] = []
-            for record in records:
-                fields = record.get("fields", {})
-                row_seq = self._safe_int(self._normalize_ref(fields.get("process_seq_id")))
-                if row_seq != seq_id:
-                    continue
-                stage_name = str(fields.get("stage_name") or "").strip()
-                if not stage_name:
-                    continue
-                seq_no = self._safe_int(fields.get("seq_no")) or 0
-                rows.append((seq_no, int(record.get("id") or 0), stage_name))
-            if rows:
-                rows.sort(key=lambda item: (item[0], item[1]))
-                return [row[2] for row in rows]
-
-        legacy = str(process_seq_value or "").strip()
-        if not legacy:
-            return []
-        return [token.strip() for token in legacy.split(" - ") if token.strip()]
-
-    def get_stage_role_for_process_stage(self, process_seq_value, stage_name: str) -> str:
-        stage_name_clean = str(stage_name or "").strip()
-        if not stage_name_clean:
-            return ""
+        return self.process_routing.stages_for(process_seq_value)
 
-        seq_id = self.get_process_seq_ref_id(process_seq_value)
-        if seq_id is not None:
-            try:
-                records = self.costing_client.get_records("ProcessStage")
-            except Exception:
-                records = []
-            for record in records:
-                fields = record.get("fields", {})
-                row_seq = self._safe_int(self._normalize_ref(fields.get("process_seq_id")))
-                if row_seq != seq_id:
-                    continue
-                row_stage = str(fields.get("stage_name") or "").strip()
-                if row_stage != stage_name_clean:
-                    continue
-                role = str(fields.get("resolved_role_name") or fields.get("supervisor_role") or "").strip()
-                if role:
-                    return role
+    def get_process_stage_ids(self, process_seq_value, stage_name: str) -> tuple[int, ...]:
+        routing = self.process_routing
+        seq_id = routing.seq_id(process_seq_value)
+        if seq_id is None:
+            return ()
+        return routing.stage_ids.get((seq_id, str(stage_name or "").strip()), ())
 
-        mapping = self.get_process_stage_mapping()
-        details = mapping.get(stage_name_clean, {})
-        return str(details.get("supervisor_role") or "").strip()
+    def get_stage_role_for_process_stage(self, process_seq_value, stage_name: str) -> str:
+        return self.process_routing.stage_role(process_seq_value, stage_name)
 
     def get_cnc_rows(self, part_ids: list[int]) -> list[dict]:
         records = self.costing_client.get_records("ProductPartCNCList")
@@ -422,32 +333,101 @@ class ProductionRepo:
         return result
 
     def get_existing_batch_numbers(self) -> list[str]:
-        records = self.costing_client.get_records("ProductBatchMaster")
         batch_numbers = []
-        for record in records:
+        for record in self._batch_table("ProductBatchMaster").records():
             number = record.get("fields", {}).get("batch_no")
             if number:
                 batch_numbers.append(str(number))
         return batch_numbers
 
+    def get_max_batch_sequence(self, month_key: str) -> int:
+        resident = batch_snapshots.peek(self.costing_client, "ProductBatchMaster")
+        if resident is not None:
+            numbers = [str(number) for number in resident.batch_numbers()]
+        else:
+            try:
+                rows = self.costing_client.sql(
+                    "SELECT batch_no FROM ProductBatchMaster WHERE batch_no LIKE ?",
+                    [f"{month_key}-%"],
+                )
+                numbers = [str(row.get("batch_no") or "") for row in rows]
+            except Exception:
+                numbers = self.get_existing_batch_numbers()
+        seq = 0
+        for number in numbers:
+            parts = number.split("-")
+            if len(parts) < 4:
+                continue
+            if parts[0] != month_key:
+                continue
+            try:
+                value = int(parts[-1])
+            except ValueError:
+                continue
+            if value > seq:
+                seq = value
+        return seq
+
+    def _batch_table(self, table: str) -> IndexedBatchTable:
+        return batch_snapshots.get(self.costing_client, table)
+
+    async def _batch_table_async(self, table: str) -> IndexedBatchTable:
+        return await batch_snapshots.get_async(self.async_costing_client, table)
+
+    def _add_batch_rows(self, table: str, rows: list[dict]) -> list[int]:
+        unit = current_unit_of_work()
+        if unit is not None:
+            # The insert drops this update's overlay of the table, so its queued patches go first.
+            unit.flush(self.costing_client.server, self.costing_client.doc_id, table)
+        token = batch_snapshots.write_token(self.costing_client, table)
+        try:
+            response = self.costing_client.add_records(table, rows)
+        except BaseException:
+            batch_snapshots.record_write(self.costing_client, table, token)
+            raise
+        row_ids = [record.get("id") for record in response.get("records", [])]
+        batch_snapshots.record_write(self.costing_client, table, token, lambda snapshot: snapshot.apply_add(row_ids, rows))
+        return [row_id for row_id in row_ids if isinstance(row_id, int)]
+
+    def _patch_batch_rows(self, table: str, updates: list[tuple[int, dict]]) -> None:
+        unit = current_unit_of_work()
+        if unit is not None and getattr(self.costing_client, "use_cache", False):
+            # Visible to this update's reads now, through its private overlay; other readers
+            # only see the rows once the deferred write succeeds (record_write folds them in).
+            batch_snapshots.overlay(self.costing_client, table).apply_patch(updates)
+            unit.defer_patch(
+                self.costing_client._cache_key(table), updates, lambda merged: self._write_batch_rows(table, merged)
+            )
+            return
+        self._write_batch_rows(table, updates)
+
+    def _write_batch_rows(self, table: str, updates: list[tuple[int, dict]]) -> None:
+        token = batch_snapshots.write_token(self.costing_client, table)
+        try:
+            if len(updates) == 1:
+                self.costing_client.patch_record(table, *updates[0])
+            else:
+                self.costing_client.patch_records(table, updates)
+        except BaseException:
+            batch_snapshots.record_write(self.costing_client, table, token)
+            raise
+        batch_snapshots.record_write(self.costing_client, table, token, lambda snapshot: snapshot.apply_patch(updates))
+
     def create_master_batch(self, fields: dict) -> int:
-        response = self.costing_client.add_records("ProductBatchMaster", [fields])
-        records = response.get("records", [])
-        return records[0]["id"]
+        return self._add_batch_rows("ProductBatchMaster", [fields])[0]
 
     def create_ms_rows(self, rows: list[dict]) -> list[int]:
         if not rows:
             return []
-        response = self.costing_client.add_records("ProductBatchMS", rows)
-        return [record.get("id") for record in response.get("records", []) if isinstance(record.get("id"), int)]
+        return self._add_batch_rows("ProductBatchMS", rows)
 
     def create_cnc_rows(self, rows: list[dict]) -> None:
         if rows:
-            self.costing_client.add_records("ProductBatchCNC", rows)
+            self._add_batch_rows("ProductBatchCNC", rows)
 
     def create_store_rows(self, rows: list[dict]) -> None:
         if rows:
-            self.costing_client.add_records("ProductBatchStore", rows)
+            self._add_batch_rows("ProductBatchStore", rows)
 
     def add_status_history(
         self,
@@ -459,229 +439,206 @@ class ProductionRepo:
         updated_by,
         remarks: str = "",
     ) -> None:
-        self.costing_client.add_records(
-            "BatchStatusHistory",
-            [
-                {
-                    "batch_id": batch_id,
-                    "entity_type": entity_type,
-                    "entity_id": entity_id,
-                    "old_status": old_status or "",
-                    "new_status": new_status or "",
-                    "updated_by": updated_by,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "remarks": remarks or "",
-                }
-            ],
+        self.status_history_queue.enqueue(
+            {
+                "batch_id": batch_id,
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "old_status": old_status or "",
+                "new_status": new_status or "",
+                "updated_by": updated_by,
+                "timestamp": datetime.utcnow().isoformat(),
+                "remarks": remarks or "",
+            }
         )
 
+    @property
+    def status_history_queue(self) -> WriteBehindQueue:
+        return write_behind_for(self.costing_client, "BatchStatusHistory")
+
+    def flush_status_history(self) -> bool:
+        return self.status_history_queue.flush()
+
     def get_master_by_id(self, batch_id: int) -> dict | None:
-        records = self.costing_client.get_records("ProductBatchMaster")
-        for record in records:
-            if record.get("id") == batch_id:
-                return record
-        return None
+        return self._batch_table("ProductBatchMaster").get(batch_id)
 
     def get_master_by_batch_no(self, batch_no: str) -> dict | None:
-        records = self.costing_client.get_records("ProductBatchMaster")
-        for record in records:
-            if record.get("fields", {}).get("batch_no") == batch_no:
-                return record
-        return None
+        return self._batch_table("ProductBatchMaster").master_by_batch_no(batch_no)
 
     def get_all_master_batches(self) -> list[dict]:
-        return self.costing_client.get_records("ProductBatchMaster")
+        return self._batch_table("ProductBatchMaster").records()
 
     def list_pending_approvals(self) -> list[dict]:
-        records = self.costing_client.get_records("ProductBatchMaster")
-        pending = []
-        for record in records:
-            fields = record.get("fields", {})
-            if fields.get("approval_status") == "Pending Approval":
-                pending.append(record)
+        pending = self._batch_table("ProductBatchMaster").rows_with_status("Pending Approval")
         pending.sort(key=lambda r: r.get("id", 0))
         return pending
 
     def update_master(self, batch_id: int, fields: dict) -> None:
-        self.costing_client.patch_record("ProductBatchMaster", batch_id, fields)
+        self._patch_batch_rows("ProductBatchMaster", [(batch_id, fields)])
 
     def update_master_by_ids(self, batch_ids: list[int], fields: dict) -> None:
-        for batch_id in batch_ids:
-            self.update_master(batch_id, fields)
+        if batch_ids:
+            self._patch_batch_rows("ProductBatchMaster", [(batch_id, fields) for batch_id in batch_ids])
 
     def update_ms(self, row_id: int, fields: dict) -> None:
-        self.costing_client.patch_record("ProductBatchMS", row_id, fields)
+        self._patch_batch_rows("ProductBatchMS", [(row_id, fields)])
+
+    def update_ms_rows(self, updates: list[tuple[int, dict]]) -> None:
+        if updates:
+            self._patch_batch_rows("ProductBatchMS", list(updates))
+
+    def list_ms_rows(self) -> list[dict]:
+        return self._batch_table("ProductBatchMS").records()
 
     def list_ms_rows_for_batch(self, batch_id: int) -> list[dict]:
-        records = self.costing_client.get_records("ProductBatchMS")
-        result = []
-        for record in records:
-            fields = record.get("fields", {})
-            row_batch = self._normalize_ref(fields.get("batch_id"))
-            if row_batch == batch_id:
-                result.append(record)
-        return result
+        return self._batch_table("ProductBatchMS").rows_for_batch(batch_id)
 
     def get_ms_row_by_id(self, row_id: int) -> dict | None:
-        records = self.costing_client.get_records("ProductBatchMS")
-        for record in records:
-            if record.get("id") == row_id:
-                return record
-        return None
+        return self._batch_table("ProductBatchMS").get(row_id)
+
+    def get_child_row(self, table: str, row_id: int) -> dict | None:
+        return self._batch_table(table).get(row_id)
+
+    async def get_master_by_id_async(self, batch_id: int) -> dict | None:
+        return (await self._batch_table_async("ProductBatchMaster")).get(batch_id)
+
+    async def get_ms_row_by_id_async(self, row_id: int) -> dict | None:
+        return (await self._batch_table_async("ProductBatchMS")).get(row_id)
+
+    async def cached_attachment_path_async(self, attachment_id: int) -> Path:
+        client = self.async_costing_client
+        return await attachment_cache().fetch_async(
+            client.doc_id,
+            attachment_id,
+            lambda handle: client.stream_attachment(attachment_id, handle),
+        )
 
     def attach_pdf_to_master(self, batch_id: int, file_path: str, field_name: str = "ms_cutlist_pdf") -> None:
-        attachment_id = self.costing_client.upload_attachment(file_path)
+        attachment_id = self.costing_client.upload_attachment_once(file_path)
         self.update_master(batch_id, {field_name: ["L", attachment_id]})
 
     def attach_pdf_to_ms_row(self, row_id: int, file_path: str, field_name: str = "row_cutlist_pdf") -> None:
-        attachment_id = self.costing_client.upload_attachment(file_path)
-        self.update_ms(row_id, {field_name: ["L", attachment_id]})
+        self.attach_pdf_to_ms_rows([row_id], file_path, field_name=field_name)
+
+    def attach_pdf_to_ms_rows(self, row_ids: list[int], file_path: str, field_name: str = "row_cutlist_pdf") -> None:
+        if not row_ids:
+            return
+        attachment_id = self.costing_client.upload_attachment_once(file_path)
+        self.update_ms_rows([(row_id, {field_name: ["L", attachment_id]}) for row_id in row_ids])
 
     def update_ms_for_batch(self, batch_id: int, fields: dict) -> None:
-        records = self.costing_client.get_records("ProductBatchMS")
-        for record in records:
-            row_batch = self._normalize_ref(record.get("fields", {}).get("batch_id"))
-            if row_batch != batch_id:
-                continue
-            self.update_ms(record.get("id"), fields)
+        self.update_ms_rows([(record.get("id"), fields) for record in self.list_ms_rows_for_batch(batch_id)])
 
     def update_cnc(self, row_id: int, fields: dict) -> None:
-        self.costing_client.patch_record("ProductBatchCNC", row_id, fields)
+        self._patch_batch_rows("ProductBatchCNC", [(row_id, fields)])
 
     def update_store(self, row_id: int, fields: dict) -> None:
-        self.costing_client.patch_record("ProductBatchStore", row_id, fields)
+        self._patch_batch_rows("ProductBatchStore", [(row_id, fields)])
+
+    @staticmethod
+    def _coalesce_sql(columns: set[str], names: tuple[str, ...]) -> str:
+        present = [f"NULLIF({name}, '')" for name in names if name in columns]
+        if len(present) > 1:
+            return f"COALESCE({', '.join(present)})"
+        return present[0] if present else ""
+
+    def count_child_statuses(self, batch_id: int) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        resident = [batch_snapshots.peek(self.costing_client, table) for table in self.CHILD_BATCH_TABLES]
+        # Count from memory when every child table is indexed already, or inside a unit of
+        # work, where the aggregate query would force this update's queued patches out early.
+        if current_unit_of_work() is not None or all(snapshot is not None for snapshot in resident):
+            for status in self._scan_child_statuses(batch_id):
+                counts[status] = counts.get(status, 0) + 1
+            return counts
+        try:
+            selects = []
+            args = []
+            for table in self.CHILD_BATCH_TABLES:
+                columns = self.get_table_columns(table)
+                status_expr = self._coalesce_sql(columns, ("status", "current_status"))
+                if not status_expr or "batch_id" not in columns:
+                    continue
+                selects.append(f"SELECT {status_expr} AS status FROM {table} WHERE batch_id = ?")
+                args.append(batch_id)
+            if not selects:
+                return counts
+            rows = self.costing_client.sql(
+                "SELECT status, COUNT(*) AS row_count FROM ("
+                + " UNION ALL ".join(selects)
+                + ") WHERE status IS NOT NULL GROUP BY status",
+                args,
+            )
+        except Exception:
+            for status in self._scan_child_statuses(batch_id):
+                counts[status] = counts.get(status, 0) + 1
+            return counts
+        for row in rows:
+            status = str(row.get("status") or "")
+            if status:
+                counts[status] = counts.get(status, 0) + int(row.get("row_count") or 0)
+        return counts
 
     def list_child_statuses(self, batch_id: int) -> list[str]:
         all_statuses = []
-        for table in ("ProductBatchMS", "ProductBatchCNC", "ProductBatchStore"):
-            records = self.costing_client.get_records(table)
-            for record in records:
-                fields = record.get("fields", {})
-                if self._normalize_ref(fields.get("batch_id")) != batch_id:
-                    continue
-                status = fields.get("status") or fields.get("current_status")
+        for status, count in self.count_child_statuses(batch_id).items():
+            all_statuses.extend([status] * count)
+        return all_statuses
+
+    def _scan_child_statuses(self, batch_id: int) -> list[str]:
+        all_statuses = []
+        for table in self.CHILD_BATCH_TABLES:
+            snapshot = self._batch_table(table)
+            for row in snapshot.rows_for_batch(batch_id):
+                status = snapshot.status_of(row)
                 if status:
-                    all_statuses.append(str(status))
+                    all_statuses.append(status)
         return all_statuses
 
+    @property
+    def user_directory(self) -> PulseUserDirectory:
+        return pulse_user_directory(self.pulse_client)
+
+    @property
+    def costing_user_directory(self) -> CostingUserDirectory:
+        return costing_user_directory(self.costing_client)
+
+    @property
+    def ms_visibility(self) -> MsVisibilityIndex:
+        return ms_visibility_for(self.costing_client)
+
+    @property
+    def stage_timelines(self) -> StageTimelineIndex:
+        # Include history rows still waiting in the write-behind buffer.
+        self.flush_status_history()
+        return stage_timelines_for(self.costing_client)
+
     def get_users(self) -> list[dict]:
-        return self.pulse_client.get_records("Users")
+        return self.user_directory.users
 
     def get_roles(self) -> list[dict]:
-        return self.pulse_client.get_records("Roles")
+        return self.user_directory.tables["Roles"]
 
     def get_user_role_assignments(self) -> list[dict]:
-        try:
-            return self.pulse_client.get_records("UserRoleAssignment")
-        except Exception:
-            return []
-
-    def _role_name_by_id(self) -> dict[int, str]:
-        return {
-            row.get("id"): str(row.get("fields", {}).get("Role_Name") or "").strip()
-            for row in self.get_roles()
-            if isinstance(row.get("id"), int)
-        }
-
-    def _user_record_by_user_id(self) -> dict[str, dict]:
-        mapping: dict[str, dict] = {}
-        for user in self.get_users():
-            fields = user.get("fields", {})
-            user_id = str(fields.get("User_ID") or "").strip()
-            if user_id:
-                mapping[user_id] = user
-            telegram_id = str(fields.get("Telegram_ID") or "").strip()
-            if telegram_id and telegram_id not in mapping:
-                mapping[telegram_id] = user
-        return mapping
+        return self.user_directory.tables["UserRoleAssignment"]
 
     def get_role_names_by_user_id(self, user_id: str) -> list[str]:
-        target = str(user_id or "").strip()
-        if not target:
+        if not str(user_id or "").strip():
             return []
-
-        role_name_by_id = self._role_name_by_id()
-        user_by_user_id = self._user_record_by_user_id()
-        target_user = user_by_user_id.get(target)
-        if not target_user:
-            return []
-
-        role_names: list[str] = []
-        seen: set[str] = set()
-
-        # Default/legacy single-role source from Users.Role.
-        user_role = self._normalize_ref(target_user.get("fields", {}).get("Role"))
-        if isinstance(user_role, int):
-            role_name = str(role_name_by_id.get(user_role) or "").strip()
-            if role_name and role_name not in seen:
-                seen.add(role_name)
-                role_names.append(role_name)
-
-        # Preferred multi-role source (when present).
-        user_rec_id = target_user.get("id")
-        for row in self.get_user_role_assignments():
-            fields = row.get("fields", {})
-            if not bool(fields.get("Active", True)):
-                continue
-            user_ref = self._normalize_ref(fields.get("User"))
-            if isinstance(user_ref, int) and isinstance(user_rec_id, int):
-                if user_ref != user_rec_id:
-                    continue
-            else:
-                user_ref_text = str(user_ref or "").strip()
-                if user_ref_text not in {target, str(user_rec_id or "").strip()}:
-                    continue
-            role_ref = self._normalize_ref(fields.get("Role"))
-            if not isinstance(role_ref, int):
-                continue
-            role_name = str(role_name_by_id.get(role_ref) or "").strip()
-            if role_name and role_name not in seen:
-                seen.add(role_name)
-                role_names.append(role_name)
-
-        return role_names
+        return self.user_directory.role_names_for(user_id)
 
     def get_telegram_by_user_id(self, user_id: str) -> str | None:
-        users = self.get_users()
-        for user in users:
-            fields = user.get("fields", {})
-            if fields.get("User_ID") == user_id and fields.get("Active"):
-                return str(fields.get("Telegram_ID"))
-        return None
+        return self.user_directory.telegram_by_user_id.get(str(user_id))
 
     def get_role_user_telegrams(self, role_names: list[str]) -> list[str]:
-        roles = self.get_roles()
-        role_ids = {r.get("id") for r in roles if r.get("fields", {}).get("Role_Name") in role_names}
-
-        users = self.get_users()
-        telegram_ids = []
-        for user in users:
-            fields = user.get("fields", {})
-            if not fields.get("Active"):
-                continue
-            role_ref = self._normalize_ref(fields.get("Role"))
-            if role_ref in role_ids and fields.get("Telegram_ID"):
-                telegram_ids.append(str(fields.get("Telegram_ID")))
-        return telegram_ids
+        if not role_names:
+            return []
+        return self.user_directory.active_primary_role_telegrams(role_names)
 
     def get_active_users_by_role_names(self, role_names: list[str]) -> list[dict]:
         if not role_names:
             return []
-        target = {str(name or "").strip() for name in role_names if str(name or "").strip()}
-        if not target:
-            return []
-        users = self.get_users()
-        result = []
-        for user in users:
-            fields = user.get("fields", {})
-            if not fields.get("Active"):
-                continue
-            user_id = str(fields.get("User_ID") or "").strip()
-            user_roles = set(self.get_role_names_by_user_id(user_id))
-            if not (user_roles & target):
-                continue
-            result.append(user)
-        return result
+        return self.user_directory.active_users_with_role_names(role_names)
 
     def get_role_name_by_user_id(self, user_id: str) -> str:
         roles = self.get_role_names_by_user_id(user_id)
@@ -693,14 +650,7 @@ class ProductionRepo:
     def get_costing_user_ref_by_user_id(self, user_id: str) -> int | None:
         if not user_id:
             return None
-        records = self.costing_client.get_records("Users")
-        for record in records:
-            fields = record.get("fields", {})
-            if str(fields.get("User_ID") or "") == str(user_id):
-                rec_id = record.get("id")
-                if isinstance(rec_id, int):
-                    return rec_id
-        return None
+        return self.costing_user_directory.record_id_by_user_id.get(str(user_id).strip())
 
     def list_batches_pending_schedule_reminder(self, threshold_days: int) -> list[dict]:
         now = datetime.utcnow()
@@ -732,27 +682,54 @@ class ProductionRepo:
 
         return pending
 
-    def list_supervisor_schedule_pending_batches(self, threshold_days: int = 0) -> list[dict]:
-        now = datetime.utcnow()
-        masters = self.get_all_master_batches()
-        ms_rows = self.costing_client.get_records("ProductBatchMS")
+    def _open_ms_stage_groups(self) -> list[dict]:
+        columns = self.get_table_columns("ProductBatchMS")
+        status_expr = self._coalesce_sql(columns, ("current_status", "status")) or "''"
+        role_expr = "current_stage_role_name" if "current_stage_role_name" in columns else "''"
+        return self.costing_client.sql(
+            f"SELECT batch_id, {role_expr} AS role_name, process_seq, current_stage_name, COUNT(*) AS row_count "
+            "FROM ProductBatchMS "
+            f"WHERE COALESCE({status_expr}, '') != 'Cutting Completed' "
+            "GROUP BY batch_id, role_name, process_seq, current_stage_name"
+        )
+
+    def get_pending_ms_roles_by_batch(self) -> dict[int, set[str]]:
+        try:
+            groups = self._open_ms_stage_groups()
+        except Exception:
+            groups = []
+            for row in self.costing_client.get_table("ProductBatchMS"):
+                fields = row.get("fields", {})
+                status = str(fields.get("current_status") or fields.get("status") or "")
+                if status == "Cutting Completed":
+                    continue
+                groups.append(
+                    {
+                        "batch_id": fields.get("batch_id"),
+                        "role_name": fields.get("current_stage_role_name"),
+                        "process_seq": fields.get("process_seq"),
+                        "current_stage_name": fields.get("current_stage_name"),
+                    }
+                )
 
         current_roles_by_batch: dict[int, set[str]] = {}
-        for row in ms_rows:
-            fields = row.get("fields", {})
-            batch_id = self._normalize_ref(fields.get("batch_id"))
+        for group in groups:
+            batch_id = self._normalize_ref(group.get("batch_id"))
             if not isinstance(batch_id, int):
                 continue
-            status = str(fields.get("current_status") or fields.get("status") or "")
-            if status == "Cutting Completed":
-                continue
-            role = str(fields.get("current_stage_role_name") or "").strip()
+            role = str(group.get("role_name") or "").strip()
             if not role:
-                stage_name = str(fields.get("current_stage_name") or "").strip()
-                role = self.get_stage_role_for_process_stage(fields.get("process_seq"), stage_name)
+                stage_name = str(group.get("current_stage_name") or "").strip()
+                role = self.get_stage_role_for_process_stage(group.get("process_seq"), stage_name)
             if not role:
                 continue
             current_roles_by_batch.setdefault(batch_id, set()).add(role)
+        return current_roles_by_batch
+
+    def list_supervisor_schedule_pending_batches(self, threshold_days: int = 0) -> list[dict]:
+        now = datetime.utcnow()
+        masters = self.get_all_master_batches()
+        current_roles_by_batch = self.get_pending_ms_roles_by_batch()
 
         pending = []
         for record in masters:
@@ -791,7 +768,7 @@ class ProductionRepo:
 
     def list_stage_rows_pending_reminder(self, threshold_days: int) -> list[dict]:
         now = datetime.utcnow()
-        rows = self.costing_client.get_records("ProductBatchMS")
+        rows = self.costing_client.get_table("ProductBatchMS")
         pending: list[dict] = []
         for record in rows:
             fields = record.get("fields", {})
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from pulse.config import GRIST_SCHEMA_TTL_SECONDS
+
+
+class TableSchema:
+    """Column metadata for one Grist table, as returned by ``get_columns``."""
+
+    def __init__(self, columns: list[dict]):
+        self.columns: dict[str, dict] = {}
+        for column in columns:
+            col_id = column.get("id")
+            if col_id:
+                self.columns[str(col_id)] = dict(column.get("fields") or {})
+        self.column_ids = frozenset(self.columns)
+        self.writable_column_ids = frozenset(
+            col_id for col_id, fields in self.columns.items() if not fields.get("isFormula")
+        )
+
+    def column_type(self, column_id: str) -> str:
+        return str(self.columns.get(str(column_id), {}).get("type") or "")
+
+
+class SchemaRegistry:
+    """Loads each table's columns once and serves schema checks from memory until the TTL lapses."""
+
+    def __init__(self, client, ttl: float = GRIST_SCHEMA_TTL_SECONDS, clock=time.monotonic):
+        self.client = client
+        self.ttl = float(ttl)
+        self._clock = clock
+        self._schemas: dict[str, tuple[float, TableSchema]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, table: str) -> TableSchema:
+        with self._lock:
+            entry = self._schemas.get(table)
+        if entry is not None and self._clock() - entry[0] <= self.ttl:
+            return entry[1]
+        schema = TableSchema(self.client.get_columns(table))
+        with self._lock:
+            self._schemas[table] = (self._clock(), schema)
+        return schema
+
+    def invalidate(self, table: str | None = None) -> None:
+        with self._lock:
+            if table is None:
+                self._schemas.clear()
+            else:
+                self._schemas.pop(table, None)
+
+
+_registries: dict = {}
+_registries_lock = threading.Lock()
+
+
+def schema_registry_for(client) -> SchemaRegistry:
+    """Return the process-wide registry for ``client``'s document."""
+    server = getattr(client, "server", None)
+    doc_id = getattr(client, "doc_id", None)
+    # Clients without a doc identity (test doubles) get a registry of their own.
+    key = (server, doc_id) if server and doc_id else client
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = SchemaRegistry(client)
+            _registries[key] = registry
+        return registry
+
+
+def clear_schema_registries() -> None:
+    with _registries_lock:
+        _registries.clear()
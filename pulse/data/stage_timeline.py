@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from pulse.core.table_cache import snapshot_cache
+
+_HISTORY_TABLE = "BatchStatusHistory"
+_HISTORY_COLUMNS = ("entity_type", "batch_id", "entity_id", "new_status", "timestamp")
+_FINISHED_STATUSES = ("cutting completed", "done", "completed")
+
+
+def _ref_id(value) -> int | None:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, list):
+        items = value[1:] if value and value[0] == "L" else value
+        value = items[0] if items else None
+    if isinstance(value, dict):
+        value = value.get("id") or value.get("record_id") or value.get("ref")
+    text = str(value or "").strip()
+    return int(text) if text.isdigit() else None
+
+
+def _history_columns(history) -> list[list]:
+    if hasattr(history, "column"):
+        return [history.column(name) for name in _HISTORY_COLUMNS]
+    fields = [record.get("fields", {}) for record in history]
+    return [[row.get(name) for row in fields] for name in _HISTORY_COLUMNS]
+
+
+def _stage_key(value) -> str:
+    return str(value or "").strip().lower()
+
+
+class RowTimeline:
+    """When one MS row first entered each stage and first finished, as raw history timestamps.
+
+    A stage is entered by the first ``"<stage> Pending"`` or ``"In <stage>"``
+    status; it is completed when the row enters the next stage, or, for the
+    last stage, on the first completed status.
+    """
+
+    __slots__ = ("entered", "finished", "has_finished")
+
+    def __init__(self):
+        self.entered: dict[str, object] = {}
+        self.finished = None
+        self.has_finished = False
+
+    def add(self, new_status, timestamp) -> None:
+        status = _stage_key(new_status)
+        if status.endswith(" pending"):
+            self.entered.setdefault(status[: -len(" pending")], timestamp)
+        if status.startswith("in "):
+            self.entered.setdefault(status[len("in "):], timestamp)
+        if not self.has_finished and status in _FINISHED_STATUSES:
+            self.finished = timestamp
+            self.has_finished = True
+
+    def started(self, stage_name: str):
+        key = _stage_key(stage_name)
+        return self.entered.get(key) if key else None
+
+    def completed(self, stage_name: str, next_stage: str = ""):
+        next_key = _stage_key(next_stage)
+        if next_key:
+            return self.entered.get(next_key)
+        return self.finished
+
+
+_EMPTY = RowTimeline()
+
+
+class StageTimelineIndex:
+    """Every MS row's stage timeline, folded from BatchStatusHistory.
+
+    History is grouped by batch in one pass; a batch's rows are folded the
+    first time the batch is asked for, walking its entries once in timestamp
+    order (ties keep table order), so each row's first stage entries and
+    completion are known without rescanning its history per stage.
+    """
+
+    def __init__(self, history, version: tuple = (), loaded_at: float = 0.0):
+        self.version = version
+        self.loaded_at = loaded_at
+        self._columns = _history_columns(history)
+        self._positions: dict[int, list[int]] = {}
+        self._rows: dict[int, dict[int, RowTimeline]] = {}
+        self._timestamps: dict[int, list] = {}
+
+        entity_types, batch_refs = self._columns[0], self._columns[1]
+        for pos, entity_type in enumerate(entity_types):
+            if entity_type != "MS" and str(entity_type or "").strip() != "MS":
+                continue
+            batch_id = _ref_id(batch_refs[pos])
+            if batch_id is not None:
+                self._positions.setdefault(batch_id, []).append(pos)
+
+    def _fold(self, batch_id: int) -> dict[int, RowTimeline]:
+        rows = self._rows.get(batch_id)
+        if rows is not None:
+            return rows
+        _, _, entity_refs, statuses, timestamps = self._columns
+        positions = sorted(self._positions.get(batch_id, ()), key=lambda pos: (str(timestamps[pos] or ""), pos))
+        rows = {}
+        folded = []
+        for pos in positions:
+            row_id = _ref_id(entity_refs[pos])
+            if row_id is None:
+                continue
+            timeline = rows.get(row_id)
+            if timeline is None:
+                timeline = rows[row_id] = RowTimeline()
+            timeline.add(statuses[pos], timestamps[pos])
+            folded.append(timestamps[pos])
+        self._timestamps[batch_id] = folded
+        self._rows[batch_id] = rows
+        return rows
+
+    def row(self, batch_id: int, row_id) -> RowTimeline:
+        return self._fold(batch_id).get(row_id, _EMPTY)
+
+    def for_batch(self, batch_id: int) -> dict[int, RowTimeline]:
+        return self._fold(batch_id)
+
+    def timestamps(self, batch_id: int) -> list:
+        """Raw timestamps of every MS history row for ``batch_id``."""
+        self._fold(batch_id)
+        return self._timestamps[batch_id]
+
+
+_indexes: dict[tuple, StageTimelineIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def stage_timelines_for(client, clock=time.monotonic) -> StageTimelineIndex:
+    """Return the stage timelines for ``client``'s doc, refolding them when the history table changed.
+
+    Reused until BatchStatusHistory's snapshot-cache TTL lapses or a write bumps
+    its generation; clients without the snapshot cache fold on every call.
+    """
+    cached = bool(getattr(client, "use_cache", False))
+    key = client._cache_key(_HISTORY_TABLE) if cached else None
+    version = (snapshot_cache.generation(key),) if key is not None else ()
+    base = key[:2] if key is not None else None
+    if base is not None:
+        with _indexes_lock:
+            index = _indexes.get(base)
+        if index is not None and index.version == version and clock() - index.loaded_at <= snapshot_cache.ttl_for(_HISTORY_TABLE):
+            return index
+
+    history = client.get_table(_HISTORY_TABLE)
+    index = StageTimelineIndex(history, version, clock())
+    if base is not None and not getattr(history, "stale", False):
+        with _indexes_lock:
+            _indexes[base] = index
+    return index
+
+
+def clear_stage_timelines() -> None:
+    with _indexes_lock:
+        _indexes.clear()
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+from pulse.core.grist_client import is_stale
+from pulse.core.table_cache import snapshot_cache
+
+
+def _ref(value):
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def _text(value) -> str:
+    return str(value or "").strip()
+
+
+class PulseUserDirectory:
+    """Pulse Users, Roles and UserRoleAssignment joined once into lookup indexes.
+
+    A user's roles are their ``Users.Role`` followed by every active
+    UserRoleAssignment row pointing at them, de-duplicated in that order.
+    """
+
+    TABLES = ("Users", "Roles", "UserRoleAssignment")
+    OPTIONAL = frozenset({"UserRoleAssignment"})
+
+    def __init__(self, users: list[dict], roles: list[dict], assignments: list[dict]):
+        self.users = list(users)
+        self.tables = {"Users": users, "Roles": roles, "UserRoleAssignment": assignments}
+        self._positions = {user.get("id"): index for index, user in enumerate(self.users)}
+
+        self.role_fields_by_id: dict[int, dict] = {}
+        self.role_name_by_id: dict[int, str] = {}
+        self.role_id_by_id: dict[int, str] = {}
+        self.role_ref_by_code: dict = {}
+        for row in roles:
+            rec_id = row.get("id")
+            fields = row.get("fields", {})
+            self.role_ref_by_code[fields.get("Role_ID")] = rec_id
+            if isinstance(rec_id, int):
+                self.role_fields_by_id[rec_id] = fields
+                self.role_name_by_id[rec_id] = _text(fields.get("Role_Name"))
+                self.role_id_by_id[rec_id] = _text(fields.get("Role_ID"))
+
+        self.user_by_record_id: dict[int, dict] = {}
+        self.user_by_user_id: dict[str, dict] = {}
+        self.user_by_key: dict[str, dict] = {}
+        self.active_user_by_telegram_id: dict[str, dict] = {}
+        self.telegram_by_user_id: dict[str, str] = {}
+        for user in self.users:
+            fields = user.get("fields", {})
+            rec_id = user.get("id")
+            if isinstance(rec_id, int):
+                self.user_by_record_id[rec_id] = user
+            user_id = _text(fields.get("User_ID"))
+            if user_id:
+                self.user_by_user_id[user_id] = user
+                self.user_by_key[user_id] = user
+            if fields.get("Active"):
+                self.active_user_by_telegram_id.setdefault(str(fields.get("Telegram_ID")), user)
+                if fields.get("User_ID") is not None:
+                    self.telegram_by_user_id.setdefault(str(fields.get("User_ID")), str(fields.get("Telegram_ID")))
+        for user in self.users:
+            telegram_id = _text(user.get("fields", {}).get("Telegram_ID"))
+            if telegram_id:
+                self.user_by_key.setdefault(telegram_id, user)
+
+        self.role_ids_by_user_record: dict[int, set[int]] = {}
+        assigned: dict[int, list[int]] = {}
+        for row in assignments:
+            fields = row.get("fields", {})
+            if not bool(fields.get("Active", True)):
+                continue
+            role_ref = _ref(fields.get("Role"))
+            if not isinstance(role_ref, int):
+                continue
+            user_ref = _ref(fields.get("User"))
+            if isinstance(user_ref, int):
+                self.role_ids_by_user_record.setdefault(user_ref, set()).add(role_ref)
+                assigned.setdefault(user_ref, []).append(role_ref)
+                continue
+            # Text references name the user by User_ID, Telegram_ID or row id.
+            target = self.user_by_key.get(_text(user_ref))
+            target_id = target.get("id") if target else None
+            if target_id is None and _text(user_ref).isdigit():
+                target_id = int(_text(user_ref))
+            if isinstance(target_id, int):
+                assigned.setdefault(target_id, []).append(role_ref)
+
+        self.role_names_by_record: dict[int, tuple[str, ...]] = {}
+        self.record_ids_by_role_ref: dict[int, list[int]] = {}
+        self.record_ids_by_role_name: dict[str, list[int]] = {}
+        for user in self.users:
+            rec_id = user.get("id")
+            if not isinstance(rec_id, int):
+                continue
+            primary = _ref(user.get("fields", {}).get("Role"))
+            refs = ([primary] if isinstance(primary, int) else []) + assigned.get(rec_id, [])
+            names: dict[str, None] = {}
+            for role_ref in refs:
+                name = self.role_name_by_id.get(role_ref, "")
+                if name:
+                    names[name] = None
+            self.role_names_by_record[rec_id] = tuple(names)
+            for name in names:
+                self.record_ids_by_role_name.setdefault(name, []).append(rec_id)
+            ref_ids = set(self.role_ids_by_user_record.get(rec_id, ()))
+            if isinstance(primary, int):
+                ref_ids.add(primary)
+            for role_ref in ref_ids:
+                self.record_ids_by_role_ref.setdefault(role_ref, []).append(rec_id)
+
+    def user_for(self, user_id_or_telegram) -> dict | None:
+        return self.user_by_key.get(_text(user_id_or_telegram))
+
+    def role_names_for(self, user_id_or_telegram) -> list[str]:
+        user = self.user_for(user_id_or_telegram)
+        if not user:
+            return []
+        return list(self.role_names_by_record.get(user.get("id"), ()))
+
+    def users_with_role_refs(self, role_refs) -> list[dict]:
+        """Users holding any of ``role_refs`` as primary or assigned role, in Users order."""
+        record_ids: set[int] = set()
+        for role_ref in role_refs:
+            record_ids.update(self.record_ids_by_role_ref.get(role_ref, ()))
+        return [self.user_by_record_id[rec_id] for rec_id in sorted(record_ids, key=self._position)]
+
+    def active_users_with_role_names(self, role_names) -> list[dict]:
+        record_ids: set[int] = set()
+        for name in role_names:
+            record_ids.update(self.record_ids_by_role_name.get(_text(name), ()))
+        result = []
+        for rec_id in sorted(record_ids, key=self._position):
+            user = self.user_by_record_id[rec_id]
+            fields = user.get("fields", {})
+            # Roles are looked up by User_ID, so users without one never match.
+            if fields.get("Active") and self.user_for(fields.get("User_ID")) is user:
+                result.append(user)
+        return result
+
+    def active_primary_role_telegrams(self, role_names) -> list[str]:
+        role_ids = {
+            rec_id for rec_id, fields in self.role_fields_by_id.items() if fields.get("Role_Name") in role_names
+        }
+        telegram_ids = []
+        for user in self.users:
+            fields = user.get("fields", {})
+            if fields.get("Active") and _ref(fields.get("Role")) in role_ids and fields.get("Telegram_ID"):
+                telegram_ids.append(str(fields.get("Telegram_ID")))
+        return telegram_ids
+
+    def _position(self, rec_id: int) -> int:
+        return self._positions.get(rec_id, 0)
+
+
+class CostingUserDirectory:
+    """The Costing doc's Users table indexed by row id and User_ID."""
+
+    TABLES = ("Users",)
+    OPTIONAL = frozenset()
+
+    def __init__(self, users: list[dict]):
+        self.users = list(users)
+        self.tables = {"Users": users}
+        self.user_by_record_id: dict[int, dict] = {}
+        self.user_by_user_id: dict[str, dict] = {}
+        self.record_id_by_user_id: dict[str, int] = {}
+        self.user_id_by_record_id: dict[int, str] = {}
+        self.user_ids: dict[str, str] = {}
+        self.name_by_record_id: dict[int, str] = {}
+        self.name_by_user_id: dict[str, str] = {}
+        for user in self.users:
+            rec_id = user.get("id")
+            fields = user.get("fields", {})
+            user_id = _text(fields.get("User_ID"))
+            name = _text(fields.get("Name") or fields.get("user_name") or user_id or rec_id)
+            if isinstance(rec_id, int):
+                self.user_by_record_id[rec_id] = user
+                self.user_id_by_record_id[rec_id] = user_id
+                self.name_by_record_id[rec_id] = name
+                if user_id:
+                    self.record_id_by_user_id.setdefault(user_id, rec_id)
+            if user_id:
+                self.user_by_user_id[user_id] = user
+                self.user_ids[user_id] = user_id
+                self.name_by_user_id[user_id] = name
+
+    def user_for(self, ref_or_user_id) -> dict | None:
+        value = _ref(ref_or_user_id)
+        if isinstance(value, int) and value in self.user_by_record_id:
+            return self.user_by_record_id[value]
+        return self.user_by_user_id.get(_text(value))
+
+
+class _Entry:
+    def __init__(self, directory, versions: dict[str, tuple]):
+        self.directory = directory
+        self.versions = versions
+
+
+_entries: dict[tuple, _Entry] = {}
+_entries_lock = threading.Lock()
+
+
+def _base(client, kind) -> tuple | None:
+    if not getattr(client, "use_cache", False):
+        return None
+    return client._cache_key(kind.TABLES[0])[:2] + (kind.__name__,)
+
+
+def _plan(client, kind, clock) -> tuple[tuple | None, _Entry | None, list[str]]:
+    base = _base(client, kind)
+    if base is None:
+        return None, None, list(kind.TABLES)
+    with _entries_lock:
+        entry = _entries.get(base)
+    if entry is None:
+        return base, None, list(kind.TABLES)
+    now = clock()
+    stale = []
+    for table in kind.TABLES:
+        version = entry.versions.get(table)
+        ttl = snapshot_cache.ttl_for(table)
+        if (
+            version is None
+            or version[0] != snapshot_cache.generation(client._cache_key(table))
+            or ttl <= 0
+            or now - version[1] > ttl
+        ):
+            stale.append(table)
+    return base, entry, stale
+
+
+def _commit(client, kind, base, entry, loaded: dict, generations: dict, clock):
+    tables = dict(entry.directory.tables) if entry is not None else {}
+    versions = dict(entry.versions) if entry is not None else {}
+    now = clock()
+    for table, (records, ok) in loaded.items():
+        tables[table] = records
+        # Failed or stale reads are used once but retried on the next lookup.
+        versions[table] = (generations[table], now) if ok and not is_stale(records) else None
+    directory = kind(*(tables[table] for table in kind.TABLES))
+    if base is not None:
+        with _entries_lock:
+            _entries[base] = _Entry(directory, versions)
+    return directory
+
+
+def _directory(client, kind, clock=time.monotonic):
+    base, entry, stale = _plan(client, kind, clock)
+    if not stale:
+        return entry.directory
+    generations = {
+        table: snapshot_cache.generation(client._cache_key(table)) if base is not None else 0 for table in stale
+    }
+    loaded = {}
+    for table in stale:
+        try:
+            loaded[table] = (client.get_records(table), True)
+        except Exception:
+            if table not in kind.OPTIONAL:
+                raise
+            loaded[table] = ([], False)
+    return _commit(client, kind, base, entry, loaded, generations, clock)
+
+
+async def _directory_async(client, kind, clock=time.monotonic):
+    base, entry, stale = _plan(client, kind, clock)
+    if not stale:
+        return entry.directory
+    generations = {
+        table: snapshot_cache.generation(client._cache_key(table)) if base is not None else 0 for table in stale
+    }
+    results = await asyncio.gather(*(client.get_records(table) for table in stale), return_exceptions=True)
+    loaded = {}
+    for table, result in zip(stale, results):
+        if isinstance(result, BaseException):
+            if table not in kind.OPTIONAL:
+                raise result
+            loaded[table] = ([], False)
+        else:
+            loaded[table] = (result, True)
+    return _commit(client, kind, base, entry, loaded, generations, clock)
+
+
+def pulse_user_directory(client, clock=time.monotonic) -> PulseUserDirectory:
+    """Return the Pulse user directory for ``client``'s doc, reloading only tables that changed.
+
+    A table is re-read when its snapshot-cache TTL lapses or a write bumps its
+    generation; the joins are rebuilt from the fresh table plus the resident
+    copies of the others. Clients without the snapshot cache enabled build a
+    fresh directory on every call.
+    """
+    return _directory(client, PulseUserDirectory, clock)
+
+
+async def pulse_user_directory_async(client, clock=time.monotonic) -> PulseUserDirectory:
+    return await _directory_async(client, PulseUserDirectory, clock)
+
+
+def costing_user_directory(client, clock=time.monotonic) -> CostingUserDirectory:
+    return _directory(client, CostingUserDirectory, clock)
+
+
+async def costing_user_directory_async(client, clock=time.monotonic) -> CostingUserDirectory:
+    return await _directory_async(client, CostingUserDirectory, clock)
+
+
+def clear_user_directories() -> None:
+    with _entries_lock:
+        _entries.clear()
@@ -1,20 +1,28 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta
-from io import BytesIO
+import json
+import os
 import tempfile
 import re
+import asyncio
 from datetime import timezone
+from types import SimpleNamespace
 from zoneinfo import ZoneInfo
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
-import requests
 
 from pulse.config import NOTIFICATION_DATETIME_FORMAT, NOTIFICATION_TIMEZONE
+from pulse.core.unit_of_work import current_unit_of_work, unit_of_work
+from pulse.data.ms_visibility import MS_PENDING_CONFIRMATION as _MS_PENDING_CONFIRMATION
+from pulse.data.ms_visibility import is_pending_ms_status as _is_pending_ms_status
+from pulse.data.ms_visibility import role_tokens as _role_tokens
 from pulse.data.production_repo import ProductionRepo
+from pulse.data.user_directory import costing_user_directory
 from pulse.menu.submenu import BACK_LABEL, MAIN_MENU_LABEL, MAIN_STATE, set_main_menu_state
 from pulse.notifications.dispatcher import dispatch_event
 from pulse.settings import settings
+from pulse.tasks.job_pipeline import JobRun, job_pipeline
 from pulse.utils.pdf_export import write_grouped_ms_cutlist_pdf
 
 SELECTING_BATCH_MODE_STATE = "selecting_batch_mode"
@@ -91,7 +99,6 @@ _SUPV_CB_PREFIX = "prodsv"
 _MS_BATCH_CB_PREFIX = "msbatch"
 _APPROVER_ROLE_IDS = {"R01", "R02"}
 _APPROVER_ROLE_NAMES = {"Production_Manager", "System_Admin"}
-_MS_PENDING_CONFIRMATION = "Done - Pending Confirmation"
 _MS_HANDOFF_PENDING_ICON = "🤝"
 
 
@@ -122,6 +129,16 @@ def _now_iso() -> str:
     return datetime.utcnow().isoformat()
 
 
+def _commit_unit_of_work() -> None:
+    """Send the update's queued ProductBatch patches now, before anyone is told about them.
+
+    A failed write raises here, so the caller's own error handling sees it.
+    """
+    unit = current_unit_of_work()
+    if unit is not None:
+        unit.flush()
+
+
 def _process_code(include_ms: bool, include_cnc: bool, include_store: bool) -> str:
     parts = []
     if include_ms:
@@ -158,6 +175,9 @@ def _clear_flow(context):
     context.user_data.pop("my_ms_jobs_creator_user_id_by_batch", None)
     context.user_data.pop("my_ms_jobs_batch_no_by_id", None)
     context.user_data.pop("my_ms_jobs_action_records", None)
+    context.user_data.pop("my_ms_jobs_all_records", None)
+    context.user_data.pop("my_ms_jobs_all_row_ids", None)
+    context.user_data.pop("my_ms_jobs_action_row_ids", None)
     context.user_data.pop("my_ms_jobs_remarks", None)
     context.user_data.pop("my_ms_jobs_next_stage_selection", None)
     context.user_data.pop("my_ms_jobs_created_by_selection", None)
@@ -347,20 +367,7 @@ def generate_batch_number(
 ) -> str:
     month_key = datetime.utcnow().strftime("%b%y").upper()
     process = _process_code(include_ms, include_cnc, include_store)
-    existing = repo.get_existing_batch_numbers()
-    seq = 0
-    for number in existing:
-        parts = number.split("-")
-        if len(parts) < 4:
-            continue
-        if parts[0] != month_key:
-            continue
-        try:
-            value = int(parts[-1])
-        except ValueError:
-            continue
-        if value > seq:
-            seq = value
+    seq = repo.get_max_batch_sequence(month_key)
     return f"{month_key}-{model_code}-{process}-{seq + 1:03d}"
 
 
@@ -417,20 +424,6 @@ def _normalize_menu_text(value: str) -> str:
     return " ".join(str(value or "").strip().lower().split())
 
 
-def _normalize_role_name(value: str) -> str:
-    return " ".join(str(value or "").strip().lower().replace("_", " ").replace("-", " ").split())
-
-
-def _role_tokens(value: str) -> set[str]:
-    raw = str(value or "")
-    tokens: set[str] = set()
-    for chunk in raw.replace(",", "|").split("|"):
-        normalized = _normalize_role_name(chunk)
-        if normalized:
-            tokens.add(normalized)
-    return tokens
-
-
 def _role_matches(left: str, right: str) -> bool:
     left_tokens = _role_tokens(left)
     right_tokens = _role_tokens(right)
@@ -488,37 +481,20 @@ def _build_ms_stage_pending_message(
 
 
 def _build_costing_user_name_by_user_id(repo: ProductionRepo) -> dict[str, str]:
-    names: dict[str, str] = {}
     try:
-        users = repo.costing_client.get_records("Users")
+        return costing_user_directory(repo.costing_client).name_by_user_id
     except Exception:
-        return names
-    for row in users:
-        fields = row.get("fields", {})
-        user_id = str(fields.get("User_ID") or "").strip()
-        if not user_id:
-            continue
-        names[user_id] = str(fields.get("Name") or "").strip()
-    return names
+        return {}
 
 
 def _resolve_costing_actor_name(repo: ProductionRepo, user_ref_or_id, default: str = "-") -> str:
-    value = _normalize_ref(user_ref_or_id)
-    text = str(value or "").strip()
     try:
-        users = repo.costing_client.get_records("Users")
+        user = costing_user_directory(repo.costing_client).user_for(user_ref_or_id)
     except Exception:
         return default
-    for row in users:
-        fields = row.get("fields", {})
-        rec_id = row.get("id")
-        user_id = str(fields.get("User_ID") or "").strip()
-        name = str(fields.get("Name") or "").strip()
-        if isinstance(value, int) and isinstance(rec_id, int) and value == rec_id:
-            return name or default
-        if text and text == user_id:
-            return name or default
-    return default
+    if not user:
+        return default
+    return str(user.get("fields", {}).get("Name") or "").strip() or default
 
 
 def _with_handoff_recipient_name(message: str, from_name: str, to_name: str) -> str:
@@ -725,50 +701,6 @@ def _elapsed_days_since(value: datetime | None) -> int | None:
     return max((now - start).days, 0)
 
 
-def _build_stage_history_indexes(repo: ProductionRepo, batch_id: int) -> dict[int, list[dict]]:
-    history_by_row: dict[int, list[dict]] = {}
-    for rec in repo.costing_client.get_records("BatchStatusHistory"):
-        fields = rec.get("fields", {})
-        if str(fields.get("entity_type") or "").strip() != "MS":
-            continue
-        hist_batch = _normalize_ref(fields.get("batch_id"))
-        if hist_batch != batch_id:
-            continue
-        row_id = _normalize_ref(fields.get("entity_id"))
-        if not isinstance(row_id, int):
-            continue
-        history_by_row.setdefault(row_id, []).append(fields)
-    for row_id in history_by_row:
-        history_by_row[row_id].sort(key=lambda row: str(row.get("timestamp") or ""))
-    return history_by_row
-
-
-def _find_stage_start_from_history(stage_name: str, history_rows: list[dict]) -> datetime | None:
-    stage_key = str(stage_name or "").strip().lower()
-    if not stage_key:
-        return None
-    for hist in history_rows:
-        new_status = str(hist.get("new_status") or "").strip().lower()
-        if new_status in (f"{stage_key} pending", f"in {stage_key}"):
-            return _parse_iso_datetime(hist.get("timestamp"))
-    return None
-
-
-def _find_stage_completed_from_history(stage_name: str, next_stage: str, history_rows: list[dict]) -> datetime | None:
-    stage_key = str(stage_name or "").strip().lower()
-    next_key = str(next_stage or "").strip().lower()
-    next_tokens = []
-    if next_key:
-        next_tokens = [f"{next_key} pending", f"in {next_key}"]
-    for hist in history_rows:
-        new_status = str(hist.get("new_status") or "").strip().lower()
-        if next_tokens and new_status in next_tokens:
-            return _parse_iso_datetime(hist.get("timestamp"))
-        if not next_key and new_status in ("cutting completed", "done", "completed"):
-            return _parse_iso_datetime(hist.get("timestamp"))
-    return None
-
-
 def _build_ms_batch_summary_text(repo: ProductionRepo, batch_id: int, batch_no: str) -> str:
     rows = repo.list_ms_rows_for_batch(batch_id)
     if not rows:
@@ -791,14 +723,9 @@ def _build_ms_batch_summary_text(repo: ProductionRepo, batch_id: int, batch_no:
             batch_start = min(ms_created_dates)
             batch_age_source = "ms_created_at(min)"
     batch_age_days = _elapsed_days_since(batch_start)
-    history_by_row = _build_stage_history_indexes(repo, batch_id)
+    timelines = repo.stage_timelines
     if not batch_start:
-        all_hist_times: list[datetime] = []
-        for hist_rows in history_by_row.values():
-            for hist in hist_rows:
-                hist_time = _parse_iso_datetime(hist.get("timestamp"))
-                if hist_time:
-                    all_hist_times.append(hist_time)
+        all_hist_times = [hist_time for hist_time in map(_parse_iso_datetime, timelines.timestamps(batch_id)) if hist_time]
         if all_hist_times:
             batch_start = min(all_hist_times)
             batch_age_days = _elapsed_days_since(batch_start)
@@ -859,9 +786,9 @@ def _build_ms_batch_summary_text(repo: ProductionRepo, batch_id: int, batch_no:
         stages = repo.get_process_stage_names(process_seq)
         current_stage = str(fields.get("current_stage_name") or "")
         status = str(fields.get("current_status") or fields.get("status") or "")
-        history_rows = history_by_row.get(int(row_id), []) if isinstance(row_id, int) else []
+        timeline = timelines.row(batch_id, row_id)
 
-        current_stage_started = _find_stage_start_from_history(current_stage, history_rows)
+        current_stage_started = _parse_iso_datetime(timeline.started(current_stage))
         stage_age_source = "status_history"
         if not current_stage_started:
             current_stage_started = _parse_iso_datetime(fields.get("created_at")) or batch_start
@@ -881,7 +808,7 @@ def _build_ms_batch_summary_text(repo: ProductionRepo, batch_id: int, batch_no:
             timeline_tokens: list[str] = []
             for stage_index, stage in enumerate(stages):
                 next_stage = stages[stage_index + 1] if stage_index + 1 < len(stages) else ""
-                completed_at = _find_stage_completed_from_history(stage, next_stage, history_rows)
+                completed_at = _parse_iso_datetime(timeline.completed(stage, next_stage))
                 if completed_at:
                     timeline_tokens.append(f"{stage}({_format_dt_short(completed_at)})")
                 elif stage == current_stage:
@@ -937,6 +864,11 @@ def _filter_ms_rows_for_batch_visibility(
         if creator_user_id and creator_user_id == normalized_viewer:
             return list(rows)
 
+    visibility = getattr(repo, "ms_visibility", None)
+    if visibility is not None:
+        visible = visibility.visible_rows(user_role_name, normalized_viewer)
+        return [row for row in rows if row.get("id") in visible]
+
     return [
         row
         for row in rows
@@ -1277,7 +1209,7 @@ def _build_ms_batch_flow_timeline_text(repo: ProductionRepo, batch_id: int, row:
         current_stage = str(fields.get("current_stage_name") or "").strip()
         stages = [current_stage] if current_stage else []
     current_stage = str(fields.get("current_stage_name") or "")
-    history_rows = _build_stage_history_indexes(repo, batch_id).get(int(row_id), []) if isinstance(row_id, int) else []
+    timeline = repo.stage_timelines.row(batch_id, row_id)
 
     lines = [
         f"Flow Timeline ({row_number}/{total_rows})",
@@ -1289,8 +1221,8 @@ def _build_ms_batch_flow_timeline_text(repo: ProductionRepo, batch_id: int, row:
 
     for stage_index, stage in enumerate(stages):
         next_stage = stages[stage_index + 1] if stage_index + 1 < len(stages) else ""
-        completed_at = _find_stage_completed_from_history(stage, next_stage, history_rows)
-        started_at = _find_stage_start_from_history(stage, history_rows)
+        completed_at = _parse_iso_datetime(timeline.completed(stage, next_stage))
+        started_at = _parse_iso_datetime(timeline.started(stage))
         if completed_at:
             lines.append(f"✅ {stage}: done on {_format_dt_short(completed_at)}")
         elif stage == current_stage:
@@ -1564,17 +1496,6 @@ def _extract_first_attachment_ref(attachments_value) -> tuple[int | None, str]:
         return None, "ms_cutlist.pdf"
 
 
-def _download_attachment_bytes(repo: ProductionRepo, attachment_id: int) -> bytes:
-    url = f"{repo.costing_client.server}/api/docs/{repo.costing_client.doc_id}/attachments/{attachment_id}/download"
-    response = requests.get(
-        url,
-        headers={"Authorization": f"Bearer {repo.costing_client.api_key}"},
-        timeout=30,
-    )
-    response.raise_for_status()
-    return response.content
-
-
 def _build_ms_rows(repo: ProductionRepo, batch_id: int, part_ids: list[int], batch_qty: int, timestamp_iso: str, updated_by) -> list[dict]:
     grouped: dict[object, dict] = {}
     ms_columns = repo.get_ms_table_column_ids()
@@ -1676,8 +1597,14 @@ def _build_ms_cutlist_sections(repo: ProductionRepo, part_ids: list[int], batch_
     return ordered_sections
 
 
-def _build_ms_row_cutlist_map(repo: ProductionRepo, part_ids: list[int], batch_qty: int) -> dict[str, dict]:
-    sections = _build_ms_cutlist_sections(repo, part_ids, batch_qty)
+def _build_ms_row_cutlist_map(
+    repo: ProductionRepo,
+    part_ids: list[int],
+    batch_qty: int,
+    sections: list[dict] | None = None,
+) -> dict[str, dict]:
+    if sections is None:
+        sections = _build_ms_cutlist_sections(repo, part_ids, batch_qty)
     payload: dict[str, dict] = {}
     for section in sections:
         process_label = str(section.get("process_seq") or "")
@@ -1918,17 +1845,8 @@ def _is_approval_actor_subscriber(recipient: dict) -> bool:
 
 
 def _build_costing_user_id_indexes(repo: ProductionRepo) -> tuple[dict[int, str], dict[str, str]]:
-    by_record_id: dict[int, str] = {}
-    by_user_id: dict[str, str] = {}
-    for user in repo.costing_client.get_records("Users"):
-        rec_id = user.get("id")
-        fields = user.get("fields", {})
-        user_id = str(fields.get("User_ID") or "").strip()
-        if isinstance(rec_id, int):
-            by_record_id[rec_id] = user_id
-        if user_id:
-            by_user_id[user_id] = user_id
-    return by_record_id, by_user_id
+    directory = costing_user_directory(repo.costing_client)
+    return directory.user_id_by_record_id, directory.user_ids
 
 
 def _resolve_costing_user_id(value, by_record_id: dict[int, str], by_user_id: dict[str, str]) -> str:
@@ -1981,41 +1899,17 @@ def _get_batch_notifier_user_ids(repo: ProductionRepo, batch_id: int) -> set[str
 
 
 def _get_stage_assignment_user_ids(repo: ProductionRepo, process_seq, stage_name: str, can_act_only: bool = False) -> set[str]:
-    if not hasattr(repo, "get_process_seq_ref_id"):
+    if not hasattr(repo, "get_process_stage_ids"):
+        return set()
+    process_stage_ids = set(repo.get_process_stage_ids(process_seq, stage_name))
+    if not process_stage_ids:
         return set()
     try:
         assignments = repo.costing_client.get_records("ProcessStageUserAssignment")
-        process_stages = repo.costing_client.get_records("ProcessStage")
-        users_rows = repo.costing_client.get_records("Users")
+        user_id_by_record_id = costing_user_directory(repo.costing_client).user_id_by_record_id
     except Exception:
         return set()
 
-    seq_id = repo.get_process_seq_ref_id(process_seq)
-    if seq_id is None:
-        return set()
-    stage_name_clean = str(stage_name or "").strip()
-    if not stage_name_clean:
-        return set()
-
-    process_stage_ids: set[int] = set()
-    for row in process_stages:
-        rec_id = row.get("id")
-        if not isinstance(rec_id, int):
-            continue
-        fields = row.get("fields", {})
-        row_seq = _normalize_ref(fields.get("process_seq_id"))
-        row_stage_name = str(fields.get("stage_name") or "").strip()
-        if row_seq == seq_id and row_stage_name == stage_name_clean:
-            process_stage_ids.add(rec_id)
-
-    if not process_stage_ids:
-        return set()
-
-    user_id_by_record_id = {
-        row.get("id"): str(row.get("fields", {}).get("User_ID") or "").strip()
-        for row in users_rows
-        if isinstance(row.get("id"), int)
-    }
     user_ids: set[str] = set()
     for row in assignments:
         fields = row.get("fields", {})
@@ -2788,35 +2682,43 @@ def _attach_ms_cutlist_pdf(repo: ProductionRepo, batch_id: int, batch_no: str, s
         repo.attach_pdf_to_master(batch_id, file_path, field_name="ms_cutlist_pdf")
 
 
-def _attach_ms_row_cutlist_pdfs(repo: ProductionRepo, batch_no: str, ms_rows: list[dict], row_cutlist_map: dict[str, dict]) -> None:
+def _attach_ms_row_cutlist_pdfs(repo: ProductionRepo, ms_rows: list[dict], row_cutlist_map: dict[str, dict]) -> None:
     if not ms_rows:
         return
-    with tempfile.TemporaryDirectory() as temp_dir:
-        for row in ms_rows:
-            row_id = row.get("id")
-            if not isinstance(row_id, int):
-                continue
+    # Rows of the same process share one cut-list payload; render and attach each distinct one once.
+    # Nothing batch-specific goes into the PDF, so identical rows in other batches reuse the attachment.
+    rows_by_payload: dict[str, tuple[dict, list[int]]] = {}
+    for row in ms_rows:
+        row_id = row.get("id")
+        if not isinstance(row_id, int):
+            continue
+        process_label = repo.get_process_display_label(row.get("process_seq"))
+        payload = row_cutlist_map.get(process_label)
+        if not payload:
             part_name = _resolve_ms_row_part_text(repo, row)
-            process_label = repo.get_process_display_label(row.get("process_seq"))
-            payload = row_cutlist_map.get(process_label)
-            if not payload:
-                qty = _format_qty(float(row.get("total_qty") or row.get("required_qty") or 0))
-                payload = {
-                    "process_seq": process_label,
-                    "rows": [
-                        {
-                            "product_part": part_name,
-                            "material_to_cut": "",
-                            "length_mm": "",
-                            "total_qty": qty,
-                            "next_stage": str(row.get("next_stage_name") or ""),
-                        }
-                    ],
-                }
-            title = f"MS Cut List - {batch_no} - Row {row_id}"
-            file_path = f"{temp_dir}\\ms_cut_list_{batch_no}_{row_id}.pdf"
+            qty = _format_qty(float(row.get("total_qty") or row.get("required_qty") or 0))
+            payload = {
+                "process_seq": process_label,
+                "rows": [
+                    {
+                        "product_part": part_name,
+                        "material_to_cut": "",
+                        "length_mm": "",
+                        "total_qty": qty,
+                        "next_stage": str(row.get("next_stage_name") or ""),
+                    }
+                ],
+            }
+        key = json.dumps(payload, sort_keys=True, default=str)
+        rows_by_payload.setdefault(key, (payload, []))[1].append(row_id)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for index, (payload, row_ids) in enumerate(rows_by_payload.values(), start=1):
+            file_path = os.path.join(temp_dir, f"ms_cut_list_{index}.pdf")
+            process_label = str(payload.get("process_seq") or "").strip()
+            title = f"MS Cut List - {process_label}" if process_label else "MS Cut List"
             write_grouped_ms_cutlist_pdf([payload], file_path, title=title)
-            repo.attach_pdf_to_ms_row(row_id, file_path, field_name="row_cutlist_pdf")
+            repo.attach_pdf_to_ms_rows(row_ids, file_path, field_name="row_cutlist_pdf")
 
 
 def _get_batch_no_map(repo: ProductionRepo, batch_ids: set[int]) -> dict[int, str]:
@@ -2834,18 +2736,8 @@ def _get_batch_no_map(repo: ProductionRepo, batch_ids: set[int]) -> dict[int, st
 
 
 def _build_costing_user_name_indexes(repo: ProductionRepo) -> tuple[dict[int, str], dict[str, str]]:
-    by_record_id: dict[int, str] = {}
-    by_user_id: dict[str, str] = {}
-    for record in repo.costing_client.get_records("Users"):
-        rec_id = record.get("id")
-        fields = record.get("fields", {})
-        user_id = str(fields.get("User_ID") or "").strip()
-        name = str(fields.get("Name") or fields.get("user_name") or user_id or rec_id or "").strip()
-        if isinstance(rec_id, int):
-            by_record_id[rec_id] = name
-        if user_id:
-            by_user_id[user_id] = name
-    return by_record_id, by_user_id
+    directory = costing_user_directory(repo.costing_client)
+    return directory.name_by_record_id, directory.name_by_user_id
 
 
 def _resolve_costing_user_name(value, by_record_id: dict[int, str], by_user_id: dict[str, str]) -> str:
@@ -2909,15 +2801,6 @@ def _get_batch_creator_user_id_map(repo: ProductionRepo, batch_ids: set[int]) ->
     return creator_map
 
 
-def _is_pending_ms_status(status: str) -> bool:
-    value = str(status or "").strip()
-    if not value:
-        return False
-    if value in ("Cutting Completed", _MS_PENDING_CONFIRMATION, "Done", "Completed"):
-        return False
-    return True
-
-
 def _resolve_user_role_name(repo: ProductionRepo, context) -> str:
     user = context.user_data.get("user", {})
     return repo.get_role_name_by_user_id(user.get("user_id", ""))
@@ -2971,14 +2854,8 @@ def _rows_for_batch_and_role(repo: ProductionRepo, batch_id: int, role_name: str
 
 
 async def _mark_batch_stage_done(repo: ProductionRepo, context, batch_id: int, updated_by, role_name: str) -> int:
-    done_count = 0
-    for row in _rows_for_batch_and_role(repo, batch_id, role_name):
-        row_id = row.get("id")
-        if not isinstance(row_id, int):
-            continue
-        await _mark_ms_stage_done_pending_confirmation(repo, context, row_id, updated_by)
-        done_count += 1
-    return done_count
+    row_ids = [row.get("id") for row in _rows_for_batch_and_role(repo, batch_id, role_name)]
+    return await _mark_ms_rows_stage_done(repo, context, row_ids, updated_by)
 
 
 def _is_ms_row_visible_to_role(
@@ -3039,13 +2916,22 @@ def _list_ms_jobs_for_user_role(repo: ProductionRepo, role_name: str, viewer_use
         for record in repo.get_all_master_batches()
         if isinstance(record.get("id"), int)
     }
+    visibility = getattr(repo, "ms_visibility", None)
+    if visibility is not None:
+        # Inverted user/role -> row index; only the rows it names are looked at.
+        candidates = [visibility.record(row_id) for row_id in visibility.visible_rows(role_name, viewer_user_id)]
+    else:
+        candidates = [
+            record
+            for record in repo.list_ms_rows()
+            if _is_ms_row_visible_to_role(
+                repo, record.get("fields", {}), role_name, viewer_user_id=viewer_user_id, row_id=record.get("id")
+            )
+        ]
     rows = []
     batch_ids = set()
-    for record in repo.costing_client.get_records("ProductBatchMS"):
+    for record in candidates:
         fields = record.get("fields", {})
-        row_id = record.get("id")
-        if not _is_ms_row_visible_to_role(repo, fields, role_name, viewer_user_id=viewer_user_id, row_id=row_id):
-            continue
         batch_id = _normalize_ref(fields.get("batch_id"))
         if not isinstance(batch_id, int):
             continue
@@ -3074,7 +2960,7 @@ def _list_all_ms_jobs_for_visibility(repo: ProductionRepo) -> list[dict]:
     }
     rows = []
     batch_ids = set()
-    for record in repo.costing_client.get_records("ProductBatchMS"):
+    for record in repo.list_ms_rows():
         fields = record.get("fields", {})
         batch_id = _normalize_ref(fields.get("batch_id"))
         if not isinstance(batch_id, int):
@@ -3143,6 +3029,94 @@ def _rows_for_my_ms_jobs_view(
     return selected
 
 
+def _ms_row_ids(rows: list[dict]) -> list[int]:
+    return [row["id"] for row in rows if isinstance(row.get("id"), int)]
+
+
+def _hydrate_ms_rows(repo: ProductionRepo, entries: list) -> list[dict]:
+    """Resolve stored My MS Jobs entries against the shared ProductBatchMS snapshot.
+
+    Sessions saved before only row ids were kept hold full records; those are
+    used as stored. Ids whose row no longer exists are dropped.
+    """
+    rows = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            rows.append(entry)
+            continue
+        row = repo.get_ms_row_by_id(entry)
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+def _has_my_ms_jobs_rows(context) -> bool:
+    return bool(context.user_data.get("my_ms_jobs_all_row_ids") or context.user_data.get("my_ms_jobs_all_records"))
+
+
+def _my_ms_jobs_rows(context, repo: ProductionRepo) -> tuple[list[dict], list[dict]]:
+    """Return the (all, action-required) My MS Jobs rows for the stored row ids."""
+    user_data = context.user_data
+    if "my_ms_jobs_all_row_ids" in user_data:
+        all_records = _hydrate_ms_rows(repo, user_data.get("my_ms_jobs_all_row_ids") or [])
+        action_records = _hydrate_ms_rows(repo, user_data.get("my_ms_jobs_action_row_ids") or [])
+        return all_records, action_records
+    all_records = list(user_data.get("my_ms_jobs_all_records", []))
+    action_records = list(user_data.get("my_ms_jobs_action_records", []))
+    if not action_records and all_records and "my_ms_jobs_action_records" not in user_data:
+        action_records = all_records
+    return all_records, action_records
+
+
+def _my_ms_jobs_batch_maps(context, repo: ProductionRepo, rows: list[dict]) -> tuple[dict, dict, dict]:
+    """Return creator name, creator user id and batch no maps for the batches of ``rows``."""
+    batch_ids = {
+        _normalize_ref(row.get("fields", {}).get("batch_id"))
+        for row in rows
+        if isinstance(_normalize_ref(row.get("fields", {}).get("batch_id")), int)
+    }
+    maps = []
+    for key, build in (
+        ("my_ms_jobs_creator_by_batch", _get_batch_creator_name_map),
+        ("my_ms_jobs_creator_user_id_by_batch", _get_batch_creator_user_id_map),
+        ("my_ms_jobs_batch_no_by_id", _get_batch_no_map),
+    ):
+        # Older sessions still carry the maps; newer ones rebuild them from the snapshots.
+        stored = context.user_data.get(key)
+        maps.append(stored if isinstance(stored, dict) else build(repo, batch_ids))
+    return maps[0], maps[1], maps[2]
+
+
+def _set_my_ms_jobs_selection(context, rows: list[dict], view_mode: str) -> None:
+    context.user_data["my_ms_jobs_selection"] = {
+        "row_ids": _ms_row_ids(rows),
+        "page": 0,
+        "page_size": settings.MSCUTLIST_PAGE_SIZE,
+        "view_mode": view_mode,
+    }
+
+
+def _store_my_ms_jobs_rows(context, all_records: list[dict], action_records: list[dict]) -> None:
+    """Keep only ordered row ids in the session; rows are hydrated from the snapshot on use."""
+    user_data = context.user_data
+    user_data["my_ms_jobs_all_row_ids"] = _ms_row_ids(all_records)
+    user_data["my_ms_jobs_action_row_ids"] = _ms_row_ids(action_records)
+    for key in (
+        "my_ms_jobs_all_records",
+        "my_ms_jobs_action_records",
+        "my_ms_jobs_creator_by_batch",
+        "my_ms_jobs_creator_user_id_by_batch",
+        "my_ms_jobs_batch_no_by_id",
+    ):
+        user_data.pop(key, None)
+
+
+def _my_ms_jobs_selection_entries(selection: dict) -> list:
+    if "row_ids" in selection:
+        return selection.get("row_ids") or []
+    return selection.get("records", [])
+
+
 async def _show_my_ms_jobs_filter_menu(update, context) -> None:
     context.user_data["menu_state"] = MY_MS_JOBS_FILTER_STATE
     await _reply(
@@ -3231,13 +3205,13 @@ async def _show_my_ms_jobs_created_by_filter_page(update, context) -> None:
 
 async def _show_my_ms_jobs_page(update, context) -> None:
     selection = context.user_data.get("my_ms_jobs_selection", {})
-    records = selection.get("records", [])
+    entries = _my_ms_jobs_selection_entries(selection)
     page = selection.get("page", 0)
     page_size = selection.get("page_size", settings.MSCUTLIST_PAGE_SIZE)
-    page_records, _, end = _paginate(records, page, page_size)
+    page_entries, _, end = _paginate(entries, page, page_size)
 
-    if not records:
-        if context.user_data.get("my_ms_jobs_all_records"):
+    if not entries:
+        if _has_my_ms_jobs_rows(context):
             if context.user_data.get("my_ms_jobs_filter") == _MS_VIEW_ACTION_REQUIRED:
                 await _reply(update, "No pending handoff or pending completion jobs in your queue.")
                 await _show_my_ms_jobs_filter_menu(update, context)
@@ -3250,6 +3224,7 @@ async def _show_my_ms_jobs_page(update, context) -> None:
         return
 
     repo = ProductionRepo()
+    page_records = _hydrate_ms_rows(repo, page_entries)
     user = context.user_data.get("user", {})
     viewer_role = repo.get_role_name_by_user_id(user.get("user_id", ""))
     batch_ids = {_normalize_ref(row.get("fields", {}).get("batch_id")) for row in page_records}
@@ -3258,7 +3233,6 @@ async def _show_my_ms_jobs_page(update, context) -> None:
     creator_by_batch = context.user_data.get("my_ms_jobs_creator_by_batch")
     if not isinstance(creator_by_batch, dict):
         creator_by_batch = _get_batch_creator_name_map(repo, normalized_batch_ids)
-        context.user_data["my_ms_jobs_creator_by_batch"] = creator_by_batch
 
     mode = context.user_data.get("my_ms_jobs_filter", _MS_VIEW_ACTION_REQUIRED)
     lines = [
@@ -3328,7 +3302,7 @@ async def _show_my_ms_jobs_page(update, context) -> None:
     rows = []
     if page > 0:
         rows.append([_PAGE_PREV])
-    if end < len(records):
+    if end < len(entries):
         rows.append([_PAGE_NEXT])
     rows.append([BACK_LABEL])
     await _reply(update, "\n".join(lines), rows)
@@ -3355,7 +3329,7 @@ async def _show_my_ms_jobs_batch_filter_page(update, context) -> None:
 
 def _list_trackable_batches(repo: ProductionRepo) -> list[dict]:
     counts_by_batch: dict[int, int] = {}
-    for row in repo.costing_client.get_records("ProductBatchMS"):
+    for row in repo.list_ms_rows():
         batch_id = _normalize_ref(row.get("fields", {}).get("batch_id"))
         if not isinstance(batch_id, int):
             continue
@@ -3430,37 +3404,28 @@ async def start_view_batch(update, context) -> None:
     await _show_view_batch_page(update, context)
 
 
-async def start_my_ms_jobs(update, context) -> None:
-    repo = ProductionRepo()
+def _load_my_ms_jobs(repo: ProductionRepo, user: dict) -> tuple[list[dict], list[dict]]:
     repo.ensure_ms_workflow_columns()
-    user = context.user_data.get("user", {})
     role_name = repo.get_role_name_by_user_id(user.get("user_id", ""))
     viewer_user_id = str(user.get("user_id") or "").strip()
     all_records = _list_all_ms_jobs_for_visibility(repo)
-    action_records = _list_ms_jobs_for_user_role(repo, role_name, viewer_user_id=viewer_user_id)
+    return all_records, _list_ms_jobs_for_user_role(repo, role_name, viewer_user_id=viewer_user_id)
+
+
+async def start_my_ms_jobs(update, context) -> None:
+    repo = ProductionRepo()
+    user = context.user_data.get("user", {})
+    # Grist reads run in a worker thread so the event loop keeps serving other updates.
+    all_records, action_records = await asyncio.to_thread(_load_my_ms_jobs, repo, user)
     if not all_records:
         set_main_menu_state(context)
         await _reply(update, "No approved MS jobs available.")
         return
 
-    context.user_data["my_ms_jobs_all_records"] = all_records
-    context.user_data["my_ms_jobs_action_records"] = action_records
+    _store_my_ms_jobs_rows(context, all_records, action_records)
     context.user_data["my_ms_jobs_filter"] = _MS_VIEW_ACTION_REQUIRED
     context.user_data["my_ms_jobs_filter_value"] = ""
-    batch_ids = {
-        _normalize_ref(row.get("fields", {}).get("batch_id"))
-        for row in all_records
-        if isinstance(_normalize_ref(row.get("fields", {}).get("batch_id")), int)
-    }
-    context.user_data["my_ms_jobs_creator_by_batch"] = _get_batch_creator_name_map(repo, batch_ids)
-    context.user_data["my_ms_jobs_creator_user_id_by_batch"] = _get_batch_creator_user_id_map(repo, batch_ids)
-    context.user_data["my_ms_jobs_batch_no_by_id"] = _get_batch_no_map(repo, batch_ids)
-    context.user_data["my_ms_jobs_selection"] = {
-        "records": action_records,
-        "page": 0,
-        "page_size": settings.MSCUTLIST_PAGE_SIZE,
-        "view_mode": _MS_VIEW_ACTION_REQUIRED,
-    }
+    _set_my_ms_jobs_selection(context, action_records, _MS_VIEW_ACTION_REQUIRED)
     await _show_my_ms_jobs_filter_menu(update, context)
 
 
@@ -3585,14 +3550,8 @@ def _refresh_my_ms_jobs_selection(context, repo: ProductionRepo, role_name: str)
     action_rows = _list_ms_jobs_for_user_role(repo, role_name, viewer_user_id=viewer_user_id)
     mode = context.user_data.get("my_ms_jobs_filter", _MS_VIEW_ACTION_REQUIRED)
     mode_value = str(context.user_data.get("my_ms_jobs_filter_value") or "").strip()
-    batch_ids = {
-        _normalize_ref(row.get("fields", {}).get("batch_id"))
-        for row in all_rows
-        if isinstance(_normalize_ref(row.get("fields", {}).get("batch_id")), int)
-    }
-    creator_by_batch = _get_batch_creator_name_map(repo, batch_ids)
-    creator_user_id_by_batch = _get_batch_creator_user_id_map(repo, batch_ids)
-    batch_no_by_id = _get_batch_no_map(repo, batch_ids)
+    _store_my_ms_jobs_rows(context, all_rows, action_rows)
+    creator_by_batch, creator_user_id_by_batch, batch_no_by_id = _my_ms_jobs_batch_maps(context, repo, all_rows)
     viewer_user_id = str(context.user_data.get("user", {}).get("user_id") or "").strip()
     filtered_rows, view_mode = _apply_my_ms_jobs_filter(
         all_rows,
@@ -3606,17 +3565,7 @@ def _refresh_my_ms_jobs_selection(context, repo: ProductionRepo, role_name: str)
         viewer_user_id,
     )
 
-    context.user_data["my_ms_jobs_all_records"] = all_rows
-    context.user_data["my_ms_jobs_action_records"] = action_rows
-    context.user_data["my_ms_jobs_creator_by_batch"] = creator_by_batch
-    context.user_data["my_ms_jobs_creator_user_id_by_batch"] = creator_user_id_by_batch
-    context.user_data["my_ms_jobs_batch_no_by_id"] = batch_no_by_id
-    context.user_data["my_ms_jobs_selection"] = {
-        "records": filtered_rows,
-        "page": 0,
-        "page_size": settings.MSCUTLIST_PAGE_SIZE,
-        "view_mode": view_mode,
-    }
+    _set_my_ms_jobs_selection(context, filtered_rows, view_mode)
     return action_rows
 
 
@@ -3701,6 +3650,7 @@ async def _reject_ms_handoff_with_remarks(
             },
         ),
     )
+    _commit_unit_of_work()
     repo.add_status_history(
         batch_id,
         "MS",
@@ -3875,6 +3825,7 @@ async def _execute_ms_job_action(update, context, action_code: str, selected_rec
                 },
             ),
         )
+        _commit_unit_of_work()
         if isinstance(batch_id, int):
             repo.add_status_history(
                 batch_id,
@@ -3899,7 +3850,12 @@ async def _execute_ms_job_action(update, context, action_code: str, selected_rec
     return False
 
 
-async def _mark_ms_stage_done_pending_confirmation(repo: ProductionRepo, context, row_id: int, updated_by) -> dict:
+def _plan_ms_stage_done(repo: ProductionRepo, row_id: int, updated_by, now_iso: str) -> dict:
+    """Validate marking ``row_id``'s current stage done and work out what it changes.
+
+    ``action`` is ``"none"`` for rows already waiting on hand-off confirmation,
+    ``"advance"`` for rows on their last stage and ``"handoff"`` otherwise.
+    """
     row = repo.get_ms_row_by_id(row_id)
     if not row:
         raise ValueError("MS row not found.")
@@ -3921,41 +3877,92 @@ async def _mark_ms_stage_done_pending_confirmation(repo: ProductionRepo, context
     current_stage_name = str(fields.get("current_stage_name") or stages[min(current_stage_index, len(stages) - 1)])
     next_stage = _get_next_stage_name(stages, current_stage_index)
     old_status = str(fields.get("current_status") or fields.get("status") or "")
+    plan = {
+        "row_id": row_id,
+        "row": row,
+        "fields": fields,
+        "batch_id": batch_id,
+        "process_seq": process_seq,
+        "process_code": process_code,
+        "current_stage_name": current_stage_name,
+        "next_stage": next_stage,
+        "old_status": old_status,
+    }
     if old_status == _MS_PENDING_CONFIRMATION:
-        return row
-
+        return {**plan, "action": "none"}
     if not next_stage:
-        return await advance_ms_stage(repo, context, row_id, updated_by)
+        return {**plan, "action": "advance"}
 
-    now_iso = _now_iso()
-    new_status = _MS_PENDING_CONFIRMATION
     next_stage_role = _resolve_supervisor_role_for_stage(repo, process_seq, next_stage)
     update_fields = {
-        "current_status": new_status,
-        "status": new_status,
+        "current_status": _MS_PENDING_CONFIRMATION,
+        "status": _MS_PENDING_CONFIRMATION,
         "current_stage_role_name": next_stage_role or "",
         "updated_at": now_iso,
         "last_updated_by": updated_by,
     }
-    safe_updates = repo.filter_table_fields("ProductBatchMS", update_fields)
-    repo.update_ms(row_id, safe_updates)
+    return {
+        **plan,
+        "action": "handoff",
+        "next_stage_role": next_stage_role,
+        "is_final_stage_handoff": next_stage == stages[-1],
+        "updates": repo.filter_table_fields("ProductBatchMS", update_fields),
+    }
+
+
+def _add_ms_stage_done_history(repo: ProductionRepo, plan: dict, updated_by) -> None:
     repo.add_status_history(
-        batch_id,
+        plan["batch_id"],
         "MS",
-        row_id,
-        old_status,
-        new_status,
+        plan["row_id"],
+        plan["old_status"],
+        _MS_PENDING_CONFIRMATION,
         updated_by,
-        f"Current stage marked done. Awaiting confirmation from {next_stage}.",
+        f"Current stage marked done. Awaiting confirmation from {plan['next_stage']}.",
     )
 
-    part_name = _resolve_ms_row_part_text(repo, fields)
-    batch_no = str((repo.get_master_by_id(batch_id) or {}).get("fields", {}).get("batch_no") or "")
-    batch_by = _get_batch_owner_name_map(repo, {batch_id}).get(batch_id, "")
+
+def _build_ms_stage_pending_group_message(
+    batch_no: str,
+    batch_by: str,
+    process_code: str,
+    items: list[tuple[str, str, str, str]],
+) -> str:
+    lines = []
+    if process_code:
+        lines.append(f"\u2705 STAGE COMPLETED : {process_code}")
+    lines.extend(
+        [
+            f"\U0001F4E6 Batch No: {batch_no}",
+            f"\U0001F464 Batch By: {batch_by or '-'}",
+            f"\u26A0\uFE0F Stage Confirmation Required ({len(items)} rows)",
+        ]
+    )
+    for index, (part_name, current_stage, next_stage, qty) in enumerate(items, start=1):
+        lines.append(f"{index}. {part_name} ({qty}): \U0001F528 {current_stage or '-'} \u27A1\uFE0F {next_stage or '-'}")
+    lines.extend(["", "Use View Batch Detail to confirm each row."])
+    return "\n".join(lines)
+
+
+async def _notify_ms_stage_done(repo: ProductionRepo, context, plans: list[dict], updated_by) -> None:
+    """Send the hand-off notifications for rows of one batch going to the same next-stage role.
+
+    A single row gets its own message with confirm buttons; several rows get one
+    summary listing them all, with a button to the batch detail.
+    """
+    first = plans[0]
+    batch_id = first["batch_id"]
+    next_stage_role = first["next_stage_role"]
+    is_final_stage_handoff = first["is_final_stage_handoff"]
+    new_status = _MS_PENDING_CONFIRMATION
+
     master_record = repo.get_master_by_id(batch_id) or {}
+    batch_no = str(master_record.get("fields", {}).get("batch_no") or "")
+    batch_by = _get_batch_owner_name_map(repo, {batch_id}).get(batch_id, "")
     owner_user_ids = _get_batch_owner_user_ids(repo, master_record)
-    is_final_stage_handoff = bool(next_stage and next_stage == stages[-1])
-    next_stage_user_ids = _get_stage_assignment_user_ids(repo, process_seq, next_stage, can_act_only=True) if next_stage else set()
+    next_stage_user_ids: set[str] = set()
+    for process_seq, next_stage in dict.fromkeys((plan["process_seq"], plan["next_stage"]) for plan in plans):
+        next_stage_user_ids.update(_get_stage_assignment_user_ids(repo, process_seq, next_stage, can_act_only=True))
     handoff_renderer = _handoff_action_recipient_renderer(next_stage_user_ids, next_stage_role)
     user_name_by_id = _build_costing_user_name_by_user_id(repo)
     from_user_name = _resolve_costing_actor_name(repo, updated_by, default="-")
@@ -3963,16 +3970,46 @@ async def _mark_ms_stage_done_pending_confirmation(repo: ProductionRepo, context
     target_label = _resolve_user_names_from_ids(user_name_by_id, target_user_ids)
     if target_label == "-" and not is_final_stage_handoff and next_stage_role:
         target_label = next_stage_role
-    pending_message = _build_ms_stage_pending_message(
-        batch_no=batch_no,
-        batch_by=batch_by,
-        part_name=part_name,
-        current_stage=current_stage_name,
-        next_stage=next_stage,
-        qty=_format_qty(float(fields.get("total_qty") or fields.get("required_qty") or 0)),
-        title="Stage Confirmation Required",
-        process_code=process_code,
-    )
+
+    part_names = [_resolve_ms_row_part_text(repo, plan["fields"]) for plan in plans]
+    next_stages = ", ".join(dict.fromkeys(plan["next_stage"] for plan in plans))
+    process_code = ", ".join(dict.fromkeys(plan["process_code"] for plan in plans if plan["process_code"]))
+    if len(plans) == 1:
+        pending_message = _build_ms_stage_pending_message(
+            batch_no=batch_no,
+            batch_by=batch_by,
+            part_name=part_names[0],
+            current_stage=first["current_stage_name"],
+            next_stage=first["next_stage"],
+            qty=_format_qty(float(first["fields"].get("total_qty") or first["fields"].get("required_qty") or 0)),
+            title="Stage Confirmation Required",
+            process_code=first["process_code"],
+        )
+        reply_markup = build_stage_confirm_inline_keyboard(batch_id, first["row_id"])
+        approver_message = (
+            f"MS stage handoff pending confirmation for batch {batch_no}: {part_names[0]} | "
+            f"Current: {first['current_stage_name']} | Next: {first['next_stage']} | Status: {new_status}"
+        )
+    else:
+        pending_message = _build_ms_stage_pending_group_message(
+            batch_no,
+            batch_by,
+            process_code,
+            [
+                (
+                    part_name,
+                    plan["current_stage_name"],
+                    plan["next_stage"],
+                    _format_qty(float(plan["fields"].get("total_qty") or plan["fields"].get("required_qty") or 0)),
+                )
+                for part_name, plan in zip(part_names, plans)
+            ],
+        )
+        reply_markup = _build_ms_batch_view_detail_keyboard(batch_id)
+        approver_message = (
+            f"MS stage handoff pending confirmation for batch {batch_no}: {len(plans)} rows ({', '.join(part_names)}) | "
+            f"Next: {next_stages} | Status: {new_status}"
+        )
 
     base_pending_renderer = _owner_only_recipient_renderer(owner_user_ids) if is_final_stage_handoff else handoff_renderer
 
@@ -3994,17 +4031,14 @@ async def _mark_ms_stage_done_pending_confirmation(repo: ProductionRepo, context
             batch_id,
             pending_message,
             supervisor_role=next_stage_role,
-            reply_markup=build_stage_confirm_inline_keyboard(batch_id, row_id),
+            reply_markup=reply_markup,
             recipient_renderer=_handoff_pending_renderer,
         )
         if is_final_stage_handoff:
             await _notify_event(
                 context.bot,
                 "ms_stage_pending",
-                (
-                    f"MS stage handoff pending confirmation for batch {batch_no}: {part_name} | "
-                    f"Current: {current_stage_name} | Next: {next_stage} | Status: {new_status}"
-                ),
+                approver_message,
                 context={"batch_id": batch_id, "recipient_roles": ["Production_Manager", "System_Admin"]},
                 recipient_renderer=_approver_only_recipient_renderer(),
             )
@@ -4013,16 +4047,145 @@ async def _mark_ms_stage_done_pending_confirmation(repo: ProductionRepo, context
             context,
             "ms_stage_pending",
             batch_id,
-            f"MS stage mapping missing for batch {batch_no}: Stage {next_stage}. Please configure ProcessStage role mapping.",
+            f"MS stage mapping missing for batch {batch_no}: Stage {next_stages}. Please configure ProcessStage role mapping.",
             supervisor_role="System_Admin",
         )
 
-    recalculate_master_overall_status(repo, batch_id, updated_by)
-    return repo.get_ms_row_by_id(row_id) or row
+
+async def _mark_ms_stage_done_pending_confirmation(repo: ProductionRepo, context, row_id: int, updated_by) -> dict:
+    plan = _plan_ms_stage_done(repo, row_id, updated_by, _now_iso())
+    if plan["action"] == "none":
+        return plan["row"]
+    if plan["action"] == "advance":
+        return await advance_ms_stage(repo, context, row_id, updated_by)
+
+    repo.update_ms(row_id, plan["updates"])
+    _commit_unit_of_work()
+    _add_ms_stage_done_history(repo, plan, updated_by)
+    await _notify_ms_stage_done(repo, context, [plan], updated_by)
+    recalculate_master_overall_status(repo, plan["batch_id"], updated_by)
+    return repo.get_ms_row_by_id(row_id) or plan["row"]
+
+
+async def _mark_ms_rows_stage_done(repo: ProductionRepo, context, row_ids: list[int], updated_by) -> int:
+    """Mark the current stage done on many MS rows as one transition.
+
+    Every row is validated against the current snapshot first; rows that fail
+    validation are skipped. The hand-offs are then written with one bulk patch
+    and their history rows queued together, each batch/next-stage role gets one
+    grouped notification, and each batch's overall status is recomputed once.
+    Rows on their last stage still advance one at a time. Returns how many
+    rows ended up done. A failed write raises; a failed notification is only
+    printed, so it cannot make written rows look unwritten.
+    """
+    plans: list[dict] = []
+    done_count = 0
+    # Planning and the bulk write are blocking Grist I/O; they run in a worker thread.
+    for plan in await asyncio.to_thread(_plan_ms_rows_stage_done, repo, row_ids, updated_by):
+        if plan["action"] == "handoff":
+            plans.append(plan)
+            continue
+        if plan["action"] == "advance":
+            try:
+                await advance_ms_stage(repo, context, plan["row_id"], updated_by)
+            except Exception:
+                continue
+        done_count += 1
+    if not plans:
+        return done_count
+
+    await asyncio.to_thread(_write_ms_stage_done_plans, repo, plans, updated_by)
+
+    groups: dict[tuple, list[dict]] = {}
+    for plan in plans:
+        key = (plan["batch_id"], plan["next_stage_role"], plan["is_final_stage_handoff"])
+        groups.setdefault(key, []).append(plan)
+    for group in groups.values():
+        # The rows are already written; a failed notification must not hide that or skip the other groups.
+        try:
+            await _notify_ms_stage_done(repo, context, group, updated_by)
+        except Exception as exc:
+            print(f"MS stage hand-off notification failed for batch {group[0]['batch_id']}: {exc}")
+
+    for batch_id in dict.fromkeys(plan["batch_id"] for plan in plans):
+        await asyncio.to_thread(recalculate_master_overall_status, repo, batch_id, updated_by)
+    return done_count + len(plans)
+
+
+def _plan_ms_rows_stage_done(repo: ProductionRepo, row_ids: list[int], updated_by) -> list[dict]:
+    now_iso = _now_iso()
+    plans = []
+    for row_id in dict.fromkeys(row_id for row_id in row_ids if isinstance(row_id, int)):
+        try:
+            plans.append(_plan_ms_stage_done(repo, row_id, updated_by, now_iso))
+        except ValueError:
+            continue
+    return plans
+
+
+def _write_ms_stage_done_plans(repo: ProductionRepo, plans: list[dict], updated_by) -> None:
+    repo.update_ms_rows([(plan["row_id"], plan["updates"]) for plan in plans])
+    _commit_unit_of_work()
+    for plan in plans:
+        _add_ms_stage_done_history(repo, plan, updated_by)
+
+
+def _apply_ms_rows_update(
+    repo: ProductionRepo,
+    rows: list[dict],
+    fields: dict,
+    updated_by,
+    old_value,
+    new_value: str,
+    history_remarks: str,
+) -> list[dict]:
+    """Write the same ``fields`` to ``rows`` in one bulk patch and queue a history row for each.
+
+    ``old_value(row_fields)`` gives the value each history row records as replaced.
+    """
+    rows = [row for row in rows if row and isinstance(row.get("id"), int)]
+    if not rows:
+        return []
+    safe_fields = repo.filter_table_fields(
+        "ProductBatchMS",
+        {**fields, "updated_at": _now_iso(), "last_updated_by": updated_by},
+    )
+    repo.update_ms_rows([(row["id"], dict(safe_fields)) for row in rows])
+    _commit_unit_of_work()
+    for row in rows:
+        row_fields = row.get("fields", {})
+        batch_id = _normalize_ref(row_fields.get("batch_id"))
+        if isinstance(batch_id, int):
+            repo.add_status_history(batch_id, "MS", row["id"], old_value(row_fields), new_value, updated_by, history_remarks)
+    return rows
+
+
+async def _notify_ms_rows_by_batch(repo: ProductionRepo, context, rows: list[dict], title: str, detail: str, role_names: list[str]) -> None:
+    rows_by_batch: dict[int, list[dict]] = {}
+    for row in rows:
+        batch_id = _normalize_ref(row.get("fields", {}).get("batch_id"))
+        if isinstance(batch_id, int):
+            rows_by_batch.setdefault(batch_id, []).append(row)
+    for batch_id, batch_rows in rows_by_batch.items():
+        batch_no = str((repo.get_master_by_id(batch_id) or {}).get("fields", {}).get("batch_no") or "")
+        part_names = [_resolve_ms_row_part_text(repo, row.get("fields", {})) for row in batch_rows]
+        if len(part_names) == 1:
+            parts = f"Part: {part_names[0]}"
+        else:
+            parts = "Parts:\n" + "\n".join(f"{index}. {name}" for index, name in enumerate(part_names, start=1))
+        await _notify_roles(context, batch_id, f"{title}\nBatch: {batch_no}\n{parts}\n{detail}", role_names)
+
+
+def _ms_status_of(row_fields: dict) -> str:
+    return str(row_fields.get("current_status") or row_fields.get("status") or "")
+
+
+def _ms_remarks_of(row_fields: dict) -> str:
+    return str(row_fields.get("supervisor_remarks") or "")
 
 
 async def _send_ms_row_pdf_for_chat(repo: ProductionRepo, bot, chat_id: int, row_id: int) -> bool:
-    row = repo.get_ms_row_by_id(row_id)
+    row = await repo.get_ms_row_by_id_async(row_id)
     if not row:
         return False
     fields = row.get("fields", {})
@@ -4030,16 +4193,15 @@ async def _send_ms_row_pdf_for_chat(repo: ProductionRepo, bot, chat_id: int, row
     if not attachment_id:
         batch_id = _normalize_ref(fields.get("batch_id"))
         if isinstance(batch_id, int):
-            master = repo.get_master_by_id(batch_id)
+            master = await repo.get_master_by_id_async(batch_id)
             master_fields = (master or {}).get("fields", {})
             attachment_id, file_name = _extract_first_attachment_ref(master_fields.get("ms_cutlist_pdf"))
     if not attachment_id:
         return False
 
-    payload = _download_attachment_bytes(repo, attachment_id)
-    document = BytesIO(payload)
-    document.name = file_name or "ms_cutlist.pdf"
-    await bot.send_document(chat_id=chat_id, document=document, filename=document.name)
+    path = await repo.cached_attachment_path_async(attachment_id)
+    with path.open("rb") as document:
+        await bot.send_document(chat_id=chat_id, document=document, filename=file_name or "ms_cutlist.pdf")
     return True
 
 
@@ -4105,6 +4267,7 @@ async def advance_ms_stage(repo: ProductionRepo, context, row_id: int, updated_b
 
     safe_updates = repo.filter_table_fields("ProductBatchMS", update_fields)
     repo.update_ms(row_id, safe_updates)
+    _commit_unit_of_work()
     repo.add_status_history(batch_id, "MS", row_id, old_status, new_status, updated_by, history_remarks)
 
     part_name = _resolve_ms_row_part_text(repo, fields)
@@ -4206,6 +4369,7 @@ def recalculate_master_overall_status(repo: ProductionRepo, batch_id: int, updat
             updates["completion_date"] = _now_iso()
 
         repo.update_master(batch_id, updates)
+        _commit_unit_of_work()
         repo.add_status_history(batch_id, "Master", batch_id, old_status, new_status, updated_by, "")
 
         if new_status == "Completed":
@@ -4237,8 +4401,8 @@ def approve_batch_service(repo: ProductionRepo, batch_id: int, approved_by) -> d
             "master": record,
             "ms_rows": [],
             "ms_row_ids": [],
-            "cutlist_sections": [],
-            "row_cutlist_map": {},
+            "part_ids": [],
+            "batch_qty": 0,
         }
 
     now_iso = _now_iso()
@@ -4255,6 +4419,7 @@ def approve_batch_service(repo: ProductionRepo, batch_id: int, approved_by) -> d
             "overall_status": "Schedule Pending",
         },
     )
+    _commit_unit_of_work()
     repo.add_status_history(batch_id, "Master", batch_id, old_approval, "Approved", approved_by, "Batch approved")
     if old_overall != "Schedule Pending":
         repo.add_status_history(batch_id, "Master", batch_id, old_overall, "Schedule Pending", approved_by, "")
@@ -4262,10 +4427,9 @@ def approve_batch_service(repo: ProductionRepo, batch_id: int, approved_by) -> d
 
     include_ms = bool(fields.get("include_ms"))
     part_ids: list[int] = []
+    batch_qty = 0
     ms_rows: list[dict] = []
     ms_row_ids: list[int] = []
-    cutlist_sections: list[dict] = []
-    row_cutlist_map: dict[str, dict] = {}
     if include_ms:
         repo.ensure_ms_workflow_columns()
         part_ids = _resolve_part_ids_for_master(repo, fields)
@@ -4275,18 +4439,54 @@ def approve_batch_service(repo: ProductionRepo, batch_id: int, approved_by) -> d
         for index, row_id in enumerate(ms_row_ids):
             if index < len(ms_rows):
                 ms_rows[index]["id"] = row_id
-        cutlist_sections = _build_ms_cutlist_sections(repo, part_ids, batch_qty)
-        row_cutlist_map = _build_ms_row_cutlist_map(repo, part_ids, batch_qty)
 
+    # Cut lists, their PDFs and the first-stage notifications are left to the batch_approval job.
     return {
         "master": repo.get_master_by_id(batch_id) or record,
         "ms_rows": ms_rows,
         "ms_row_ids": ms_row_ids,
-        "cutlist_sections": cutlist_sections,
-        "row_cutlist_map": row_cutlist_map,
+        "part_ids": part_ids,
+        "batch_qty": batch_qty,
     }
 
 
+async def _run_batch_approval_job(run: JobRun) -> None:
+    payload = run.payload
+    repo = ProductionRepo()
+    batch_id = int(payload["batch_id"])
+    batch_no = str(payload.get("batch_no") or "")
+    ms_rows = list(payload.get("ms_rows") or [])
+    if not run.is_done("sections"):
+        await run.report(f"Batch {batch_no}: preparing cut lists and stage notifications...")
+
+    sections = await run.step(
+        "sections",
+        _build_ms_cutlist_sections,
+        repo,
+        list(payload.get("part_ids") or []),
+        int(payload.get("batch_qty") or 0),
+    )
+    row_cutlist_map = _build_ms_row_cutlist_map(repo, [], 0, sections=sections)
+    context = SimpleNamespace(bot=run.bot, user_data={"user": {"name": payload.get("approved_by_name") or "-"}})
+
+    # The two PDF uploads do not depend on each other. Supervisors are told after them so the
+    # PDFs are usually there, but a failed upload must not keep the batch from them; the
+    # upload error is raised afterwards so the job retries it (the notification is not repeated).
+    results = await asyncio.gather(
+        run.step("batch_pdf", _attach_ms_cutlist_pdf, repo, batch_id, batch_no, sections),
+        run.step("row_pdfs", _attach_ms_row_cutlist_pdfs, repo, ms_rows, row_cutlist_map),
+        return_exceptions=True,
+    )
+    await run.step("notify_first_stage", _notify_ms_first_stage, repo, context, batch_id, ms_rows, batch_no)
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    await run.report(f"Batch {batch_no}: cut list PDFs attached and first-stage supervisors notified.")
+
+
+job_pipeline.register("batch_approval", _run_batch_approval_job)
+
+
 async def approve_batches_by_ids(update, context, batch_ids: list[int]) -> list[str]:
     if not _is_production_manager(context):
         await _reply(update, "Only Production Manager or System Admin can approve batches.")
@@ -4297,27 +4497,31 @@ async def approve_batches_by_ids(update, context, batch_ids: list[int]) -> list[
     approved_by = repo.get_costing_user_ref_by_user_id(user.get("user_id", ""))
     approved_batch_numbers = []
 
+    chat = getattr(update, "effective_chat", None)
     for batch_id in batch_ids:
-        updated = approve_batch_service(repo, batch_id, approved_by)
+        updated = await asyncio.to_thread(approve_batch_service, repo, batch_id, approved_by)
         master_record = updated.get("master", {})
         fields = master_record.get("fields", {})
         batch_no = fields.get("batch_no", "")
         if batch_no:
             approved_batch_numbers.append(batch_no)
-            try:
-                _attach_ms_cutlist_pdf(repo, batch_id, batch_no, updated.get("cutlist_sections", []))
-            except Exception:
-                pass
-            try:
-                _attach_ms_row_cutlist_pdfs(
-                    repo,
-                    batch_no,
-                    updated.get("ms_rows", []),
-                    updated.get("row_cutlist_map", {}),
+            if updated.get("ms_rows"):
+                # The job runs outside this update's unit of work, so it must see the approval first.
+                _commit_unit_of_work()
+                job_pipeline.submit(
+                    "batch_approval",
+                    {
+                        "title": f"Batch {batch_no} cut lists",
+                        "batch_id": batch_id,
+                        "batch_no": batch_no,
+                        "ms_rows": updated.get("ms_rows", []),
+                        "part_ids": updated.get("part_ids", []),
+                        "batch_qty": updated.get("batch_qty", 0),
+                        "approved_by_name": str(user.get("name") or "-"),
+                        "chat_id": getattr(chat, "id", None),
+                    },
+                    context.bot,
                 )
-            except Exception:
-                pass
-            await _notify_ms_first_stage(repo, context, batch_id, updated.get("ms_rows", []), batch_no)
             first_stage_roles = _first_stage_supervisor_roles(repo, updated.get("ms_rows", []))
             owner_user_ids = _get_batch_owner_user_ids(repo, master_record)
             recipient_renderer = _batch_approved_recipient_renderer(first_stage_roles, owner_user_ids)
@@ -4361,6 +4565,7 @@ def reject_batch_service(repo: ProductionRepo, batch_id: int, rejected_by) -> di
             "overall_status": "Batch Rejected",
         },
     )
+    _commit_unit_of_work()
     repo.add_status_history(batch_id, "Master", batch_id, old_approval, "Rejected", rejected_by, "Batch rejected")
     if old_overall != "Batch Rejected":
         repo.add_status_history(batch_id, "Master", batch_id, old_overall, "Batch Rejected", rejected_by, "")
@@ -4396,6 +4601,13 @@ async def reject_batches_by_ids(update, context, batch_ids: list[int]) -> list[s
 
 
 async def handle_production_callback(update, context) -> bool:
+    # One unit of work per button press: each table is read at most once and
+    # ProductBatch patches go out together when the handler finishes.
+    with unit_of_work():
+        return await _handle_production_callback(update, context)
+
+
+async def _handle_production_callback(update, context) -> bool:
     query = getattr(update, "callback_query", None)
     if not query or not query.data:
         return False
@@ -4833,6 +5045,7 @@ async def set_master_scheduled_date(
     old_date = master.get("fields", {}).get("scheduled_date")
     repo.update_master(batch_id, {"scheduled_date": scheduled_date_iso, "overall_status": "Scheduled"})
     repo.update_ms_for_batch(batch_id, {"scheduled_date": scheduled_date_iso})
+    _commit_unit_of_work()
 
     repo.add_status_history(batch_id, "Master", batch_id, str(old_date or ""), str(scheduled_date_iso), updated_by, remarks)
     repo.add_lifecycle_history(batch_id, "Scheduled", updated_by, remarks or "Master and MS rows scheduled")
@@ -4868,8 +5081,7 @@ async def update_child_status(
     if not table:
         raise ValueError("Invalid entity type.")
 
-    records = repo.costing_client.get_records(table)
-    row = next((record for record in records if record.get("id") == row_id), None)
+    row = repo.get_child_row(table, row_id)
     if not row:
         raise ValueError("Child row not found.")
     old_status = row.get("fields", {}).get("status") or row.get("fields", {}).get("current_status") or ""
@@ -4884,6 +5096,7 @@ async def update_child_status(
         repo.update_cnc(row_id, updates)
     else:
         repo.update_store(row_id, updates)
+    _commit_unit_of_work()
 
     repo.add_status_history(batch_id, entity_type, row_id, old_status, new_status, updated_by, remarks)
     new_master_status = recalculate_master_overall_status(repo, batch_id, updated_by)
@@ -4897,6 +5110,11 @@ async def update_child_status(
 
 
 async def handle_production_state_text(update, context, text: str) -> bool:
+    with unit_of_work():
+        return await _handle_production_state_text(update, context, text)
+
+
+async def _handle_production_state_text(update, context, text: str) -> bool:
     state = context.user_data.get("menu_state")
     flow = _get_flow(context)
 
@@ -5198,6 +5416,8 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             context.user_data.pop("my_ms_jobs_selection", None)
             context.user_data.pop("my_ms_jobs_all_records", None)
             context.user_data.pop("my_ms_jobs_action_records", None)
+            context.user_data.pop("my_ms_jobs_all_row_ids", None)
+            context.user_data.pop("my_ms_jobs_action_row_ids", None)
             context.user_data.pop("my_ms_jobs_filter_value", None)
             context.user_data.pop("my_ms_jobs_creator_by_batch", None)
             context.user_data.pop("my_ms_jobs_creator_user_id_by_batch", None)
@@ -5234,20 +5454,8 @@ async def handle_production_state_text(update, context, text: str) -> bool:
         repo = ProductionRepo()
         viewer_user_id = str(context.user_data.get("user", {}).get("user_id") or "").strip()
         role_name = repo.get_role_name_by_user_id(context.user_data.get("user", {}).get("user_id", ""))
-        all_records = context.user_data.get("my_ms_jobs_all_records", [])
-        action_records = context.user_data.get("my_ms_jobs_action_records", [])
-        if not action_records and all_records and "my_ms_jobs_action_records" not in context.user_data:
-            action_records = all_records
-        batch_no_by_id = context.user_data.get("my_ms_jobs_batch_no_by_id")
-        creator_user_id_by_batch = context.user_data.get("my_ms_jobs_creator_user_id_by_batch")
-        if not isinstance(creator_user_id_by_batch, dict):
-            batch_ids = {
-                _normalize_ref(row.get("fields", {}).get("batch_id"))
-                for row in all_records
-                if isinstance(_normalize_ref(row.get("fields", {}).get("batch_id")), int)
-            }
-            creator_user_id_by_batch = _get_batch_creator_user_id_map(repo, batch_ids)
-            context.user_data["my_ms_jobs_creator_user_id_by_batch"] = creator_user_id_by_batch
+        all_records, action_records = _my_ms_jobs_rows(context, repo)
+        creator_by_batch, creator_user_id_by_batch, batch_no_by_id = _my_ms_jobs_batch_maps(context, repo, all_records)
         view_records = _rows_for_my_ms_jobs_view(
             all_records,
             action_records,
@@ -5256,14 +5464,6 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             creator_user_id_by_batch,
             viewer_user_id,
         )
-        if not isinstance(batch_no_by_id, dict):
-            batch_ids = {
-                _normalize_ref(row.get("fields", {}).get("batch_id"))
-                for row in all_records
-                if isinstance(_normalize_ref(row.get("fields", {}).get("batch_id")), int)
-            }
-            batch_no_by_id = _get_batch_no_map(ProductionRepo(), batch_ids)
-            context.user_data["my_ms_jobs_batch_no_by_id"] = batch_no_by_id
         if selected_filter == _MS_VIEW_BY_NEXT_STAGE:
             options = _get_my_ms_jobs_next_stage_options(view_records)
             if not options:
@@ -5278,15 +5478,6 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             await _show_my_ms_jobs_next_stage_filter_page(update, context)
             return True
         if selected_filter == _MS_VIEW_BY_CREATED_BY:
-            creator_by_batch = context.user_data.get("my_ms_jobs_creator_by_batch")
-            if not isinstance(creator_by_batch, dict):
-                batch_ids = {
-                    _normalize_ref(row.get("fields", {}).get("batch_id"))
-                    for row in all_records
-                    if isinstance(_normalize_ref(row.get("fields", {}).get("batch_id")), int)
-                }
-                creator_by_batch = _get_batch_creator_name_map(ProductionRepo(), batch_ids)
-                context.user_data["my_ms_jobs_creator_by_batch"] = creator_by_batch
             options = _get_my_ms_jobs_creator_options(view_records, creator_by_batch)
             if not options:
                 await _reply(update, "No creator entries available for your MS jobs.", [[BACK_LABEL]])
@@ -5318,9 +5509,9 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             action_records,
             selected_filter,
             "",
-            context.user_data.get("my_ms_jobs_creator_by_batch", {}),
-            creator_user_id_by_batch if isinstance(creator_user_id_by_batch, dict) else {},
-            batch_no_by_id if isinstance(batch_no_by_id, dict) else {},
+            creator_by_batch,
+            creator_user_id_by_batch,
+            batch_no_by_id,
             role_name,
             viewer_user_id,
         )
@@ -5329,12 +5520,7 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             return True
         context.user_data["my_ms_jobs_filter"] = selected_filter
         context.user_data["my_ms_jobs_filter_value"] = ""
-        context.user_data["my_ms_jobs_selection"] = {
-            "records": filtered,
-            "page": 0,
-            "page_size": settings.MSCUTLIST_PAGE_SIZE,
-            "view_mode": view_mode,
-        }
+        _set_my_ms_jobs_selection(context, filtered, view_mode)
         context.user_data["menu_state"] = MY_MS_JOBS_SELECTION_STATE
         await _show_my_ms_jobs_page(update, context)
         return True
@@ -5369,9 +5555,9 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             await _reply(update, "No valid selection on this page.")
             return True
         selected_stage = page_options[option_index]
-        all_records = context.user_data.get("my_ms_jobs_all_records", [])
-        action_records = context.user_data.get("my_ms_jobs_action_records", [])
         repo = ProductionRepo()
+        all_records, action_records = _my_ms_jobs_rows(context, repo)
+        creator_by_batch, creator_user_id_by_batch, batch_no_by_id = _my_ms_jobs_batch_maps(context, repo, all_records)
         viewer_user_id = str(context.user_data.get("user", {}).get("user_id") or "").strip()
         role_name = repo.get_role_name_by_user_id(context.user_data.get("user", {}).get("user_id", ""))
         filtered, view_mode = _apply_my_ms_jobs_filter(
@@ -5379,9 +5565,9 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             action_records,
             _MS_VIEW_BY_NEXT_STAGE,
             selected_stage,
-            context.user_data.get("my_ms_jobs_creator_by_batch", {}),
-            context.user_data.get("my_ms_jobs_creator_user_id_by_batch", {}),
-            context.user_data.get("my_ms_jobs_batch_no_by_id", {}),
+            creator_by_batch,
+            creator_user_id_by_batch,
+            batch_no_by_id,
             role_name,
             viewer_user_id,
         )
@@ -5390,13 +5576,8 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             return True
         context.user_data["my_ms_jobs_filter"] = _MS_VIEW_BY_NEXT_STAGE
         context.user_data["my_ms_jobs_filter_value"] = selected_stage
-        context.user_data["my_ms_jobs_selection"] = {
-            "records": filtered,
-            "page": 0,
-            "page_size": settings.MSCUTLIST_PAGE_SIZE,
-            "view_mode": view_mode,
-        }
-        batch_options = _get_my_ms_jobs_batch_options(filtered, context.user_data.get("my_ms_jobs_batch_no_by_id", {}))
+        _set_my_ms_jobs_selection(context, filtered, view_mode)
+        batch_options = _get_my_ms_jobs_batch_options(filtered, batch_no_by_id)
         if not batch_options:
             await _reply(update, "No batch entries available for selected next stage.", [[BACK_LABEL]])
             return True
@@ -5440,9 +5621,9 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             await _reply(update, "No valid selection on this page.")
             return True
         selected_creator = page_options[option_index]
-        all_records = context.user_data.get("my_ms_jobs_all_records", [])
-        action_records = context.user_data.get("my_ms_jobs_action_records", [])
         repo = ProductionRepo()
+        all_records, action_records = _my_ms_jobs_rows(context, repo)
+        creator_by_batch, creator_user_id_by_batch, batch_no_by_id = _my_ms_jobs_batch_maps(context, repo, all_records)
         viewer_user_id = str(context.user_data.get("user", {}).get("user_id") or "").strip()
         role_name = repo.get_role_name_by_user_id(context.user_data.get("user", {}).get("user_id", ""))
         filtered, view_mode = _apply_my_ms_jobs_filter(
@@ -5450,9 +5631,9 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             action_records,
             _MS_VIEW_BY_CREATED_BY,
             selected_creator,
-            context.user_data.get("my_ms_jobs_creator_by_batch", {}),
-            context.user_data.get("my_ms_jobs_creator_user_id_by_batch", {}),
-            context.user_data.get("my_ms_jobs_batch_no_by_id", {}),
+            creator_by_batch,
+            creator_user_id_by_batch,
+            batch_no_by_id,
             role_name,
             viewer_user_id,
         )
@@ -5461,13 +5642,8 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             return True
         context.user_data["my_ms_jobs_filter"] = _MS_VIEW_BY_CREATED_BY
         context.user_data["my_ms_jobs_filter_value"] = selected_creator
-        context.user_data["my_ms_jobs_selection"] = {
-            "records": filtered,
-            "page": 0,
-            "page_size": settings.MSCUTLIST_PAGE_SIZE,
-            "view_mode": view_mode,
-        }
-        batch_options = _get_my_ms_jobs_batch_options(filtered, context.user_data.get("my_ms_jobs_batch_no_by_id", {}))
+        _set_my_ms_jobs_selection(context, filtered, view_mode)
+        batch_options = _get_my_ms_jobs_batch_options(filtered, batch_no_by_id)
         if not batch_options:
             await _reply(update, "No batch entries available for selected creator.", [[BACK_LABEL]])
             return True
@@ -5650,7 +5826,7 @@ async def handle_production_state_text(update, context, text: str) -> bool:
 
     if state == MY_MS_JOBS_SELECTION_STATE:
         selection = context.user_data.get("my_ms_jobs_selection", {})
-        records = selection.get("records", [])
+        entries = _my_ms_jobs_selection_entries(selection)
         page = selection.get("page", 0)
         page_size = selection.get("page_size", settings.MSCUTLIST_PAGE_SIZE)
 
@@ -5659,7 +5835,7 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             await _show_my_ms_jobs_page(update, context)
             return True
         if text == _PAGE_NEXT:
-            max_page = max((len(records) - 1) // page_size, 0)
+            max_page = max((len(entries) - 1) // page_size, 0)
             selection["page"] = min(max_page, page + 1)
             await _show_my_ms_jobs_page(update, context)
             return True
@@ -5672,7 +5848,7 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             if not bulk_prefixed:
                 await _reply(update, "Use bulk mode like X1,3.")
                 return True
-            page_records, _, _ = _paginate(records, page, page_size)
+            page_records = _hydrate_ms_rows(ProductionRepo(), _paginate(entries, page, page_size)[0])
             selected_records = []
             for number in bulk_prefixed:
                 item_index = number - 1
@@ -5690,7 +5866,7 @@ async def handle_production_state_text(update, context, text: str) -> bool:
                     return True
                 repo = ProductionRepo()
                 batch_no = str((repo.get_master_by_id(batch_id) or {}).get("fields", {}).get("batch_no") or "")
-                await _reply(update, _build_ms_batch_summary_text(repo, batch_id, batch_no))
+                await _reply(update, await asyncio.to_thread(_build_ms_batch_summary_text, repo, batch_id, batch_no))
                 await _show_my_ms_batch_action_menu(update, context, batch_id, batch_no)
                 return True
             context.user_data["my_ms_jobs_bulk_action"] = {
@@ -5703,7 +5879,7 @@ async def handle_production_state_text(update, context, text: str) -> bool:
         prefixed = _parse_prefixed_selection(text)
         if prefixed:
             action_code, number = prefixed
-            page_records, _, _ = _paginate(records, page, page_size)
+            page_records = _hydrate_ms_rows(ProductionRepo(), _paginate(entries, page, page_size)[0])
             item_index = number - 1
             if item_index < 0 or item_index >= len(page_records):
                 await _reply(update, "No valid selection on this page.")
@@ -5728,7 +5904,7 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             await _reply(update, "Use 1/1,3 or quick actions D1/C1/N1/R1/V1/H1/S1/B1/X1,3.")
             return True
 
-        page_records, _, _ = _paginate(records, page, page_size)
+        page_records = _hydrate_ms_rows(ProductionRepo(), _paginate(entries, page, page_size)[0])
         selected_records = []
         for number in selected_numbers:
             item_index = number - 1
@@ -5842,17 +6018,15 @@ async def handle_production_state_text(update, context, text: str) -> bool:
         repo = ProductionRepo()
         user = context.user_data.get("user", {})
         updated_by = repo.get_costing_user_ref_by_user_id(user.get("user_id", ""))
-        done_count = 0
-        for row_id in selected_ids:
-            try:
-                await _mark_ms_stage_done_pending_confirmation(repo, context, row_id, updated_by)
-                done_count += 1
-            except Exception:
-                continue
+        try:
+            done_count = await _mark_ms_rows_stage_done(repo, context, selected_ids, updated_by)
+        except Exception:
+            await _reply(update, "Could not update the selected jobs.")
+            return True
 
         context.user_data.pop("my_ms_jobs_confirm", None)
         role_name = repo.get_role_name_by_user_id(user.get("user_id", ""))
-        refreshed = _refresh_my_ms_jobs_selection(context, repo, role_name)
+        refreshed = await asyncio.to_thread(_refresh_my_ms_jobs_selection, context, repo, role_name)
         if not refreshed:
             context.user_data.pop("my_ms_jobs_selection", None)
             set_main_menu_state(context)
@@ -5893,16 +6067,14 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             return True
 
         if text == _MS_BULK_ACTION_DONE:
-            done_count = 0
-            for row_id in selected_ids:
-                try:
-                    await _mark_ms_stage_done_pending_confirmation(repo, context, row_id, updated_by)
-                    done_count += 1
-                except Exception:
-                    continue
+            try:
+                done_count = await _mark_ms_rows_stage_done(repo, context, selected_ids, updated_by)
+            except Exception:
+                await _reply(update, "Could not update the selected rows.")
+                return True
             context.user_data.pop("my_ms_jobs_bulk_action", None)
             role_name = repo.get_role_name_by_user_id(user.get("user_id", ""))
-            refreshed = _refresh_my_ms_jobs_selection(context, repo, role_name)
+            refreshed = await asyncio.to_thread(_refresh_my_ms_jobs_selection, context, repo, role_name)
             if not refreshed:
                 context.user_data.pop("my_ms_jobs_selection", None)
                 set_main_menu_state(context)
@@ -5914,52 +6086,29 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             return True
 
         if text == _MS_BULK_ACTION_HOLD:
-            hold_count = 0
-            for selected in selected_rows:
-                row_id = selected.get("id")
-                if not isinstance(row_id, int):
-                    continue
-                row = repo.get_ms_row_by_id(row_id)
-                if not row:
-                    continue
-                row_fields = row.get("fields", {})
-                batch_id = _normalize_ref(row_fields.get("batch_id"))
-                old_status = str(row_fields.get("current_status") or row_fields.get("status") or "")
-                hold_status = "On Hold"
-                try:
-                    repo.update_ms(
-                        row_id,
-                        repo.filter_table_fields(
-                            "ProductBatchMS",
-                            {
-                                "current_status": hold_status,
-                                "status": hold_status,
-                                "updated_at": _now_iso(),
-                                "last_updated_by": updated_by,
-                            },
-                        ),
-                    )
-                    hold_count += 1
-                except Exception:
-                    continue
-                if isinstance(batch_id, int):
-                    repo.add_status_history(
-                        batch_id,
-                        "MS",
-                        row_id,
-                        old_status,
-                        hold_status,
-                        updated_by,
-                        "Marked as hold by supervisor (bulk action).",
-                    )
-                    part_name = _resolve_ms_row_part_text(repo, row_fields)
-                    batch_no = str((repo.get_master_by_id(batch_id) or {}).get("fields", {}).get("batch_no") or "")
-                    await _notify_roles(
-                        context,
-                        batch_id,
-                        f"MS row put on hold (bulk).\nBatch: {batch_no}\nPart: {part_name}\nStatus: {hold_status}",
-                        ["Production_Supervisor", "Production Supervisor", "System_Admin"],
-                    )
+            hold_status = "On Hold"
+            rows = [repo.get_ms_row_by_id(selected.get("id")) for selected in selected_rows if isinstance(selected.get("id"), int)]
+            try:
+                held_rows = _apply_ms_rows_update(
+                    repo,
+                    rows,
+                    {"current_status": hold_status, "status": hold_status},
+                    updated_by,
+                    _ms_status_of,
+                    hold_status,
+                    "Marked as hold by supervisor (bulk action).",
+                )
+            except Exception:
+                held_rows = []
+            hold_count = len(held_rows)
+            await _notify_ms_rows_by_batch(
+                repo,
+                context,
+                held_rows,
+                "MS row put on hold (bulk)." if hold_count == 1 else "MS rows put on hold (bulk).",
+                f"Status: {hold_status}",
+                ["Production_Supervisor", "Production Supervisor", "System_Admin"],
+            )
             context.user_data.pop("my_ms_jobs_bulk_action", None)
             role_name = repo.get_role_name_by_user_id(user.get("user_id", ""))
             _refresh_my_ms_jobs_selection(context, repo, role_name)
@@ -5998,48 +6147,28 @@ async def handle_production_state_text(update, context, text: str) -> bool:
         repo = ProductionRepo()
         user = context.user_data.get("user", {})
         updated_by = repo.get_costing_user_ref_by_user_id(user.get("user_id", ""))
-        updated_count = 0
-        for row_id in selected_ids:
-            row = repo.get_ms_row_by_id(row_id)
-            if not row:
-                continue
-            row_fields = row.get("fields", {})
-            batch_id = _normalize_ref(row_fields.get("batch_id"))
-            old_remarks = str(row_fields.get("supervisor_remarks") or "")
-            try:
-                repo.update_ms(
-                    row_id,
-                    repo.filter_table_fields(
-                        "ProductBatchMS",
-                        {
-                            "supervisor_remarks": remarks_text,
-                            "updated_at": _now_iso(),
-                            "last_updated_by": updated_by,
-                        },
-                    ),
-                )
-                updated_count += 1
-            except Exception:
-                continue
-
-            if isinstance(batch_id, int):
-                repo.add_status_history(
-                    batch_id,
-                    "MS",
-                    row_id,
-                    old_remarks,
-                    remarks_text,
-                    updated_by,
-                    "Supervisor remarks updated (bulk action).",
-                )
-                part_name = _resolve_ms_row_part_text(repo, row_fields)
-                batch_no = str((repo.get_master_by_id(batch_id) or {}).get("fields", {}).get("batch_no") or "")
-                await _notify_roles(
-                    context,
-                    batch_id,
-                    f"Supervisor Remarks Added (bulk)\nBatch: {batch_no}\nPart: {part_name}\n{remarks_text}",
-                    ["Production_Supervisor", "Production Supervisor", "Production_Manager"],
-                )
+        rows = [repo.get_ms_row_by_id(row_id) for row_id in selected_ids]
+        try:
+            updated_rows = _apply_ms_rows_update(
+                repo,
+                rows,
+                {"supervisor_remarks": remarks_text},
+                updated_by,
+                _ms_remarks_of,
+                remarks_text,
+                "Supervisor remarks updated (bulk action).",
+            )
+        except Exception:
+            updated_rows = []
+        updated_count = len(updated_rows)
+        await _notify_ms_rows_by_batch(
+            repo,
+            context,
+            updated_rows,
+            "Supervisor Remarks Added (bulk)",
+            remarks_text,
+            ["Production_Supervisor", "Production Supervisor", "Production_Manager"],
+        )
 
         context.user_data.pop("my_ms_jobs_bulk_remarks", None)
         context.user_data.pop("my_ms_jobs_bulk_action", None)
@@ -6109,29 +6238,23 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             return True
 
         if text == _MS_BATCH_ACTION_VIEW:
-            all_records = context.user_data.get("my_ms_jobs_all_records", [])
-            action_records = context.user_data.get("my_ms_jobs_action_records", [])
-            batch_no_by_id = context.user_data.get("my_ms_jobs_batch_no_by_id", {})
+            all_records, action_records = _my_ms_jobs_rows(context, repo)
+            creator_by_batch, creator_user_id_by_batch, batch_no_by_id = _my_ms_jobs_batch_maps(context, repo, all_records)
             viewer_user_id = str(context.user_data.get("user", {}).get("user_id") or "").strip()
             filtered, view_mode = _apply_my_ms_jobs_filter(
                 all_records,
                 action_records,
                 _MS_VIEW_BY_BATCH_NO,
                 batch_no,
-                context.user_data.get("my_ms_jobs_creator_by_batch", {}),
-                context.user_data.get("my_ms_jobs_creator_user_id_by_batch", {}),
-                batch_no_by_id if isinstance(batch_no_by_id, dict) else {},
+                creator_by_batch,
+                creator_user_id_by_batch,
+                batch_no_by_id,
                 user_role_name,
                 viewer_user_id,
             )
             context.user_data["my_ms_jobs_filter"] = _MS_VIEW_BY_BATCH_NO
             context.user_data["my_ms_jobs_filter_value"] = batch_no
-            context.user_data["my_ms_jobs_selection"] = {
-                "records": filtered,
-                "page": 0,
-                "page_size": settings.MSCUTLIST_PAGE_SIZE,
-                "view_mode": view_mode,
-            }
+            _set_my_ms_jobs_selection(context, filtered, view_mode)
             context.user_data["menu_state"] = MY_MS_JOBS_SELECTION_STATE
             await _show_my_ms_jobs_page(update, context)
             return True
@@ -6163,39 +6286,21 @@ async def handle_production_state_text(update, context, text: str) -> bool:
             return True
 
         if text == _MS_BATCH_ACTION_HOLD:
-            hold_count = 0
-            for row in _rows_for_batch_and_role(repo, batch_id, user_role_name):
-                row_id = row.get("id")
-                if not isinstance(row_id, int):
-                    continue
-                row_fields = row.get("fields", {})
-                old_status = str(row_fields.get("current_status") or row_fields.get("status") or "")
-                hold_status = "On Hold"
-                try:
-                    repo.update_ms(
-                        row_id,
-                        repo.filter_table_fields(
-                            "ProductBatchMS",
-                            {
-                                "current_status": hold_status,
-                                "status": hold_status,
-                                "updated_at": _now_iso(),
-                                "last_updated_by": updated_by,
-                            },
-                        ),
+            hold_status = "On Hold"
+            try:
+                hold_count = len(
+                    _apply_ms_rows_update(
+                        repo,
+                        _rows_for_batch_and_role(repo, batch_id, user_role_name),
+                        {"current_status": hold_status, "status": hold_status},
+                        updated_by,
+                        _ms_status_of,
+                        hold_status,
+                        "Marked as hold by supervisor (batch action).",
                     )
-                    hold_count += 1
-                except Exception:
-                    continue
-                repo.add_status_history(
-                    batch_id,
-                    "MS",
-                    row_id,
-                    old_status,
-                    hold_status,
-                    updated_by,
-                    "Marked as hold by supervisor (batch action).",
                 )
+            except Exception:
+                hold_count = 0
             role_name = repo.get_role_name_by_user_id(user.get("user_id", ""))
             _refresh_my_ms_jobs_selection(context, repo, role_name)
             await _reply(update, f"Marked {hold_count} row(s) hold for batch {batch_no or '-'}")
@@ -6247,37 +6352,20 @@ async def handle_production_state_text(update, context, text: str) -> bool:
         user = context.user_data.get("user", {})
         user_role_name = repo.get_role_name_by_user_id(user.get("user_id", ""))
         updated_by = repo.get_costing_user_ref_by_user_id(user.get("user_id", ""))
-        updated_count = 0
-        for row in _rows_for_batch_and_role(repo, batch_id, user_role_name):
-            row_id = row.get("id")
-            if not isinstance(row_id, int):
-                continue
-            row_fields = row.get("fields", {})
-            old_remarks = str(row_fields.get("supervisor_remarks") or "")
-            try:
-                repo.update_ms(
-                    row_id,
-                    repo.filter_table_fields(
-                        "ProductBatchMS",
-                        {
-                            "supervisor_remarks": remarks_text,
-                            "updated_at": _now_iso(),
-                            "last_updated_by": updated_by,
-                        },
-                    ),
+        try:
+            updated_count = len(
+                _apply_ms_rows_update(
+                    repo,
+                    _rows_for_batch_and_role(repo, batch_id, user_role_name),
+                    {"supervisor_remarks": remarks_text},
+                    updated_by,
+                    _ms_remarks_of,
+                    remarks_text,
+                    "Supervisor remarks updated (batch action).",
                 )
-                updated_count += 1
-            except Exception:
-                continue
-            repo.add_status_history(
-                batch_id,
-                "MS",
-                row_id,
-                old_remarks,
-                remarks_text,
-                updated_by,
-                "Supervisor remarks updated (batch action).",
             )
+        except Exception:
+            updated_count = 0
         context.user_data.pop("my_ms_batch_remarks", None)
         role_name = repo.get_role_name_by_user_id(user.get("user_id", ""))
         _refresh_my_ms_jobs_selection(context, repo, role_name)
@@ -6329,6 +6417,7 @@ async def handle_production_state_text(update, context, text: str) -> bool:
                 },
             ),
         )
+        _commit_unit_of_work()
         if isinstance(batch_id, int):
             repo.add_status_history(
                 batch_id,
@@ -1,4 +1,5 @@
 import json
+import logging
 import os
 import tempfile
 import sys
@@ -11,10 +12,13 @@ from telegram.ext import ApplicationBuilder, CallbackQueryHandler, CommandHandle
 if __package__ in (None, ""):
     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from pulse.config import BOT_TOKEN
+from pulse.config import BOT_TOKEN, GRIST_METRICS_PORT, GRIST_METRICS_SUMMARY_SECONDS
+from pulse.core.metrics import instrument_handler, start_metrics_server, start_summary_reporter
 from pulse.core.permissions import get_permissions_for_role
+from pulse.core.resilience import GristUnavailableError, is_transient_error
 from pulse.core.users import get_user_by_telegram
 from pulse.data.costing_repo import CostingRepo
+from pulse.tasks.job_pipeline import job_pipeline
 from pulse.integrations.production import (
     ACTION_VIEW_BATCH,
     ACTION_MY_MS_JOBS,
@@ -599,19 +603,69 @@ async def callback_router(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.answer("Unsupported action.")
 
 
+def _call_site_label(update, context) -> str:
+    query = getattr(update, "callback_query", None)
+    if query and query.data:
+        # Keep the action prefix (e.g. "msb:ov") and drop ids so labels stay low-cardinality.
+        prefix = []
+        for part in str(query.data).split(":")[:2]:
+            if not part or part.isdigit():
+                break
+            prefix.append(part)
+        return "callback:" + (":".join(prefix) or "unknown")
+    state = context.user_data.get("menu_state", MAIN_STATE) if context.user_data is not None else MAIN_STATE
+    return f"state:{state}"
+
+
+async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+    error = context.error
+    if error is None or not is_transient_error(error):
+        logging.getLogger(__name__).error("Unhandled error while processing an update", exc_info=error)
+        return
+    if isinstance(error, GristUnavailableError):
+        text = str(error)
+    else:
+        text = "Grist is not responding right now. Please try again in a minute."
+    query = getattr(update, "callback_query", None)
+    if query:
+        try:
+            await query.answer(text, show_alert=True)
+            return
+        except Exception:
+            pass
+    if getattr(update, "effective_message", None):
+        await _reply_text(update, text)
+
+
+async def _resume_background_jobs(app) -> None:
+    resumed = await job_pipeline.resume(app.bot)
+    if resumed:
+        print(f"Resumed {resumed} background job(s) from the journal.")
+
+
 def main():
     if is_test_mode():
         print(f"Pulse running in TEST mode. test_doc_id={test_doc_id()}")
         run_test_runtime_loop()
         return
 
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    app = ApplicationBuilder().token(BOT_TOKEN).post_init(_resume_background_jobs).build()
 
-    app.add_handler(CommandHandler("start", start))
+    instrumented = instrument_handler(_call_site_label)
+    app.add_handler(CommandHandler("start", instrumented(start)))
 
-    app.add_handler(CallbackQueryHandler(callback_router))
-    app.add_handler(MessageHandler(filters.COMMAND, fallback_command))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, fallback_text))
+    app.add_handler(CallbackQueryHandler(instrumented(callback_router)))
+    app.add_handler(MessageHandler(filters.COMMAND, instrumented(fallback_command)))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, instrumented(fallback_text)))
+    app.add_error_handler(error_handler)
+
+    if GRIST_METRICS_PORT:
+        try:
+            start_metrics_server(GRIST_METRICS_PORT)
+            print(f"Grist metrics endpoint on 127.0.0.1:{GRIST_METRICS_PORT}")
+        except OSError as exc:
+            print(f"Grist metrics endpoint disabled: {exc}")
+    start_summary_reporter(GRIST_METRICS_SUMMARY_SECONDS)
 
     print(f"Pulse running in {runtime_mode()} mode...")
     app.run_polling()
@@ -1,5 +1,5 @@
-from pulse.notifications.subscriptions import get_subscribers
-from pulse.core.logger import log_event
+from pulse.notifications.subscriptions import get_subscribers_async
+from pulse.core.logger import log_event_async
 
 
 async def dispatch_event(
@@ -11,7 +11,7 @@ async def dispatch_event(
     recipient_renderer=None,
 ):
 
-    subscribers = get_subscribers(event_type, context=context)
+    subscribers = await get_subscribers_async(event_type, context=context)
 
     for user in subscribers:
         try:
@@ -40,14 +40,14 @@ async def dispatch_event(
                     reply_markup=rendered_markup,
                 )
 
-            log_event(
+            await log_event_async(
                 user["user_id"],
                 f"notification_sent:{event_type}",
                 "Success"
             )
 
         except Exception as e:
-            log_event(
+            await log_event_async(
                 user["user_id"],
                 f"notification_failed:{event_type}",
                 str(e)
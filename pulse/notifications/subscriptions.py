@@ -1,9 +1,22 @@
-from pulse.core.grist_client import GristClient
+import asyncio
+
+from pulse.core.grist_client import AsyncGristClient, GristClient
 from pulse.config import COSTING_API_KEY, COSTING_DOC_ID, PULSE_API_KEY, PULSE_DOC_ID, PULSE_GRIST_SERVER
+from pulse.data.user_directory import (
+    PulseUserDirectory,
+    costing_user_directory,
+    costing_user_directory_async,
+    pulse_user_directory,
+    pulse_user_directory_async,
+)
+
 
+pulse_client = GristClient(PULSE_GRIST_SERVER, PULSE_DOC_ID, PULSE_API_KEY, use_cache=True)
+costing_client = GristClient(PULSE_GRIST_SERVER, COSTING_DOC_ID, COSTING_API_KEY, use_cache=True)
+async_pulse_client = AsyncGristClient(PULSE_GRIST_SERVER, PULSE_DOC_ID, PULSE_API_KEY, use_cache=True)
+async_costing_client = AsyncGristClient(PULSE_GRIST_SERVER, COSTING_DOC_ID, COSTING_API_KEY, use_cache=True)
 
-pulse_client = GristClient(PULSE_GRIST_SERVER, PULSE_DOC_ID, PULSE_API_KEY)
-costing_client = GristClient(PULSE_GRIST_SERVER, COSTING_DOC_ID, COSTING_API_KEY)
+_PULSE_TABLES = ("Notification_Events", "Notification_Subscriptions")
 
 RECIPIENT_MODE_OWNER_ONLY = "OWNER_ONLY"
 RECIPIENT_MODE_OWNER_PLUS_SUBSCRIBERS = "OWNER_PLUS_SUBSCRIBERS"
@@ -22,20 +35,6 @@ def _to_str(value):
     return str(value)
 
 
-def _build_users_index(users: list[dict]) -> tuple[dict[str, dict], dict[int, dict]]:
-    by_user_id = {}
-    by_record_id = {}
-    for user in users:
-        fields = user.get("fields", {})
-        user_id = fields.get("User_ID")
-        if user_id:
-            by_user_id[str(user_id)] = user
-        rec_id = user.get("id")
-        if isinstance(rec_id, int):
-            by_record_id[rec_id] = user
-    return by_user_id, by_record_id
-
-
 def _find_event_record(events: list[dict], event_type: str) -> dict | None:
     for row in events:
         if _to_str(row.get("fields", {}).get("Event_ID")) == event_type:
@@ -56,11 +55,6 @@ def _get_event_recipient_mode(event_record: dict | None) -> str:
     return RECIPIENT_MODE_SUBSCRIBERS_ONLY
 
 
-def _resolve_owner_user_id(context: dict | None) -> str:
-    actors = _resolve_batch_actor_user_ids(context)
-    return actors.get("owner", "")
-
-
 def _extract_user_id_from_costing_ref(raw_value, costing_user_id_by_rec_id: dict[int, str]) -> str:
     value = _normalize_ref_value(raw_value)
     if isinstance(value, int):
@@ -71,20 +65,22 @@ def _extract_user_id_from_costing_ref(raw_value, costing_user_id_by_rec_id: dict
     return text
 
 
-def _resolve_batch_actor_user_ids(context: dict | None) -> dict[str, str | list[str]]:
+def _context_batch_id(context: dict | None) -> int | None:
     if not context:
-        return {"owner": "", "creator": "", "notifiers": []}
+        return None
     batch_id = context.get("batch_id")
-    if not isinstance(batch_id, int):
+    return batch_id if isinstance(batch_id, int) else None
+
+
+def _resolve_batch_actor_user_ids(
+    context: dict | None,
+    masters: list[dict],
+    costing_user_id_by_rec_id: dict[int, str],
+) -> dict[str, str | list[str]]:
+    batch_id = _context_batch_id(context)
+    if batch_id is None:
         return {"owner": "", "creator": "", "notifiers": []}
 
-    masters = costing_client.get_records("ProductBatchMaster")
-    costing_users = costing_client.get_records("Users")
-    costing_user_id_by_rec_id = {
-        row.get("id"): _to_str(row.get("fields", {}).get("User_ID"))
-        for row in costing_users
-        if isinstance(row.get("id"), int)
-    }
     for record in masters:
         if record.get("id") != batch_id:
             continue
@@ -117,8 +113,7 @@ def _add_user_if_valid(
     user: dict | None,
     recipients: list[dict],
     seen_telegram_ids: set[str],
-    role_name_by_id: dict[int, str] | None = None,
-    role_id_by_id: dict[int, str] | None = None,
+    directory: PulseUserDirectory,
 ) -> None:
     if not user:
         return
@@ -132,10 +127,9 @@ def _add_user_if_valid(
     role_ref = _normalize_ref_value(fields.get("Role"))
     role_name = ""
     role_id = ""
-    if isinstance(role_ref, int) and role_name_by_id:
-        role_name = _to_str(role_name_by_id.get(role_ref)).strip()
-    if isinstance(role_ref, int) and role_id_by_id:
-        role_id = _to_str(role_id_by_id.get(role_ref)).strip()
+    if isinstance(role_ref, int):
+        role_name = directory.role_name_by_id.get(role_ref, "")
+        role_id = directory.role_id_by_id.get(role_ref, "")
     recipients.append(
         {
             "user_id": user_id,
@@ -151,14 +145,9 @@ def _add_user_if_valid(
 def _get_subscription_recipients(
     event_type: str,
     event_record: dict | None,
-    users: list[dict],
-    role_ids_by_user_record: dict[int, set[int]] | None = None,
-    role_name_by_id: dict[int, str] | None = None,
-    role_id_by_id: dict[int, str] | None = None,
+    directory: PulseUserDirectory,
+    subs: list[dict],
 ) -> list[dict]:
-    subs = pulse_client.get_records("Notification_Subscriptions")
-    users_by_user_id, users_by_record_id = _build_users_index(users)
-
     event_row_id = event_record.get("id") if event_record else None
     recipients = []
     seen_telegram_ids: set[str] = set()
@@ -182,51 +171,23 @@ def _get_subscription_recipients(
 
         explicit_user = None
         if isinstance(user_value, int):
-            explicit_user = users_by_record_id.get(user_value)
+            explicit_user = directory.user_by_record_id.get(user_value)
         elif user_value not in (None, "", 0, "0"):
-            explicit_user = users_by_user_id.get(_to_str(user_value))
+            explicit_user = directory.user_by_user_id.get(_to_str(user_value).strip())
         if explicit_user:
-            _add_user_if_valid(
-                explicit_user,
-                recipients,
-                seen_telegram_ids,
-                role_name_by_id=role_name_by_id,
-                role_id_by_id=role_id_by_id,
-            )
+            _add_user_if_valid(explicit_user, recipients, seen_telegram_ids, directory)
             continue
 
         if not isinstance(role_value, int):
             continue
 
-        for user in users:
-            user_fields = user.get("fields", {})
-            role_ids = set()
-            user_rec_id = user.get("id")
-            if isinstance(user_rec_id, int) and role_ids_by_user_record:
-                role_ids.update(role_ids_by_user_record.get(user_rec_id, set()))
-            user_role = _normalize_ref_value(user_fields.get("Role"))
-            if isinstance(user_role, int):
-                role_ids.add(user_role)
-            if role_value not in role_ids:
-                continue
-            _add_user_if_valid(
-                user,
-                recipients,
-                seen_telegram_ids,
-                role_name_by_id=role_name_by_id,
-                role_id_by_id=role_id_by_id,
-            )
+        for user in directory.users_with_role_refs([role_value]):
+            _add_user_if_valid(user, recipients, seen_telegram_ids, directory)
 
     return recipients
 
 
-def _get_context_role_recipients(
-    context: dict | None,
-    users: list[dict],
-    role_ids_by_user_record: dict[int, set[int]] | None = None,
-    role_name_by_id: dict[int, str] | None = None,
-    role_id_by_id: dict[int, str] | None = None,
-) -> list[dict]:
+def _get_context_role_recipients(context: dict | None, directory: PulseUserDirectory) -> list[dict]:
     if not context:
         return []
     role_names = context.get("recipient_roles")
@@ -236,41 +197,15 @@ def _get_context_role_recipients(
     if not normalized:
         return []
 
-    roles = pulse_client.get_records("Roles")
-    role_ids = {
-        row.get("id")
-        for row in roles
-        if str(row.get("fields", {}).get("Role_Name") or "").strip() in normalized
-    }
+    role_ids = [role_ref for role_ref, name in directory.role_name_by_id.items() if name in normalized]
     recipients = []
     seen_telegram_ids: set[str] = set()
-    for user in users:
-        user_fields = user.get("fields", {})
-        user_role_ids: set[int] = set()
-        user_rec_id = user.get("id")
-        if isinstance(user_rec_id, int) and role_ids_by_user_record:
-            user_role_ids.update(role_ids_by_user_record.get(user_rec_id, set()))
-        user_role = _normalize_ref_value(user_fields.get("Role"))
-        if isinstance(user_role, int):
-            user_role_ids.add(user_role)
-        if not (user_role_ids & role_ids):
-            continue
-        _add_user_if_valid(
-            user,
-            recipients,
-            seen_telegram_ids,
-            role_name_by_id=role_name_by_id,
-            role_id_by_id=role_id_by_id,
-        )
+    for user in directory.users_with_role_refs(role_ids):
+        _add_user_if_valid(user, recipients, seen_telegram_ids, directory)
     return recipients
 
 
-def _get_context_user_recipients(
-    context: dict | None,
-    users: list[dict],
-    role_name_by_id: dict[int, str] | None = None,
-    role_id_by_id: dict[int, str] | None = None,
-) -> list[dict]:
+def _get_context_user_recipients(context: dict | None, directory: PulseUserDirectory) -> list[dict]:
     if not context:
         return []
     user_ids = context.get("recipient_user_ids")
@@ -279,125 +214,87 @@ def _get_context_user_recipients(
     targets = {str(uid).strip() for uid in user_ids if str(uid).strip()}
     if not targets:
         return []
-    users_by_user_id, _ = _build_users_index(users)
     recipients: list[dict] = []
     seen_telegram_ids: set[str] = set()
     for user_id in sorted(targets):
-        _add_user_if_valid(
-            users_by_user_id.get(user_id),
-            recipients,
-            seen_telegram_ids,
-            role_name_by_id=role_name_by_id,
-            role_id_by_id=role_id_by_id,
-        )
+        _add_user_if_valid(directory.user_by_user_id.get(user_id), recipients, seen_telegram_ids, directory)
     return recipients
 
 
+def _load_subscriber_tables(context: dict | None) -> dict:
+    tables: dict = {table: pulse_client.get_records(table) for table in _PULSE_TABLES}
+    tables["directory"] = pulse_user_directory(pulse_client)
+    tables["costing:ProductBatchMaster"] = []
+    tables["costing:user_id_by_record_id"] = {}
+    if _context_batch_id(context) is not None:
+        tables["costing:ProductBatchMaster"] = costing_client.get_records("ProductBatchMaster")
+        tables["costing:user_id_by_record_id"] = costing_user_directory(costing_client).user_id_by_record_id
+    return tables
+
+
+async def _load_subscriber_tables_async(context: dict | None) -> dict:
+    needs_actors = _context_batch_id(context) is not None
+    reads = [async_pulse_client.get_records(table) for table in _PULSE_TABLES]
+    reads.append(pulse_user_directory_async(async_pulse_client))
+    if needs_actors:
+        reads.append(async_costing_client.get_records("ProductBatchMaster"))
+        reads.append(costing_user_directory_async(async_costing_client))
+    results = await asyncio.gather(*reads)
+    tables: dict = dict(zip(_PULSE_TABLES, results))
+    tables["directory"] = results[len(_PULSE_TABLES)]
+    tables["costing:ProductBatchMaster"] = results[len(_PULSE_TABLES) + 1] if needs_actors else []
+    tables["costing:user_id_by_record_id"] = results[-1].user_id_by_record_id if needs_actors else {}
+    return tables
+
+
 def get_subscribers(event_type: str, context: dict | None = None) -> list[dict]:
-    events = pulse_client.get_records("Notification_Events")
-    users = pulse_client.get_records("Users")
-    roles = pulse_client.get_records("Roles")
-    users_by_user_id, _ = _build_users_index(users)
-    role_name_by_id = {
-        row.get("id"): _to_str(row.get("fields", {}).get("Role_Name")).strip()
-        for row in roles
-        if isinstance(row.get("id"), int)
-    }
-    role_id_by_id = {
-        row.get("id"): _to_str(row.get("fields", {}).get("Role_ID")).strip()
-        for row in roles
-        if isinstance(row.get("id"), int)
-    }
-    role_ids_by_user_record: dict[int, set[int]] = {}
-    try:
-        assignments = pulse_client.get_records("UserRoleAssignment")
-    except Exception:
-        assignments = []
-    for row in assignments:
-        fields = row.get("fields", {})
-        if not bool(fields.get("Active", True)):
-            continue
-        user_ref = _normalize_ref_value(fields.get("User"))
-        role_ref = _normalize_ref_value(fields.get("Role"))
-        if not isinstance(user_ref, int) or not isinstance(role_ref, int):
-            continue
-        role_ids_by_user_record.setdefault(user_ref, set()).add(role_ref)
+    return _resolve_subscribers(event_type, context, _load_subscriber_tables(context))
+
+
+async def get_subscribers_async(event_type: str, context: dict | None = None) -> list[dict]:
+    return _resolve_subscribers(event_type, context, await _load_subscriber_tables_async(context))
+
+
+def _resolve_subscribers(event_type: str, context: dict | None, tables: dict) -> list[dict]:
+    events = tables["Notification_Events"]
+    directory: PulseUserDirectory = tables["directory"]
 
     event_record = _find_event_record(events, event_type)
     recipient_mode = _get_event_recipient_mode(event_record)
 
+    actors = _resolve_batch_actor_user_ids(
+        context,
+        tables["costing:ProductBatchMaster"],
+        tables["costing:user_id_by_record_id"],
+    )
     recipients = []
     seen_telegram_ids: set[str] = set()
 
     if recipient_mode in (RECIPIENT_MODE_OWNER_ONLY, RECIPIENT_MODE_OWNER_PLUS_SUBSCRIBERS):
-        owner_user_id = _resolve_owner_user_id(context)
-        owner_user = users_by_user_id.get(owner_user_id)
-        _add_user_if_valid(
-            owner_user,
-            recipients,
-            seen_telegram_ids,
-            role_name_by_id=role_name_by_id,
-            role_id_by_id=role_id_by_id,
-        )
+        owner_user = directory.user_by_user_id.get(_to_str(actors.get("owner")).strip())
+        _add_user_if_valid(owner_user, recipients, seen_telegram_ids, directory)
 
+    candidates: list[dict] = []
     if recipient_mode in (RECIPIENT_MODE_SUBSCRIBERS_ONLY, RECIPIENT_MODE_OWNER_PLUS_SUBSCRIBERS):
-        subscription_recipients = _get_subscription_recipients(
-            event_type,
-            event_record,
-            users,
-            role_ids_by_user_record=role_ids_by_user_record,
-            role_name_by_id=role_name_by_id,
-            role_id_by_id=role_id_by_id,
+        candidates.extend(
+            _get_subscription_recipients(event_type, event_record, directory, tables["Notification_Subscriptions"])
         )
-        for user in subscription_recipients:
-            telegram_id = _to_str(user.get("telegram_id"))
-            if not telegram_id or telegram_id in seen_telegram_ids:
-                continue
-            recipients.append(user)
-            seen_telegram_ids.add(telegram_id)
-
-    context_role_recipients = _get_context_role_recipients(
-        context,
-        users,
-        role_ids_by_user_record=role_ids_by_user_record,
-        role_name_by_id=role_name_by_id,
-        role_id_by_id=role_id_by_id,
-    )
-    for user in context_role_recipients:
-        telegram_id = _to_str(user.get("telegram_id"))
-        if not telegram_id or telegram_id in seen_telegram_ids:
-            continue
-        recipients.append(user)
-        seen_telegram_ids.add(telegram_id)
-
-    context_user_recipients = _get_context_user_recipients(
-        context,
-        users,
-        role_name_by_id=role_name_by_id,
-        role_id_by_id=role_id_by_id,
-    )
-    for user in context_user_recipients:
+    candidates.extend(_get_context_role_recipients(context, directory))
+    candidates.extend(_get_context_user_recipients(context, directory))
+    for user in candidates:
         telegram_id = _to_str(user.get("telegram_id"))
         if not telegram_id or telegram_id in seen_telegram_ids:
             continue
         recipients.append(user)
         seen_telegram_ids.add(telegram_id)
 
-    actors = _resolve_batch_actor_user_ids(context)
     actor_user_ids = [
         _to_str(actors.get("owner")).strip(),
         _to_str(actors.get("creator")).strip(),
         *[_to_str(user_id).strip() for user_id in actors.get("notifiers", []) if _to_str(user_id).strip()],
     ]
-    users_by_user_id, _ = _build_users_index(users)
     for actor_user_id in actor_user_ids:
-        actor = users_by_user_id.get(actor_user_id)
-        _add_user_if_valid(
-            actor,
-            recipients,
-            seen_telegram_ids,
-            role_name_by_id=role_name_by_id,
-            role_id_by_id=role_id_by_id,
-        )
+        actor = directory.user_by_user_id.get(actor_user_id)
+        _add_user_if_valid(actor, recipients, seen_telegram_ids, directory)
 
     return recipients
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import inspect
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+from pulse.config import PULSE_JOB_JOURNAL_DIR, PULSE_JOB_MAX_ATTEMPTS, PULSE_JOB_RETRY_SECONDS
+
+_MAX_BACKOFF_SECONDS = 60.0
+
+
+class JobJournal:
+    """One JSON file per unfinished job, rewritten atomically after every step."""
+
+    def __init__(self, directory: str | Path | None):
+        self.directory = Path(directory) if directory else None
+
+    def save(self, job: dict) -> None:
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{job['id']}.json"
+        temp_path = path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(job, default=str), encoding="utf-8")
+        os.replace(temp_path, path)
+
+    def remove(self, job_id: str) -> None:
+        if self.directory is None:
+            return
+        try:
+            (self.directory / f"{job_id}.json").unlink()
+        except FileNotFoundError:
+            pass
+
+    def pending(self) -> list[dict]:
+        if self.directory is None or not self.directory.exists():
+            return []
+        jobs = []
+        for path in self.directory.glob("*.json"):
+            try:
+                jobs.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+        return sorted(jobs, key=lambda job: job.get("created_at", 0))
+
+
+class JobRun:
+    """Handle a job handler uses to run its steps and report progress."""
+
+    def __init__(self, pipeline: JobPipeline, job: dict, bot):
+        self.pipeline = pipeline
+        self.job = job
+        self.bot = bot
+
+    @property
+    def payload(self) -> dict:
+        return self.job["payload"]
+
+    def is_done(self, name: str) -> bool:
+        return name in self.job["done"]
+
+    async def step(self, name: str, fn, *args):
+        """Run ``fn(*args)`` once per job; a resumed job gets the journaled result back.
+
+        Plain functions run in a worker thread so steps gathered together overlap.
+        Results are journaled, so they must be JSON-serialisable.
+        """
+        if name in self.job["done"]:
+            return self.job["done"][name]
+        if inspect.iscoroutinefunction(fn):
+            result = await fn(*args)
+        else:
+            result = await asyncio.to_thread(fn, *args)
+        self.job["done"][name] = result
+        self.pipeline.journal.save(self.job)
+        return result
+
+    async def report(self, text: str) -> None:
+        chat_id = self.payload.get("chat_id")
+        if chat_id in (None, "") or self.bot is None:
+            return
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text)
+        except Exception:
+            pass
+
+
+class JobPipeline:
+    """Runs journaled background jobs on the bot's event loop.
+
+    ``submit`` writes the job to the journal before scheduling it, and every
+    finished step is journaled again, so ``resume`` can pick up jobs that were
+    cut short by a restart without repeating the steps they already did. A job
+    that raises is retried with backoff up to ``max_attempts`` times.
+    """
+
+    def __init__(
+        self,
+        journal_dir: str | Path | None = PULSE_JOB_JOURNAL_DIR,
+        max_attempts: int = PULSE_JOB_MAX_ATTEMPTS,
+        retry_delay: float = PULSE_JOB_RETRY_SECONDS,
+    ):
+        self.journal = JobJournal(journal_dir)
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_delay = max(0.0, float(retry_delay))
+        self._handlers: dict[str, object] = {}
+        self._running: dict[str, asyncio.Task] = {}
+
+    def register(self, kind: str, handler) -> None:
+        """``handler`` is ``async def handler(run: JobRun)``; the job's failure text goes in ``payload["title"]``."""
+        self._handlers[kind] = handler
+
+    def submit(self, kind: str, payload: dict, bot) -> str:
+        if kind not in self._handlers:
+            raise KeyError(f"No job handler registered for '{kind}'")
+        job = {"id": uuid.uuid4().hex, "kind": kind, "payload": payload, "done": {}, "attempts": 0, "created_at": time.time()}
+        self.journal.save(job)
+        self._start(job, bot)
+        return job["id"]
+
+    async def resume(self, bot) -> int:
+        """Restart journaled jobs that are not already running; returns how many were started."""
+        started = 0
+        for job in self.journal.pending():
+            if job.get("id") in self._running or job.get("kind") not in self._handlers:
+                continue
+            job.setdefault("done", {})
+            job.setdefault("attempts", 0)
+            self._start(job, bot)
+            started += 1
+        return started
+
+    async def drain(self) -> None:
+        """Wait for the jobs running on the current event loop, including ones they submit."""
+        loop = asyncio.get_running_loop()
+        while True:
+            tasks = [task for task in self._running.values() if task.get_loop() is loop]
+            if not tasks:
+                return
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _start(self, job: dict, bot) -> None:
+        # A fresh context keeps the job out of the submitting handler's unit of work.
+        task = asyncio.get_running_loop().create_task(self._run(job, bot), context=contextvars.Context())
+        self._running[job["id"]] = task
+        task.add_done_callback(lambda _task, job_id=job["id"]: self._running.pop(job_id, None))
+
+    async def _run(self, job: dict, bot) -> None:
+        run = JobRun(self, job, bot)
+        handler = self._handlers[job["kind"]]
+        while True:
+            job["attempts"] += 1
+            self.journal.save(job)
+            try:
+                await handler(run)
+                break
+            except Exception as exc:
+                if job["attempts"] < self.max_attempts:
+                    await asyncio.sleep(min(self.retry_delay * (2 ** (job["attempts"] - 1)), _MAX_BACKOFF_SECONDS))
+                    continue
+                title = job["payload"].get("title") or job["kind"]
+                print(f"Background job {job['kind']} {job['id']} failed after {job['attempts']} attempts: {exc}")
+                await run.report(f"{title} failed: {exc}")
+                break
+        self.journal.remove(job["id"])
+
+
+job_pipeline = JobPipeline()
@@ -0,0 +1,698 @@
+"""End-to-end benchmarks for the production workflow, run against the Grist emulator.
+
+Seeds Costing and Pulse docs at production scale, drives each main flow through
+the same handlers the bot uses (with the harness' fake Telegram objects), and
+reports wall time, Grist round trips, bytes transferred and peak Python memory
+per flow. Results can be saved as a baseline and later runs compared against it:
+
+    python -m pulse.testing.benchmark --save-baseline artifacts/benchmarks/baseline.json
+    python -m pulse.testing.benchmark --compare artifacts/benchmarks/baseline.json
+
+Every flow starts with cold caches and a fresh rate limiter so round-trip counts
+are deterministic; the client-side limiter still applies as configured, so raise
+GRIST_RATE_LIMIT_PER_SECOND to measure processing cost alone. Peak
+memory is measured with tracemalloc, which also sees the in-process emulator
+encoding its responses and slows every flow down by a similar factor; compare
+runs made with the same settings.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import inspect
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+if __name__ == "__main__":
+    # A benchmark run must never reach the real Grist server or documents named in .env.
+    os.environ.update(
+        {
+            "PULSE_GRIST_SERVER": "http://grist-emulator.invalid",
+            "PULSE_DOC_ID": "bench-pulse",
+            "PULSE_API_KEY": "bench",
+            "COSTING_DOC_ID": "bench-costing",
+            "COSTING_API_KEY": "bench",
+        }
+    )
+
+from pulse.core.resilience import reset_guards
+from pulse.core.table_cache import snapshot_cache
+from pulse.core.unit_of_work import unit_of_work
+from pulse.core.write_behind import flush_all
+from pulse.data.batch_snapshot import batch_snapshots
+from pulse.data.ms_visibility import clear_ms_visibility
+from pulse.data.process_routing import clear_process_routings
+from pulse.data.production_repo import ProductionRepo
+from pulse.data.schema_registry import clear_schema_registries
+from pulse.data.stage_timeline import clear_stage_timelines
+from pulse.data.user_directory import clear_user_directories
+from pulse.tasks.job_pipeline import JobPipeline, JobRun
+from pulse.testing.grist_emulator import GristEmulator
+from pulse.testing.harness import _FakeBot, _FakeContext, _FakeMessage, _FakeUpdate
+
+
+DEFAULT_BASELINE_PATH = Path("artifacts") / "benchmarks" / "baseline.json"
+
+_PROCESSES = (
+    ("Cutting", ("Cutting",)),
+    ("Cutting - Bending", ("Cutting", "Bending")),
+    ("Cutting - Bending - Welding", ("Cutting", "Bending", "Welding")),
+    ("Cutting - Welding - Painting", ("Cutting", "Welding", "Painting")),
+)
+_STAGE_ROLES = {
+    "Cutting": "Cutting_Supervisor",
+    "Bending": "Bending_Supervisor",
+    "Welding": "Welding_Supervisor",
+    "Painting": "Painting_Supervisor",
+}
+_ROLES = ("System_Admin", "Production_Manager", "Production_Supervisor", *_STAGE_ROLES.values())
+_EVENTS = (
+    ("production_batch_created", "OWNER_PLUS_SUBSCRIBERS", ("Production_Manager",)),
+    ("ms_stage_pending", "OWNER_PLUS_SUBSCRIBERS", ("Production_Manager",)),
+    ("ms_stage_completed", "SUBSCRIBERS_ONLY", ("Production_Manager",)),
+    ("production_batch_not_scheduled_reminder", "SUBSCRIBERS_ONLY", ("Production_Manager",)),
+    ("supervisor_batch_schedule_reminder", "SUBSCRIBERS_ONLY", ()),
+    ("ms_stage_pending_reminder", "SUBSCRIBERS_ONLY", ()),
+)
+_PENDING_CONFIRMATION = "Done - Pending Confirmation"
+_COMPLETED = "Cutting Completed"
+_PARTS_PER_BATCH = 8
+
+
+@dataclass(frozen=True)
+class BenchScale:
+    batches: int = 500
+    ms_rows: int = 20_000
+    history_rows: int = 200_000
+    users: int = 60
+    parts: int = 400
+
+
+SMALL_SCALE = BenchScale(batches=12, ms_rows=96, history_rows=600, users=14, parts=24)
+
+
+@dataclass
+class FlowResult:
+    name: str
+    wall_seconds: float
+    round_trips: int
+    bytes_transferred: int
+    peak_memory_bytes: int
+    error: str = ""
+
+
+@dataclass
+class BenchData:
+    """Generated fixtures plus the actors and rows each flow operates on."""
+
+    costing: dict
+    pulse: dict
+    targets: dict = field(default_factory=dict)
+
+
+# -- data generation -------------------------------------------------------
+
+
+def _table(columns: dict, records: list[dict]) -> dict:
+    return {"columns": columns, "records": records}
+
+
+def _iso(value: datetime) -> str:
+    return value.replace(microsecond=0).isoformat()
+
+
+def build_bench_data(scale: BenchScale = BenchScale(), seed: int = 7, now: datetime | None = None) -> BenchData:
+    rng = random.Random(seed)
+    now = now or datetime.utcnow()
+
+    roles = [{"id": pos, "fields": {"Role_ID": f"R{pos:02d}", "Role_Name": name}} for pos, name in enumerate(_ROLES, start=1)]
+    role_id_by_name = {name: pos for pos, name in enumerate(_ROLES, start=1)}
+    # One admin, one manager, then supervisors round-robin across the remaining roles.
+    user_roles = [_ROLES[pos] if pos < 2 else _ROLES[2 + (pos - 2) % (len(_ROLES) - 2)] for pos in range(scale.users)]
+    pulse_users = []
+    costing_users = []
+    for pos, role_name in enumerate(user_roles, start=1):
+        user_id = f"U{pos:03d}"
+        pulse_users.append(
+            {
+                "id": pos,
+                "fields": {
+                    "User_ID": user_id,
+                    "Name": f"{role_name.replace('_', ' ')} {pos:03d}",
+                    "Telegram_ID": str(700000 + pos),
+                    "Role": role_id_by_name[role_name],
+                    "Reports_To": "U002" if pos > 2 else "",
+                    "Active": True,
+                },
+            }
+        )
+        costing_users.append({"id": pos, "fields": {"User_ID": user_id, "Name": f"{role_name.replace('_', ' ')} {pos:03d}"}})
+    users_by_role: dict[str, list[int]] = {}
+    for pos, role_name in enumerate(user_roles, start=1):
+        users_by_role.setdefault(role_name, []).append(pos)
+
+    events = []
+    subscriptions = []
+    for pos, (event_id, mode, role_names) in enumerate(_EVENTS, start=1):
+        events.append({"id": pos, "fields": {"Event_ID": event_id, "Recipient_Mode": mode, "Enabled": True}})
+        for role_name in role_names:
+            subscriptions.append({"User": None, "Role": role_id_by_name[role_name], "Event": pos, "Enabled": True})
+
+    process_master = []
+    process_stage = []
+    stage_assignments = []
+    for seq_id, (name, stages) in enumerate(_PROCESSES, start=1):
+        process_master.append({"id": seq_id, "fields": {"process_name": name, "display_label": name.replace(" - ", " > "), "legacy_process_seq_text": name}})
+        for seq_no, stage in enumerate(stages, start=1):
+            stage_id = len(process_stage) + 1
+            role_name = _STAGE_ROLES[stage]
+            process_stage.append(
+                {
+                    "id": stage_id,
+                    "fields": {"process_seq_id": seq_id, "stage_name": stage, "seq_no": seq_no, "supervisor_role": role_name, "resolved_role_name": role_name},
+                }
+            )
+            for user_ref in users_by_role.get(role_name, [])[:2]:
+                stage_assignments.append({"process_stage_id": stage_id, "user_id": user_ref, "active": True, "can_act": True})
+
+    materials = [{"id": pos, "fields": {"MasterMaterial": f"MS Material {pos:02d}"}} for pos in range(1, 21)]
+    part_ms_list = []
+    for part in range(1, scale.parts + 1):
+        for _ in range(2):
+            part_ms_list.append(
+                {
+                    "id": len(part_ms_list) + 1,
+                    "fields": {
+                        "ProductPartName": part,
+                        "ProductPartName_ProductPartName": f"Part {part:04d}",
+                        "process_seq": rng.randint(1, len(_PROCESSES)),
+                        "MaterialToCut": rng.randint(1, len(materials)),
+                        "Length_mm": rng.choice((300, 450, 600, 900, 1200, 2400)),
+                        "QtyNos": rng.randint(1, 6),
+                        "Thickness": "",
+                        "Remarks": "",
+                    },
+                }
+            )
+    ms_list_ids_by_part: dict[int, list[int]] = {}
+    for record in part_ms_list:
+        ms_list_ids_by_part.setdefault(record["fields"]["ProductPartName"], []).append(record["id"])
+
+    supervisors = users_by_role.get("Production_Supervisor") or [1]
+    pending_count = max(2, scale.batches // 50)
+    masters = []
+    for batch_id in range(1, scale.batches + 1):
+        pending = batch_id > scale.batches - pending_count
+        created = now - timedelta(days=rng.randint(1, 90), hours=rng.randint(0, 23))
+        owner = supervisors[batch_id % len(supervisors)]
+        notifiers = [ref for ref in rng.sample(supervisors, min(2, len(supervisors))) if ref != owner]
+        parts = rng.sample(range(1, scale.parts + 1), min(_PARTS_PER_BATCH, scale.parts))
+        masters.append(
+            {
+                "id": batch_id,
+                "fields": {
+                    "batch_no": f"{created.strftime('%b%y').upper()}-BM{batch_id % 9 + 1:02d}-MS-{batch_id:03d}",
+                    "product_model": f"BM{batch_id % 9 + 1:02d}",
+                    "qty": rng.randint(1, 20),
+                    "batch_type": "MS",
+                    "include_ms": True,
+                    "include_cnc": False,
+                    "include_store": False,
+                    "created_by": 2,
+                    "owner_user": owner,
+                    "notifier_users": ["L", *notifiers],
+                    "created_date": _iso(created),
+                    "start_date": None if pending else _iso(created + timedelta(hours=4)),
+                    "scheduled_date": None if pending or batch_id % 2 else _iso(created + timedelta(days=2)),
+                    "completion_date": None,
+                    "approval_status": "Pending Approval" if pending else "Approved",
+                    "approval_date": None if pending else _iso(created + timedelta(hours=4)),
+                    "approved_by": None if pending else 2,
+                    "overall_status": "Pending Approval" if pending else "In Progress",
+                    "selected_part_ids": ",".join(str(part) for part in parts),
+                    "notification_users": ",".join(str(ref) for ref in notifiers),
+                    "ms_cutlist_pdf": None,
+                    "cnc_cutlist_pdf": None,
+                },
+            }
+        )
+
+    approved = [record for record in masters if record["fields"]["approval_status"] == "Approved"]
+    ms_rows = []
+    for pos in range(scale.ms_rows):
+        master = approved[pos % len(approved)]
+        part_refs = [ms_id for part in master["fields"]["selected_part_ids"].split(",")[:2] for ms_id in ms_list_ids_by_part[int(part)]]
+        seq_id = rng.randint(1, len(_PROCESSES))
+        stages = _PROCESSES[seq_id - 1][1]
+        index = rng.randrange(len(stages))
+        stage = stages[index]
+        next_stage = stages[index + 1] if index + 1 < len(stages) else ""
+        roll = rng.random()
+        if roll < 0.15:
+            status, role = _COMPLETED, ""
+        elif roll < 0.35 and next_stage:
+            status, role = _PENDING_CONFIRMATION, _STAGE_ROLES[next_stage]
+        elif not next_stage and index:
+            status, role = f"In {stage}", _STAGE_ROLES[stage]
+        else:
+            status, role = f"{stage} Pending", _STAGE_ROLES[stage]
+        updated = now - timedelta(days=rng.randint(0, 20), hours=rng.randint(0, 23))
+        qty = float(rng.randint(2, 60))
+        ms_rows.append(
+            {
+                "id": pos + 1,
+                "fields": {
+                    "batch_id": master["id"],
+                    "product_part": ["L", *part_refs],
+                    "process_seq": seq_id,
+                    "total_qty": qty,
+                    "required_qty": qty,
+                    "current_stage_index": index,
+                    "current_stage_name": stage,
+                    "next_stage_name": next_stage,
+                    "current_stage_role_name": role,
+                    "current_status": status,
+                    "status": status,
+                    "supervisor_remarks": "",
+                    "scheduled_date": None,
+                    "row_cutlist_pdf": None,
+                    "created_at": master["fields"]["start_date"],
+                    "updated_at": _iso(updated),
+                    "last_updated_by": 2,
+                },
+            }
+        )
+
+    history = []
+    for pos in range(scale.history_rows):
+        row = ms_rows[pos % len(ms_rows)]
+        stamp = now - timedelta(days=rng.randint(0, 90), minutes=rng.randint(0, 1440))
+        history.append(
+            {
+                "batch_id": row["fields"]["batch_id"],
+                "entity_type": "MS",
+                "entity_id": row["id"],
+                "old_status": f"{row['fields']['current_stage_name']} Pending",
+                "new_status": rng.choice((_PENDING_CONFIRMATION, f"In {row['fields']['current_stage_name']}", _COMPLETED)),
+                "updated_by": rng.randint(1, scale.users),
+                "timestamp": _iso(stamp),
+                "remarks": "",
+            }
+        )
+
+    # Pin the rows the action flows work on so every run touches the same data.
+    target_batch = approved[0]["id"]
+    batch_rows = [row for row in ms_rows if row["fields"]["batch_id"] == target_batch]
+    cutting_rows = batch_rows[: max(1, len(batch_rows) // 2)]
+    for row in cutting_rows:
+        row["fields"].update(
+            {
+                "process_seq": 2,
+                "current_stage_index": 0,
+                "current_stage_name": "Cutting",
+                "next_stage_name": "Bending",
+                "current_stage_role_name": "Cutting_Supervisor",
+                "current_status": "Cutting Pending",
+                "status": "Cutting Pending",
+            }
+        )
+    handoff_rows = [row for row in ms_rows if row["fields"]["batch_id"] != target_batch][:2]
+    for row in handoff_rows:
+        row["fields"].update(
+            {
+                "process_seq": 3,
+                "current_stage_index": 0,
+                "current_stage_name": "Cutting",
+                "next_stage_name": "Bending",
+                "current_stage_role_name": "Bending_Supervisor",
+                "current_status": _PENDING_CONFIRMATION,
+                "status": _PENDING_CONFIRMATION,
+            }
+        )
+
+    delegations = [
+        {"batch_ms_id": row["id"], "delegated_to_user": supervisors[0], "active": True, "can_act": True}
+        for row in ms_rows[:: max(1, len(ms_rows) // 25)]
+    ]
+
+    def _user(role_name: str) -> dict:
+        ref = users_by_role.get(role_name, [2])[0]
+        fields = pulse_users[ref - 1]["fields"]
+        return {"record_id": ref, "user_id": fields["User_ID"], "telegram_id": fields["Telegram_ID"], "role": role_name, "costing_ref": ref}
+
+    new_batch_parts = rng.sample(range(1, scale.parts + 1), min(_PARTS_PER_BATCH, scale.parts))
+    targets = {
+        "manager": _user("Production_Manager"),
+        "cutting": _user("Cutting_Supervisor"),
+        "bending": _user("Bending_Supervisor"),
+        "owner_ref": supervisors[0],
+        "new_batch_parts": new_batch_parts,
+        "pending_batch_id": masters[-1]["id"],
+        "done_batch_id": target_batch,
+        "summary_batch_id": target_batch,
+        "summary_batch_no": approved[0]["fields"]["batch_no"],
+        "accept_row_id": handoff_rows[0]["id"],
+        "reject_row_id": handoff_rows[-1]["id"],
+    }
+
+    costing = {
+        "tables": {
+            "Users": _table({"User_ID": "Text", "Name": "Text"}, costing_users),
+            "ProcessMaster": _table({"process_name": "Text", "display_label": "Text", "legacy_process_seq_text": "Text"}, process_master),
+            "ProcessStage": _table(
+                {"process_seq_id": "Ref:ProcessMaster", "stage_name": "Text", "seq_no": "Int", "supervisor_role": "Text", "resolved_role_name": "Text"},
+                process_stage,
+            ),
+            "ProcessStageUserAssignment": _table(
+                {"process_stage_id": "Ref:ProcessStage", "user_id": "Ref:Users", "active": "Bool", "can_act": "Bool"}, stage_assignments
+            ),
+            "BatchMSDelegation": _table(
+                {"batch_ms_id": "Ref:ProductBatchMS", "delegated_to_user": "Ref:Users", "active": "Bool", "can_act": "Bool"}, delegations
+            ),
+            "MasterMaterial": _table({"MasterMaterial": "Text"}, materials),
+            "ProductPartMSList": _table(
+                {
+                    "ProductPartName": "Ref:ProductPart",
+                    "ProductPartName_ProductPartName": "Text",
+                    "process_seq": "Ref:ProcessMaster",
+                    "MaterialToCut": "Ref:MasterMaterial",
+                    "Length_mm": "Numeric",
+                    "QtyNos": "Numeric",
+                    "Thickness": "Text",
+                    "Remarks": "Text",
+                },
+                part_ms_list,
+            ),
+            "ProductionConfig": _table({"max_batch_qty": "Int"}, [{"max_batch_qty": 500}]),
+            "ProductBatchMaster": _table(dict(ProductionRepo.PRODUCT_BATCH_MASTER_SCHEMA), masters),
+            "ProductBatchMS": _table(
+                {**ProductionRepo.PRODUCT_BATCH_MS_SCHEMA, "status": "Text", "required_qty": "Numeric"},
+                ms_rows,
+            ),
+            "ProductBatchCNC": _table({"batch_id": "Ref:ProductBatchMaster", "status": "Text"}, []),
+            "ProductBatchStore": _table({"batch_id": "Ref:ProductBatchMaster", "status": "Text"}, []),
+            "BatchStatusHistory": _table(dict(ProductionRepo.BATCH_STATUS_HISTORY_SCHEMA), history),
+        }
+    }
+    pulse = {
+        "tables": {
+            "Roles": _table({"Role_ID": "Text", "Role_Name": "Text"}, roles),
+            "Users": _table(
+                {"User_ID": "Text", "Name": "Text", "Telegram_ID": "Text", "Role": "Ref:Roles", "Reports_To": "Text", "Active": "Bool"}, pulse_users
+            ),
+            "UserRoleAssignment": _table({"User": "Ref:Users", "Role": "Ref:Roles", "Active": "Bool"}, []),
+            "Notification_Events": _table({"Event_ID": "Text", "Recipient_Mode": "Text", "Enabled": "Bool"}, events),
+            "Notification_Subscriptions": _table(
+                {"User": "Ref:Users", "Role": "Ref:Roles", "Event": "Ref:Notification_Events", "Enabled": "Bool"}, subscriptions
+            ),
+            "Reminder_Rules": _table(
+                {"Rule_ID": "Text", "Threshold_Days": "Int", "Enabled": "Bool"},
+                [{"Rule_ID": event_id, "Threshold_Days": 2, "Enabled": True} for event_id, _, _ in _EVENTS[3:]],
+            ),
+            "Activity_Log": _table({"Timestamp": "Text", "User": "Ref:Users", "Action": "Text", "Result": "Text"}, []),
+        }
+    }
+    return BenchData(costing, pulse, targets)
+
+
+# -- flows -----------------------------------------------------------------
+
+
+class _BenchRuntime:
+    """Stands in for TestRuntimeClient: counts what the bot would have sent."""
+
+    def __init__(self):
+        self.messages = 0
+        self.documents = 0
+
+    def append_outbox(self, **_: Any) -> None:
+        self.messages += 1
+
+    def append_attachment(self, **_: Any) -> None:
+        self.documents += 1
+
+
+def _update_for(runtime: _BenchRuntime, actor: dict, user_data: dict | None = None):
+    chat_id = int(actor["telegram_id"])
+    message = _FakeMessage(runtime, "bench", actor["user_id"], actor["role"], chat_id)
+    context = _FakeContext(
+        {"user": {"user_id": actor["user_id"], "role": actor["role"], "record_id": actor["record_id"]}, **(user_data or {})},
+        _FakeBot(runtime, "bench"),
+    )
+    return _FakeUpdate(chat_id, message), context
+
+
+def _flows(data: BenchData, runtime: _BenchRuntime) -> list[tuple[str, Any]]:
+    from pulse.integrations import production
+    from pulse.reminders.engine import run_all_reminder_checks
+
+    targets = data.targets
+    # Flows standing in for one bot update run in a unit of work, as the production handlers do.
+    manager = targets["manager"]
+
+    async def batch_creation():
+        update, context = _update_for(
+            runtime,
+            manager,
+            {
+                "production_batch_flow": {
+                    "batch_mode": production._MODE_BY_PART,
+                    "batch_type": "MS Only",
+                    "model_code": "BM01",
+                    "batch_qty": 10,
+                    "selected_part_ids": targets["new_batch_parts"],
+                    "owner_user_ref": targets["owner_ref"],
+                    "notifier_user_refs": [],
+                }
+            },
+        )
+        with unit_of_work():
+            await production._create_batch_from_flow(update, context)
+
+    async def approve_batch():
+        _, context = _update_for(runtime, manager)
+        repo = ProductionRepo()
+        with unit_of_work():
+            updated = production.approve_batch_service(repo, targets["pending_batch_id"], manager["costing_ref"])
+        # Cut lists, PDFs and first-stage notifications now run in the background job; time them too.
+        job = {
+            "id": "bench",
+            "kind": "batch_approval",
+            "payload": {
+                "batch_id": targets["pending_batch_id"],
+                "batch_no": updated.get("master", {}).get("fields", {}).get("batch_no", ""),
+                "ms_rows": updated.get("ms_rows", []),
+                "part_ids": updated.get("part_ids", []),
+                "batch_qty": updated.get("batch_qty", 0),
+                "approved_by_name": "Manager",
+            },
+            "done": {},
+            "attempts": 1,
+        }
+        await production._run_batch_approval_job(JobRun(JobPipeline(journal_dir=None), job, context.bot))
+
+    async def my_ms_jobs():
+        update, context = _update_for(runtime, targets["cutting"])
+        with unit_of_work():
+            await production.start_my_ms_jobs(update, context)
+
+    async def bulk_done():
+        actor = targets["cutting"]
+        _, context = _update_for(runtime, actor)
+        with unit_of_work():
+            await production._mark_batch_stage_done(
+                ProductionRepo(), context, targets["done_batch_id"], actor["costing_ref"], actor["role"]
+            )
+
+    async def handoff_accept():
+        actor = targets["bending"]
+        _, context = _update_for(runtime, actor, {"suppress_ms_stage_pending_user_id": actor["user_id"]})
+        with unit_of_work():
+            await production.advance_ms_stage(ProductionRepo(), context, targets["accept_row_id"], actor["costing_ref"])
+
+    async def handoff_reject():
+        actor = targets["bending"]
+        _, context = _update_for(runtime, actor)
+        with unit_of_work():
+            await production._reject_ms_handoff_with_remarks(
+                ProductionRepo(), context, targets["reject_row_id"], actor["costing_ref"], actor["role"], "Edges not deburred", viewer_user_id=actor["user_id"]
+            )
+
+    def batch_summary():
+        with unit_of_work():
+            production._build_ms_batch_summary_text(ProductionRepo(), targets["summary_batch_id"], targets["summary_batch_no"])
+
+    async def reminder_sweep():
+        await run_all_reminder_checks(_FakeBot(runtime, "bench"))
+
+    return [
+        ("batch_creation", batch_creation),
+        ("approve_batch", approve_batch),
+        ("my_ms_jobs", my_ms_jobs),
+        ("bulk_done", bulk_done),
+        ("handoff_accept", handoff_accept),
+        ("handoff_reject", handoff_reject),
+        ("batch_summary", batch_summary),
+        ("reminder_sweep", reminder_sweep),
+    ]
+
+
+def _measure(name: str, fn, emulator: GristEmulator, track_memory: bool) -> FlowResult:
+    flush_all()
+    snapshot_cache.clear()
+    clear_schema_registries()
+    clear_process_routings()
+    clear_user_directories()
+    clear_ms_visibility()
+    clear_stage_timelines()
+    batch_snapshots.clear()
+    reset_guards()
+    emulator.reset_calls()
+    gc.collect()
+    if track_memory:
+        tracemalloc.start()
+    error = ""
+    started = time.perf_counter()
+    try:
+        result = fn()
+        if inspect.isawaitable(result):
+            asyncio.run(result)
+        # Buffered history rows are part of the flow's cost.
+        flush_all()
+    except Exception as exc:  # noqa: BLE001
+        error = f"{type(exc).__name__}: {exc}"
+    wall = time.perf_counter() - started
+    peak = 0
+    if track_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return FlowResult(name, wall, emulator.call_count(), emulator.bytes_transferred(), peak, error)
+
+
+def run_benchmarks(
+    scale: BenchScale = BenchScale(),
+    latency: float = 0.0,
+    seed: int = 7,
+    flows: list[str] | None = None,
+    track_memory: bool = True,
+) -> list[FlowResult]:
+    data = build_bench_data(scale, seed)
+    emulator = GristEmulator(latency=latency)
+    runtime = _BenchRuntime()
+    results = []
+    with emulator.activate():
+        repo = ProductionRepo()
+        emulator.load_fixture(data.costing, repo.costing_client.doc_id)
+        emulator.load_fixture(data.pulse, repo.pulse_client.doc_id)
+        for name, fn in _flows(data, runtime):
+            if flows and name not in flows:
+                continue
+            results.append(_measure(name, fn, emulator, track_memory))
+    return results
+
+
+# -- reporting and baselines -----------------------------------------------
+
+
+def results_payload(results: list[FlowResult], scale: BenchScale, latency: float, track_memory: bool) -> dict:
+    return {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "scale": asdict(scale),
+        "latency": latency,
+        "track_memory": track_memory,
+        "flows": {result.name: asdict(result) for result in results},
+    }
+
+
+def compare_results(current: dict, baseline: dict, tolerance: float = 0.2) -> list[str]:
+    """Return one line per metric that got worse than the baseline allows."""
+    regressions = []
+    for name, now in current.get("flows", {}).items():
+        before = baseline.get("flows", {}).get(name)
+        if not before:
+            continue
+        if now.get("error") and not before.get("error"):
+            regressions.append(f"{name}: now fails ({now['error']})")
+            continue
+        # Round trips are deterministic against the emulator, so any increase counts.
+        if now["round_trips"] > before["round_trips"]:
+            regressions.append(f"{name}: round trips {before['round_trips']} -> {now['round_trips']}")
+        for metric, label in (("bytes_transferred", "bytes"), ("wall_seconds", "wall time"), ("peak_memory_bytes", "peak memory")):
+            old, new = before.get(metric) or 0, now.get(metric) or 0
+            if old and new > old * (1 + tolerance):
+                regressions.append(f"{name}: {label} {old:,.3f} -> {new:,.3f} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def format_results(results: list[FlowResult]) -> str:
+    lines = [f"{'flow':<16} {'wall s':>9} {'trips':>7} {'KiB':>11} {'peak KiB':>11}  error"]
+    for result in results:
+        lines.append(
+            f"{result.name:<16} {result.wall_seconds:>9.3f} {result.round_trips:>7} "
+            f"{result.bytes_transferred / 1024:>11,.0f} {result.peak_memory_bytes / 1024:>11,.0f}  {result.error}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the production workflow against the Grist emulator.")
+    parser.add_argument("--small", action="store_true", help="Use a small data set (smoke run).")
+    parser.add_argument("--batches", type=int)
+    parser.add_argument("--ms-rows", type=int)
+    parser.add_argument("--history-rows", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every Grist call.")
+    parser.add_argument("--flow", action="append", help="Run only this flow (repeatable).")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc peak memory tracking.")
+    parser.add_argument("--output", type=Path, help="Write results JSON here.")
+    parser.add_argument("--save-baseline", type=Path, nargs="?", const=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--compare", type=Path, nargs="?", const=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative growth before flagging (default 0.2).")
+    args = parser.parse_args(argv)
+
+    scale = SMALL_SCALE if args.small else BenchScale()
+    overrides = {
+        "batches": args.batches,
+        "ms_rows": args.ms_rows,
+        "history_rows": args.history_rows,
+        "users": args.users,
+    }
+    scale = BenchScale(**{**asdict(scale), **{key: value for key, value in overrides.items() if value}})
+    track_memory = not args.no_memory
+
+    results = run_benchmarks(scale, latency=args.latency, flows=args.flow, track_memory=track_memory)
+    payload = results_payload(results, scale, args.latency, track_memory)
+    print(format_results(results))
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+            print(f"Wrote {path}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if baseline.get("scale") != payload["scale"] or baseline.get("track_memory") != track_memory:
+            print("Warning: baseline was recorded with different scale or memory settings.")
+        regressions = compare_results(payload, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions against baseline.")
+    return 1 if any(result.error for result in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,572 @@
+"""In-memory stand-in for the Grist REST API used by GristClient.
+
+Runs in-process (``activate()`` routes the shared requests session and the
+per-loop httpx client through it) or on localhost (``serve()`` / ``python -m
+pulse.testing.grist_emulator``). Documents are seeded from JSON fixtures shaped
+like the Costing and Pulse docs, every call is recorded so tests can assert on
+round trips, and latency or failures can be injected per call.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+_DOC_PATH = re.compile(r"^/+api/docs/(?P<doc>[^/]+)/(?P<rest>.*)$")
+_STATUS_TEXT = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class _GristError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class EmulatorCall:
+    method: str
+    doc_id: str
+    endpoint: str
+    table: str | None
+    status: int
+    params: dict = field(default_factory=dict)
+    request_bytes: int = 0
+    response_bytes: int = 0
+
+
+@dataclass
+class _Fault:
+    status: int
+    times: int
+    method: str | None = None
+    table: str | None = None
+    retry_after: float | None = None
+
+    def matches(self, method: str, table: str | None) -> bool:
+        if self.method and self.method.upper() != method:
+            return False
+        return not self.table or self.table == table
+
+
+class _Table:
+    def __init__(self, columns: dict[str, dict] | None = None):
+        self.columns: dict[str, dict] = dict(columns or {})
+        self.rows: dict[int, dict] = {}
+        self.next_id = 1
+
+    def add(self, fields: dict, record_id: int | None = None) -> int:
+        record_id = int(record_id) if record_id is not None else self.next_id
+        self.rows[record_id] = {column: fields.get(column) for column in self.columns}
+        self.next_id = max(self.next_id, record_id + 1)
+        return record_id
+
+    def check_columns(self, fields: dict) -> None:
+        unknown = [column for column in fields if column not in self.columns]
+        if unknown:
+            raise _GristError(400, f"Invalid column \"{unknown[0]}\"")
+
+    def records(self) -> list[dict]:
+        return [{"id": record_id, "fields": dict(fields)} for record_id, fields in sorted(self.rows.items())]
+
+
+def _column_fields(spec: Any) -> dict:
+    if isinstance(spec, dict):
+        return {"type": "Any", **spec}
+    return {"type": str(spec or "Any")}
+
+
+def _record_fields(record: dict) -> dict:
+    # Fixtures may list Grist-shaped ``{"id", "fields"}`` records or bare field dicts.
+    if "fields" in record:
+        return record["fields"] or {}
+    return {column: value for column, value in record.items() if column != "id"}
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sort_key(value):
+    if value is None:
+        return (0, 0, "")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value, "")
+    return (2, 0, str(value))
+
+
+def _sql_value(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+class GristEmulator:
+    """Holds Grist documents in memory and answers the REST calls GristClient makes."""
+
+    def __init__(self, latency: float | Any = 0.0, api_key: str | None = None):
+        # ``latency`` is seconds per call, or a callable ``(method, endpoint) -> seconds``.
+        self.latency = latency
+        self.api_key = api_key
+        self.calls: list[EmulatorCall] = []
+        self._docs: dict[str, dict[str, _Table]] = {}
+        self._attachments: dict[str, dict[int, tuple[str, bytes]]] = {}
+        self._faults: list[_Fault] = []
+        self._lock = threading.RLock()
+        self._async_client = None
+
+    # -- seeding and inspection -------------------------------------------
+
+    def add_table(self, doc_id: str, table: str, columns: dict | None = None, records: list[dict] | None = None) -> None:
+        records = list(records or [])
+        if columns is None:
+            names: dict[str, None] = {}
+            for record in records:
+                names.update(dict.fromkeys(_record_fields(record)))
+            columns = dict.fromkeys(names, "Any")
+        with self._lock:
+            target = _Table({name: _column_fields(spec) for name, spec in columns.items()})
+            for record in records:
+                target.add(_record_fields(record), record.get("id"))
+            self._docs.setdefault(str(doc_id), {})[table] = target
+
+    def load_fixture(self, fixture: str | Path | dict, doc_id: str | None = None) -> str:
+        """Seed a document from ``{"doc_id": ..., "tables": {name: {"columns": ..., "records": [...]}}}``."""
+        if not isinstance(fixture, dict):
+            fixture = json.loads(Path(fixture).read_text(encoding="utf-8"))
+        doc_id = str(doc_id or fixture.get("doc_id") or "doc")
+        for table, spec in (fixture.get("tables") or {}).items():
+            self.add_table(doc_id, table, spec.get("columns"), spec.get("records"))
+        return doc_id
+
+    def records(self, doc_id: str, table: str) -> list[dict]:
+        with self._lock:
+            return self._table(str(doc_id), table).records()
+
+    def call_count(self, method: str | None = None, table: str | None = None, endpoint: str | None = None, doc_id: str | None = None) -> int:
+        with self._lock:
+            return sum(
+                1
+                for call in self.calls
+                if (method is None or call.method == method.upper())
+                and (table is None or call.table == table)
+                and (endpoint is None or call.endpoint == endpoint)
+                and (doc_id is None or call.doc_id == str(doc_id))
+            )
+
+    def bytes_transferred(self) -> int:
+        """Request plus response bytes across every recorded call."""
+        with self._lock:
+            return sum(call.request_bytes + call.response_bytes for call in self.calls)
+
+    def reset_calls(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+    def fail_next(self, status: int, times: int = 1, method: str | None = None, table: str | None = None, retry_after: float | None = None) -> None:
+        """Answer the next ``times`` matching calls with ``status`` instead of serving them."""
+        with self._lock:
+            self._faults.append(_Fault(int(status), int(times), method, table, retry_after))
+
+    def delay_for(self, method: str, url: str) -> float:
+        if callable(self.latency):
+            return float(self.latency(method.upper(), self._route(urlsplit(url).path)[1]))
+        return float(self.latency or 0.0)
+
+    # -- request handling -------------------------------------------------
+
+    def handle(self, method: str, url: str, headers=None, body: bytes | None = None) -> tuple[int, dict, bytes]:
+        """Serve one HTTP request; returns ``(status, headers, body)``."""
+        method = method.upper()
+        parts = urlsplit(url)
+        params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        headers = {str(key).lower(): str(value) for key, value in dict(headers or {}).items()}
+        doc_id, endpoint, table, tail = self._route(parts.path)
+        body = body or b""
+        with self._lock:
+            status, extra, payload = self._dispatch(method, doc_id, endpoint, table, tail, params, headers, body)
+            if isinstance(payload, bytes):
+                extra = {"Content-Type": "application/octet-stream", **extra}
+            else:
+                extra = {"Content-Type": "application/json", **extra}
+                payload = json.dumps(payload).encode("utf-8")
+            self.calls.append(EmulatorCall(method, doc_id, endpoint, table, status, params, len(url) + len(body), len(payload)))
+        return status, extra, payload
+
+    @staticmethod
+    def _route(path: str) -> tuple[str, str, str | None, list[str]]:
+        match = _DOC_PATH.match(path)
+        if not match:
+            return "", "unknown", None, []
+        rest = [part for part in match.group("rest").split("/") if part]
+        if rest[:1] == ["tables"] and len(rest) >= 3:
+            return match.group("doc"), rest[2], rest[1], rest[3:]
+        if rest[:1] == ["attachments"] and len(rest) >= 3:
+            return match.group("doc"), rest[2], None, rest[1:2]
+        return match.group("doc"), rest[0] if rest else "", None, rest[1:]
+
+    def _dispatch(self, method, doc_id, endpoint, table, tail, params, headers, body):
+        if self.api_key is not None and headers.get("authorization") != f"Bearer {self.api_key}":
+            return 401, {}, {"error": "Unauthorized"}
+        for fault in self._faults:
+            if fault.times > 0 and fault.matches(method, table):
+                fault.times -= 1
+                self._faults = [item for item in self._faults if item.times > 0]
+                extra = {"Retry-After": str(fault.retry_after)} if fault.retry_after is not None else {}
+                return fault.status, extra, {"error": f"Injected failure ({fault.status})"}
+        handler = getattr(self, f"_{method.lower()}_{endpoint}", None)
+        if handler is None:
+            return 404 if endpoint == "unknown" else 405, {}, {"error": f"{method} {endpoint} is not supported"}
+        try:
+            if method in ("GET", "DELETE"):
+                payload = handler(doc_id, table, tail, params)
+            elif endpoint == "attachments":
+                payload = handler(doc_id, headers.get("content-type", ""), body)
+            else:
+                payload = handler(doc_id, table, json.loads(body.decode("utf-8") or "{}"), params)
+        except _GristError as exc:
+            return exc.status, {}, {"error": str(exc)}
+        except (ValueError, KeyError, TypeError) as exc:
+            return 400, {}, {"error": str(exc)}
+        return 200, {}, payload
+
+    def _table(self, doc_id: str, table: str | None) -> _Table:
+        target = self._docs.get(doc_id, {}).get(table)
+        if target is None:
+            raise _GristError(404, f"Table not found \"{table}\"")
+        return target
+
+    # -- endpoints --------------------------------------------------------
+
+    def _get_tables(self, doc_id, table, tail, params):
+        return {"tables": [{"id": name, "fields": {}} for name in self._docs.get(doc_id, {})]}
+
+    def _post_tables(self, doc_id, table, body, params):
+        created = []
+        for spec in body.get("tables") or []:
+            columns = {column["id"]: column.get("fields") or {} for column in spec.get("columns") or []}
+            self._docs.setdefault(doc_id, {})[spec["id"]] = _Table({name: _column_fields(fields) for name, fields in columns.items()})
+            created.append({"id": spec["id"]})
+        return {"tables": created}
+
+    def _get_records(self, doc_id, table, tail, params):
+        records = self._table(doc_id, table).records()
+        if params.get("filter"):
+            wanted = json.loads(params["filter"])
+            records = [
+                record
+                for record in records
+                if all((record["id"] if column == "id" else record["fields"].get(column)) in values for column, values in wanted.items())
+            ]
+        if params.get("sort"):
+            for key in reversed([item.strip() for item in params["sort"].split(",") if item.strip()]):
+                column = key.lstrip("-")
+                records.sort(
+                    key=lambda record: _sort_key(record["id"] if column == "id" else record["fields"].get(column)),
+                    reverse=key.startswith("-"),
+                )
+        if params.get("limit"):
+            records = records[: int(params["limit"])]
+        return {"records": records}
+
+    def _post_records(self, doc_id, table, body, params):
+        target = self._table(doc_id, table)
+        rows = [record.get("fields") or {} for record in body.get("records") or []]
+        for fields in rows:
+            target.check_columns(fields)
+        return {"records": [{"id": target.add(fields)} for fields in rows]}
+
+    def _patch_records(self, doc_id, table, body, params):
+        target = self._table(doc_id, table)
+        records = body.get("records") or []
+        for record in records:
+            target.check_columns(record.get("fields") or {})
+            if record.get("id") not in target.rows:
+                raise _GristError(404, f"Record not found {record.get('id')}")
+        for record in records:
+            target.rows[record["id"]].update(record.get("fields") or {})
+        return None
+
+    def _put_records(self, doc_id, table, body, params):
+        target = self._table(doc_id, table)
+        for record in body.get("records") or []:
+            require = record.get("require") or {}
+            fields = record.get("fields") or {}
+            target.check_columns({**require, **fields})
+            match = next(
+                (row for row in target.rows.values() if all(row.get(column) == value for column, value in require.items())),
+                None,
+            )
+            if match is None:
+                target.add({**require, **fields})
+            else:
+                match.update(fields)
+        return None
+
+    def _get_data(self, doc_id, table, tail, params):
+        target = self._table(doc_id, table)
+        if any(params.get(key) for key in ("filter", "sort", "limit")):
+            rows = [(record["id"], record["fields"]) for record in self._get_records(doc_id, table, tail, params)["records"]]
+        else:
+            rows = sorted(target.rows.items())
+        payload = {"id": [record_id for record_id, _ in rows]}
+        for column in target.columns:
+            payload[column] = [fields.get(column) for _, fields in rows]
+        return payload
+
+    def _get_columns(self, doc_id, table, tail, params):
+        return {"columns": [{"id": name, "fields": dict(fields)} for name, fields in self._table(doc_id, table).columns.items()]}
+
+    def _post_columns(self, doc_id, table, body, params):
+        target = self._table(doc_id, table)
+        added = []
+        for column in body.get("columns") or []:
+            target.columns[column["id"]] = _column_fields(column.get("fields") or {})
+            for row in target.rows.values():
+                row.setdefault(column["id"], None)
+            added.append({"id": column["id"]})
+        return {"columns": added}
+
+    def _get_sql(self, doc_id, table, tail, params):
+        return self._run_sql(doc_id, params.get("q", ""), [])
+
+    def _post_sql(self, doc_id, table, body, params):
+        return self._run_sql(doc_id, body.get("sql", ""), body.get("args") or [])
+
+    def _run_sql(self, doc_id, query, args):
+        if not re.match(r"^\s*(select|with)\b", query, re.IGNORECASE):
+            raise _GristError(400, "Only select statements are supported")
+        # A throwaway SQLite copy keeps the emulator's own storage simple.
+        db = sqlite3.connect(":memory:")
+        try:
+            for name, target in self._docs.get(doc_id, {}).items():
+                if not re.search(rf"\b{re.escape(name)}\b", query):
+                    continue
+                columns = ["id", *target.columns]
+                db.execute(f"CREATE TABLE {_quote(name)} ({', '.join(_quote(column) for column in columns)})")
+                db.executemany(
+                    f"INSERT INTO {_quote(name)} VALUES ({', '.join('?' for _ in columns)})",
+                    [[record_id, *(_sql_value(row.get(c)) for c in target.columns)] for record_id, row in target.rows.items()],
+                )
+            try:
+                cursor = db.execute(query, [_sql_value(arg) for arg in args])
+            except sqlite3.Error as exc:
+                raise _GristError(400, str(exc)) from exc
+            names = [item[0] for item in cursor.description or []]
+            return {"statement": query, "records": [{"fields": dict(zip(names, row))} for row in cursor.fetchall()]}
+        finally:
+            db.close()
+
+    def _post_attachments(self, doc_id, content_type, body):
+        message = BytesParser().parsebytes(b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body)
+        store = self._attachments.setdefault(doc_id, {})
+        metadata = self._docs.setdefault(doc_id, {}).get("_grist_Attachments")
+        if metadata is None:
+            metadata = _Table({name: _column_fields("Any") for name in ("fileName", "fileSize", "fileIdent")})
+            self._docs[doc_id]["_grist_Attachments"] = metadata
+        ids = []
+        for part in message.get_payload() if message.is_multipart() else []:
+            name = part.get_filename() or "upload"
+            content = part.get_payload(decode=True) or b""
+            # Grist identifies stored files by SHA1 of the content plus the original extension.
+            ident = hashlib.sha1(content).hexdigest() + os.path.splitext(name)[1]
+            attachment_id = metadata.add({"fileName": name, "fileSize": len(content), "fileIdent": ident})
+            store[attachment_id] = (name, content)
+            ids.append(attachment_id)
+        if not ids:
+            raise _GristError(400, "No attachments in request")
+        return ids
+
+    def _get_download(self, doc_id, table, tail, params):
+        try:
+            return self._attachments.get(doc_id, {})[int(tail[0])][1]
+        except (IndexError, KeyError, ValueError):
+            raise _GristError(404, "Attachment not found") from None
+
+    # -- transports -------------------------------------------------------
+
+    def requests_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = _EmulatorAdapter(self)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None or self._async_client.is_closed:
+            self._async_client = httpx.AsyncClient(transport=httpx.MockTransport(self._handle_httpx))
+        return self._async_client
+
+    async def _handle_httpx(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        delay = self.delay_for(request.method, str(request.url))
+        if delay:
+            await asyncio.sleep(delay)
+        status, headers, content = self.handle(request.method, str(request.url), request.headers, body)
+        return httpx.Response(status, headers=headers, content=content, request=request)
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Route every GristClient/AsyncGristClient in this process to the emulator."""
+        from pulse.core import grist_client
+        from pulse.core.resilience import reset_guards
+        from pulse.core.table_cache import snapshot_cache
+        from pulse.core.write_behind import flush_all
+        from pulse.data.batch_snapshot import batch_snapshots
+        from pulse.data.ms_visibility import clear_ms_visibility
+        from pulse.data.process_routing import clear_process_routings
+        from pulse.data.schema_registry import clear_schema_registries
+        from pulse.data.stage_timeline import clear_stage_timelines
+        from pulse.data.user_directory import clear_user_directories
+
+        session = self.requests_session()
+        saved = (grist_client.get_http_session, grist_client.get_async_http_client)
+        grist_client.get_http_session = lambda: session
+        grist_client.get_async_http_client = self.async_client
+
+        def _reset():
+            snapshot_cache.clear()
+            reset_guards()
+            clear_schema_registries()
+            clear_process_routings()
+            clear_user_directories()
+            clear_ms_visibility()
+            clear_stage_timelines()
+            batch_snapshots.clear()
+
+        _reset()
+        try:
+            yield self
+        finally:
+            # Buffered history/activity rows belong to the emulated docs, never the real server.
+            try:
+                flush_all()
+            except Exception:
+                pass
+            grist_client.get_http_session, grist_client.get_async_http_client = saved
+            session.close()
+            _reset()
+
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> "_EmulatorHTTPServer":
+        """Serve the emulator over HTTP from a daemon thread; call ``shutdown()`` to stop."""
+        server = _EmulatorHTTPServer((host, port), _EmulatorRequestHandler, self)
+        threading.Thread(target=server.serve_forever, name="grist-emulator", daemon=True).start()
+        return server
+
+
+def seed_default_docs(emulator: GristEmulator, costing_doc_id: str | None = None, pulse_doc_id: str | None = None) -> tuple[str, str]:
+    """Load the bundled Costing and Pulse fixtures; returns the two doc ids used."""
+    from pulse.config import COSTING_DOC_ID, PULSE_DOC_ID
+
+    costing = emulator.load_fixture(FIXTURES_DIR / "costing_doc.json", costing_doc_id or COSTING_DOC_ID)
+    pulse = emulator.load_fixture(FIXTURES_DIR / "pulse_doc.json", pulse_doc_id or PULSE_DOC_ID)
+    return costing, pulse
+
+
+class _EmulatorAdapter(BaseAdapter):
+    def __init__(self, emulator: GristEmulator):
+        super().__init__()
+        self.emulator = emulator
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        body = request.body
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        delay = self.emulator.delay_for(request.method, request.url)
+        if delay:
+            time.sleep(delay)
+        status, headers, content = self.emulator.handle(request.method, request.url, request.headers, body)
+        response = requests.Response()
+        response.status_code = status
+        response.reason = _STATUS_TEXT.get(status, "")
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = content
+        response._content_consumed = True
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class _EmulatorHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, emulator: GristEmulator):
+        super().__init__(address, handler)
+        self.emulator = emulator
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _EmulatorRequestHandler(BaseHTTPRequestHandler):
+    def _serve(self):
+        emulator = self.server.emulator
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        delay = emulator.delay_for(self.command, self.path)
+        if delay:
+            time.sleep(delay)
+        status, headers, content = emulator.handle(self.command, self.path, dict(self.headers), body)
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _serve
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve an in-memory Grist API on localhost.")
+    parser.add_argument("--fixture", action="append", default=[], help="Fixture JSON to load (repeatable); defaults to the bundled docs.")
+    parser.add_argument("--port", type=int, default=8484)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every call.")
+    args = parser.parse_args(argv)
+
+    emulator = GristEmulator(latency=args.latency)
+    if args.fixture:
+        doc_ids = [emulator.load_fixture(path) for path in args.fixture]
+    else:
+        doc_ids = list(seed_default_docs(emulator, "costing", "pulse"))
+    server = emulator.serve(port=args.port)
+    print(f"Grist emulator on {server.url} serving docs: {', '.join(doc_ids)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ from typing import Any
 
 from pulse.core.grist_client import GristClient
 from pulse.runtime import is_test_mode, test_api_key, test_doc_id, test_poll_interval_seconds
+from pulse.tasks.job_pipeline import job_pipeline
 
 
 TEST_INBOX_TABLE = "Test_Inbox"
@@ -90,12 +91,10 @@ class TestRuntimeClient:
         if inbox_id <= 0:
             return True
         try:
-            rows = self.client.get_records(TEST_INBOX_TABLE)
+            rows = self.client.get_records(TEST_INBOX_TABLE, filter={"id": [inbox_id]}, limit=1)
         except Exception:
             return False
         for row in rows:
-            if int(row.get("id") or 0) != inbox_id:
-                continue
             fields = row.get("fields", {})
             return bool(fields.get("processed", False))
         return True
@@ -195,23 +194,26 @@ class TestRuntimeClient:
             ],
         )
 
+    def _find_user_context_row(self, session_id: str, actor_user_id: str) -> dict | None:
+        rows = self.client.get_records(
+            TEST_CONTEXT_TABLE,
+            filter={"session_id": [session_id], "actor_user_id": [actor_user_id]},
+            limit=1,
+        )
+        return rows[0] if rows else None
+
     def load_user_context(self, session_id: str, actor_user_id: str) -> dict[str, Any]:
-        rows = self.client.get_records(TEST_CONTEXT_TABLE)
-        for row in rows:
-            fields = row.get("fields", {})
-            if str(fields.get("session_id", "")) != session_id:
-                continue
-            if str(fields.get("actor_user_id", "")) != actor_user_id:
-                continue
-            raw = fields.get("context_json", "{}")
-            if isinstance(raw, str):
-                try:
-                    return json.loads(raw)
-                except json.JSONDecodeError:
-                    return {}
-            if isinstance(raw, dict):
-                return raw
+        row = self._find_user_context_row(session_id, actor_user_id)
+        if not row:
             return {}
+        raw = row.get("fields", {}).get("context_json", "{}")
+        if isinstance(raw, str):
+            try:
+                return json.loads(raw)
+            except json.JSONDecodeError:
+                return {}
+        if isinstance(raw, dict):
+            return raw
         return {}
 
     def save_user_context(
@@ -221,13 +223,6 @@ class TestRuntimeClient:
         role_name: str,
         user_data: dict[str, Any],
     ) -> None:
-        rows = self.client.get_records(TEST_CONTEXT_TABLE)
-        existing_id: int | None = None
-        for row in rows:
-            fields = row.get("fields", {})
-            if str(fields.get("session_id", "")) == session_id and str(fields.get("actor_user_id", "")) == actor_user_id:
-                existing_id = int(row.get("id"))
-                break
         payload = {
             "session_id": session_id,
             "actor_user_id": actor_user_id,
@@ -236,10 +231,7 @@ class TestRuntimeClient:
             "context_json": _to_json(user_data),
             "updated_at": _utc_now_iso(),
         }
-        if existing_id is None:
-            self.client.add_records(TEST_CONTEXT_TABLE, [payload])
-            return
-        self.client.patch_record(TEST_CONTEXT_TABLE, existing_id, payload)
+        self.client.upsert_records(TEST_CONTEXT_TABLE, [payload], ["session_id", "actor_user_id"])
 
 
 class _FakeMessage:
@@ -436,6 +428,8 @@ async def _dispatch_inbox_row(runtime: TestRuntimeClient, row: dict) -> None:
             await main_module.fallback_command(update, context)
     else:
         await main_module.fallback_text(update, context)
+    # Background jobs would be cancelled when this row's event loop closes.
+    await job_pipeline.drain()
 
     role_name = ""
     user_obj = context.user_data.get("user")
@@ -48,7 +48,9 @@ def write_text_pdf(lines: list[str], output_path: str, title: str = "Document")
             value = value[max_chars_per_line:]
         wrapped_lines.append(value)
 
-    c = canvas.Canvas(output_path, pagesize=letter, pageCompression=0)
+    # invariant=1 fixes the timestamp and document id, so identical input gives identical
+    # bytes and uploads can be deduplicated by content; the other writers do the same.
+    c = canvas.Canvas(output_path, pagesize=letter, pageCompression=0, invariant=1)
     c.setTitle(title)
     c.setAuthor("Pulse")
     c.setSubject("MS Cut List")
@@ -86,6 +88,7 @@ def write_table_pdf(
         title=title,
         author="Pulse",
         subject="MS Cut List",
+        invariant=1,
     )
 
     styles = getSampleStyleSheet()
@@ -180,6 +183,7 @@ def write_grouped_ms_cutlist_pdf(
         title=title,
         author="Pulse",
         subject="MS Cut List",
+        invariant=1,
     )
     styles = getSampleStyleSheet()
     title_style = styles["Heading4"]
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+
+from pulse.core.attachment_cache import AttachmentCache
+from pulse.data import production_repo
+from pulse.data.production_repo import ProductionRepo
+from pulse.integrations.production import _send_ms_row_pdf_for_chat
+from pulse.testing.grist_emulator import GristEmulator, seed_default_docs
+
+
+def _writer(payload, calls):
+    def _download(handle):
+        calls.append(payload)
+        handle.write(payload)
+
+    return _download
+
+
+def test_fetch_downloads_once_and_evicts_least_recently_used(tmp_path):
+    cache = AttachmentCache(tmp_path, max_bytes=10)
+    calls = []
+
+    first = cache.fetch("doc", 1, _writer(b"aaaa", calls))
+    assert cache.fetch("doc", 1, _writer(b"xxxx", calls)) == first
+    cache.fetch("doc", 2, _writer(b"bbbb", calls))
+    cache.get("doc", 1)
+    cache.fetch("doc", 3, _writer(b"cccc", calls))
+
+    assert calls == [b"aaaa", b"bbbb", b"cccc"]
+    assert first.read_bytes() == b"aaaa"
+    assert cache.get("doc", 2) is None
+    assert cache.total_bytes() == 8
+    # A fresh instance picks up what an earlier process left on disk.
+    assert AttachmentCache(tmp_path, max_bytes=10).get("doc", 3).read_bytes() == b"cccc"
+
+
+def test_failed_download_leaves_nothing_cached(tmp_path):
+    cache = AttachmentCache(tmp_path, max_bytes=100)
+
+    def _broken(handle):
+        handle.write(b"partial")
+        raise RuntimeError("connection reset")
+
+    try:
+        cache.fetch("doc", 7, _broken)
+    except RuntimeError:
+        pass
+    assert cache.get("doc", 7) is None
+    assert list(tmp_path.rglob("*")) == [tmp_path / "doc"]
+
+
+class _Bot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_document(self, chat_id, document, filename=None):
+        self.sent.append((chat_id, filename, document.read()))
+
+
+def test_repeat_ms_list_views_stream_the_pdf_from_grist_once(tmp_path, monkeypatch):
+    cache = AttachmentCache(tmp_path, max_bytes=1024 * 1024)
+    monkeypatch.setattr(production_repo, "attachment_cache", lambda: cache)
+    emulator = GristEmulator()
+    with emulator.activate():
+        repo = ProductionRepo()
+        seed_default_docs(emulator, repo.costing_client.doc_id, repo.pulse_client.doc_id)
+        pdf = tmp_path / "row.pdf"
+        pdf.write_bytes(b"%PDF-1.4 " + b"x" * 200_000)
+        repo.attach_pdf_to_ms_row(1, str(pdf))
+        emulator.reset_calls()
+        bot = _Bot()
+
+        for _ in range(3):
+            assert asyncio.run(_send_ms_row_pdf_for_chat(repo, bot, 42, 1))
+
+    assert emulator.call_count("GET", endpoint="download") == 1
+    assert [chat for chat, _, _ in bot.sent] == [42, 42, 42]
+    assert all(body == pdf.read_bytes() for _, _, body in bot.sent)
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from pulse.data.production_repo import ProductionRepo
+from pulse.integrations.production import _attach_ms_row_cutlist_pdfs
+from pulse.testing.grist_emulator import GristEmulator, seed_default_docs
+
+
+def _cutlist(label: str) -> dict:
+    return {"process_seq": label, "rows": [{"product_part": "Side Panel", "material_to_cut": "MS 2mm", "length_mm": "800", "total_qty": "4"}]}
+
+
+def test_identical_cutlists_are_rendered_and_uploaded_once():
+    emulator = GristEmulator()
+    with emulator.activate():
+        repo = ProductionRepo()
+        costing, _ = seed_default_docs(emulator, repo.costing_client.doc_id, repo.pulse_client.doc_id)
+        emulator.add_table(costing, "ProductBatchMS", {"row_cutlist_pdf": "Attachments"}, [{"id": row_id} for row_id in (1, 2, 3, 4)])
+        rows = [
+            {"id": 1, "process_seq": 1},
+            {"id": 2, "process_seq": 2},
+            {"id": 3, "process_seq": 1},
+        ]
+        cutlists = {"Cut > Bend": _cutlist("Cut > Bend"), "Cut": _cutlist("Cut")}
+
+        _attach_ms_row_cutlist_pdfs(repo, rows, cutlists)
+        first = {record["id"]: record["fields"]["row_cutlist_pdf"] for record in emulator.records(costing, "ProductBatchMS")}
+        # Regenerating the same cut lists (e.g. a re-approval) reuses the stored attachments.
+        _attach_ms_row_cutlist_pdfs(repo, rows, cutlists)
+        second = {record["id"]: record["fields"]["row_cutlist_pdf"] for record in emulator.records(costing, "ProductBatchMS")}
+        # So does an identical row in another batch.
+        _attach_ms_row_cutlist_pdfs(repo, [{"id": 4, "process_seq": 2}], cutlists)
+        other_batch = {record["id"]: record["fields"]["row_cutlist_pdf"] for record in emulator.records(costing, "ProductBatchMS")}[4]
+
+    assert emulator.call_count("POST", endpoint="attachments") == 2
+    assert emulator.call_count("PATCH", table="ProductBatchMS") == 5
+    assert first[1] == first[3] != first[2]
+    assert second == first
+    assert other_batch == first[2]
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from pulse.data.batch_snapshot import IndexedBatchTable
+from pulse.data.production_repo import ProductionRepo
+from pulse.testing.grist_emulator import GristEmulator, seed_default_docs
+
+
+@pytest.fixture
+def emulated_repo():
+    emulator = GristEmulator()
+    with emulator.activate():
+        repo = ProductionRepo()
+        seed_default_docs(emulator, repo.costing_client.doc_id, repo.pulse_client.doc_id)
+        emulator.reset_calls()
+        yield emulator, repo
+
+
+def test_indexes_follow_patches_without_aliasing_old_records():
+    table = IndexedBatchTable(
+        "ProductBatchMS",
+        [
+            {"id": 1, "fields": {"batch_id": 7, "status": "Cutting Pending"}},
+            {"id": 2, "fields": {"batch_id": ["R", 8], "current_status": "Done"}},
+        ],
+    )
+    before = table.get(1)
+
+    table.apply_patch([(1, {"status": "Done", "batch_id": 8})])
+    table.apply_add([3], [{"batch_id": 7, "status": "Cutting Pending"}])
+
+    assert before["fields"]["status"] == "Cutting Pending"
+    assert [row["id"] for row in table.rows_with_status("Done")] == [2, 1]
+    assert [row["id"] for row in table.rows_for_batch(7)] == [3]
+    assert table.get(1)["fields"]["batch_id"] == 8
+
+
+def test_repo_reads_share_one_snapshot_per_table(emulated_repo):
+    emulator, repo = emulated_repo
+
+    master = repo.get_master_by_batch_no(repo.get_existing_batch_numbers()[0])
+    assert repo.get_master_by_id(master["id"]) is master
+    assert [row["id"] for row in repo.list_ms_rows_for_batch(master["id"])] == [1, 2]
+    assert repo.get_ms_row_by_id(2)["fields"]["status"] == "In Cutting"
+    assert asyncio.run(repo.get_ms_row_by_id_async(2))["id"] == 2
+
+    assert emulator.call_count("GET", table="ProductBatchMaster") == 1
+    assert emulator.call_count("GET", table="ProductBatchMS") == 1
+
+
+def test_own_writes_are_applied_in_place(emulated_repo):
+    emulator, repo = emulated_repo
+    repo.list_ms_rows_for_batch(1)
+
+    repo.update_ms(1, {"status": "Done"})
+    new_ids = repo.create_ms_rows([{"batch_id": 1, "status": "Cutting Pending"}])
+
+    assert repo.get_ms_row_by_id(1)["fields"]["status"] == "Done"
+    assert [row["id"] for row in repo.list_ms_rows_for_batch(1)] == [1, 2, *new_ids]
+    assert emulator.call_count("GET", table="ProductBatchMS") == 1
+
+
+def test_writes_from_elsewhere_force_a_reload(emulated_repo):
+    emulator, repo = emulated_repo
+    repo.get_ms_row_by_id(1)
+
+    repo.costing_client.patch_record("ProductBatchMS", 1, {"status": "On Hold"})
+
+    assert ProductionRepo().get_ms_row_by_id(1)["fields"]["status"] == "On Hold"
+    assert emulator.call_count("GET", table="ProductBatchMS") == 2
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from pulse.core import grist_client
+from pulse.core.resilience import DocGuard
+from pulse.testing import benchmark
+from pulse.testing.benchmark import SMALL_SCALE, compare_results, results_payload, run_benchmarks
+
+
+def test_small_benchmark_runs_every_flow_without_errors(monkeypatch):
+    # The client-side rate limit would dominate wall time on this tiny data set.
+    guard = DocGuard(rate=1_000_000, burst=1_000_000)
+    monkeypatch.setattr(grist_client, "guard_for", lambda server, doc_id: guard)
+    results = run_benchmarks(SMALL_SCALE, track_memory=False)
+
+    assert [result.name for result in results] == [
+        "batch_creation",
+        "approve_batch",
+        "my_ms_jobs",
+        "bulk_done",
+        "handoff_accept",
+        "handoff_reject",
+        "batch_summary",
+        "reminder_sweep",
+    ]
+    assert [result.error for result in results] == [""] * len(results)
+    assert all(result.round_trips > 0 and result.bytes_transferred > 0 for result in results)
+
+
+def test_compare_flags_extra_round_trips_and_slowdowns_only():
+    baseline = {"flows": {"my_ms_jobs": {"round_trips": 10, "bytes_transferred": 1000, "wall_seconds": 1.0, "peak_memory_bytes": 500, "error": ""}}}
+    same = {"flows": {"my_ms_jobs": {"round_trips": 10, "bytes_transferred": 1100, "wall_seconds": 1.1, "peak_memory_bytes": 500, "error": ""}}}
+    worse = {"flows": {"my_ms_jobs": {"round_trips": 11, "bytes_transferred": 1000, "wall_seconds": 1.5, "peak_memory_bytes": 500, "error": ""}}}
+
+    assert compare_results(same, baseline) == []
+    regressions = compare_results(worse, baseline)
+    assert len(regressions) == 2
+    assert regressions[0] == "my_ms_jobs: round trips 10 -> 11"
+    assert regressions[1].startswith("my_ms_jobs: wall time")
+
+
+def test_results_payload_round_trips_through_json():
+    payload = results_payload([benchmark.FlowResult("bulk_done", 0.5, 4, 2048, 0)], SMALL_SCALE, 0.0, False)
+
+    assert payload["flows"]["bulk_done"]["round_trips"] == 4
+    assert payload["scale"]["batches"] == SMALL_SCALE.batches
@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+import tracemalloc
+
+import httpx
+import pytest
+
+from pulse.core import grist_client
+from pulse.core.columnar import ColumnarTable
+from pulse.core.grist_client import AsyncGristClient, GristClient
+from pulse.core.table_cache import TableSnapshotCache
+
+
+class _Resp:
+    def __init__(self, payload=None, status_code=200, headers=None):
+        self._payload = payload if payload is not None else {}
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    @property
+    def content(self):
+        return json.dumps(self._payload).encode("utf-8")
+
+    def raise_for_status(self):
+        return None
+
+    def json(self):
+        return self._payload
+
+
+class _RecordingSession:
+    def __init__(self, payload=None):
+        self.calls = []
+        self.payload = payload
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return _Resp(self.payload)
+
+
+def test_clients_share_one_pooled_session():
+    grist_client.close_http_session()
+    first = grist_client.get_http_session()
+    assert grist_client.get_http_session() is first
+    adapter = first.get_adapter("https://example.test")
+    assert adapter._pool_maxsize == grist_client.GRIST_HTTP_POOL_MAXSIZE
+    grist_client.close_http_session()
+
+
+def test_requests_carry_default_timeout(monkeypatch):
+    session = _RecordingSession({"records": []})
+    monkeypatch.setattr(grist_client, "get_http_session", lambda: session)
+    client = GristClient("https://example.test", "doc", "token")
+    assert client.get_records("Users") == []
+    method, url, kwargs = session.calls[0]
+    assert method == "GET"
+    assert url == "https://example.test/api/docs/doc/tables/Users/records"
+    assert kwargs["timeout"] == (grist_client.GRIST_HTTP_CONNECT_TIMEOUT, grist_client.GRIST_HTTP_READ_TIMEOUT)
+    assert kwargs["headers"] == {"Authorization": "Bearer token"}
+
+
+def test_retry_policy_only_retries_writes_on_rate_limit():
+    retry = grist_client._GristRetry(total=3, status_forcelist=(429, 500, 502, 503, 504))
+    assert retry.is_retry("GET", 503)
+    assert retry.is_retry("POST", 429)
+    assert retry.is_retry("PATCH", 429)
+    assert not retry.is_retry("POST", 503)
+    assert not retry.is_retry("PATCH", 500)
+
+
+def test_cached_reads_skip_http_until_own_write(monkeypatch):
+    session = _RecordingSession({"records": [{"id": 1, "fields": {"a": 1}}]})
+    monkeypatch.setattr(grist_client, "get_http_session", lambda: session)
+    client = GristClient("https://example.test", "doc_cache", "token", use_cache=True)
+    client.invalidate_cache()
+
+    assert client.get_records("ProductBatchMS") == [{"id": 1, "fields": {"a": 1}}]
+    assert client.get_records("ProductBatchMS") == [{"id": 1, "fields": {"a": 1}}]
+    assert len(session.calls) == 1
+
+    other = GristClient("https://example.test", "doc_cache", "token", use_cache=True)
+    other.patch_record("ProductBatchMS", 1, {"a": 2})
+    client.get_records("ProductBatchMS")
+    assert [call[0] for call in session.calls] == ["GET", "PATCH", "GET"]
+
+
+def test_snapshot_cache_expires_and_evicts():
+    now = {"t": 0.0}
+    cache = TableSnapshotCache(5, {"Roles": 60}, max_entries=2, clock=lambda: now["t"])
+    cache.put(("s", "d", "ProductBatchMS"), [1])
+    cache.put(("s", "d", "Roles"), [2])
+    now["t"] = 6.0
+    assert cache.get(("s", "d", "ProductBatchMS")) is None
+    assert cache.get(("s", "d", "Roles")) == [2]
+
+    cache.put(("s", "d", "Users"), [3])
+    cache.put(("s", "d", "ProcessStage"), [4])
+    assert cache.get(("s", "d", "Roles")) is None
+
+
+def test_snapshot_cache_drops_fetch_that_raced_a_write():
+    cache = TableSnapshotCache(5)
+    key = ("s", "d", "ProductBatchMaster")
+    generation = cache.generation(key)
+    cache.invalidate("s", "d", "ProductBatchMaster")
+    cache.put(key, [1], generation=generation)
+    assert cache.get(key) is None
+
+
+def test_filtered_reads_are_sent_as_grist_query_params(monkeypatch):
+    session = _RecordingSession({"records": [{"id": 7, "fields": {"batch_id": 3}}]})
+    monkeypatch.setattr(grist_client, "get_http_session", lambda: session)
+    client = GristClient("https://example.test", "doc_query", "token", use_cache=True)
+    client.invalidate_cache()
+
+    rows = client.get_records("ProductBatchMS", filter={"batch_id": [3]}, sort=["-id"], limit=5)
+    assert rows == [{"id": 7, "fields": {"batch_id": 3}}]
+    _, _, kwargs = session.calls[0]
+    assert kwargs["params"] == {"filter": '{"batch_id": [3]}', "sort": "-id", "limit": 5}
+
+
+def test_filtered_reads_use_fresh_snapshot_without_http(monkeypatch):
+    records = [
+        {"id": 1, "fields": {"batch_id": 3, "current_stage_name": "B"}},
+        {"id": 2, "fields": {"batch_id": 4, "current_stage_name": "A"}},
+        {"id": 3, "fields": {"batch_id": 3, "current_stage_name": "A"}},
+    ]
+    session = _RecordingSession({"records": records})
+    monkeypatch.setattr(grist_client, "get_http_session", lambda: session)
+    client = GristClient("https://example.test", "doc_query_cached", "token", use_cache=True)
+    client.invalidate_cache()
+    client.get_records("ProductBatchMS")
+
+    rows = client.get_records("ProductBatchMS", filter={"batch_id": [3]}, sort="current_stage_name,-id")
+    assert [row["id"] for row in rows] == [3, 1]
+    assert client.get_records("ProductBatchMS", filter={"id": [2]}, limit=1) == [records[1]]
+    assert len(session.calls) == 1
+
+
+def test_patch_records_chunks_and_groups_by_column_set(monkeypatch):
+    session = _RecordingSession({})
+    monkeypatch.setattr(grist_client, "get_http_session", lambda: session)
+    client = GristClient("https://example.test", "doc_bulk", "token")
+
+    updates = [(row_id, {"status": "Done"}) for row_id in range(1, 6)]
+    updates.append((9, {"status": "Done", "remarks": "x"}))
+    client.patch_records("ProductBatchMS", updates, chunk_size=2)
+
+    payloads = [kwargs["json"]["records"] for method, _, kwargs in session.calls]
+    assert [call[0] for call in session.calls] == ["PATCH"] * 4
+    assert [[record["id"] for record in records] for records in payloads] == [[1, 2], [3, 4], [5], [9]]
+
+
+def test_upsert_records_sends_require_and_fields(monkeypatch):
+    session = _RecordingSession({})
+    monkeypatch.setattr(grist_client, "get_http_session", lambda: session)
+    client = GristClient("https://example.test", "doc_bulk", "token")
+
+    client.upsert_records("Test_UserContext", [{"session_id": "s1", "actor_user_id": "U1", "menu_state": "main"}], ["session_id", "actor_user_id"])
+
+    method, url, kwargs = session.calls[0]
+    assert method == "PUT"
+    assert url.endswith("/tables/Test_UserContext/records")
+    assert kwargs["json"] == {
+        "records": [{"require": {"session_id": "s1", "actor_user_id": "U1"}, "fields": {"menu_state": "main"}}]
+    }
+
+
+def test_async_client_retries_idempotent_reads_and_caches(monkeypatch):
+    calls = []
+
+    def _handler(request):
+        calls.append(request.method)
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"records": [{"id": 1, "fields": {}}]})
+
+    monkeypatch.setattr(grist_client, "GRIST_HTTP_BACKOFF_FACTOR", 0)
+    monkeypatch.setattr(
+        grist_client,
+        "get_async_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+    )
+    client = AsyncGristClient("https://example.test", "doc_async", "token", use_cache=True)
+    client.invalidate_cache()
+
+    async def _run():
+        first = await client.get_records("Users")
+        second = await client.get_records("Users", filter={"id": [1]})
+        return first, second
+
+    first, second = asyncio.run(_run())
+    assert first == second == [{"id": 1, "fields": {}}]
+    assert calls == ["GET", "GET"]
+
+
+def test_async_client_does_not_retry_failed_writes(monkeypatch):
+    calls = []
+
+    def _handler(request):
+        calls.append(request.method)
+        return httpx.Response(503)
+
+    monkeypatch.setattr(grist_client, "GRIST_HTTP_BACKOFF_FACTOR", 0)
+    monkeypatch.setattr(
+        grist_client,
+        "get_async_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+    )
+    monkeypatch.delenv("PULSE_RUNTIME_MODE", raising=False)
+    client = AsyncGristClient("https://example.test", "doc_async", "token")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(client.add_records("Activity_Log", [{"Action": "x"}]))
+    assert calls == ["POST"]
+
+
+def test_concurrent_identical_reads_share_one_request(monkeypatch):
+    release = threading.Event()
+
+    class _SlowSession(_RecordingSession):
+        def request(self, method, url, **kwargs):
+            release.wait(timeout=2)
+            return super().request(method, url, **kwargs)
+
+    session = _SlowSession({"records": [{"id": 1, "fields": {}}]})
+    monkeypatch.setattr(grist_client, "get_http_session", lambda: session)
+    client = GristClient("https://example.test", "doc_flight", "token")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.get_records("ProductBatchMS"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while grist_client._read_flight.in_flight() == 0:
+        time.sleep(0.001)
+    time.sleep(0.02)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(session.calls) == 1
+    assert results == [[{"id": 1, "fields": {}}]] * 4
+    assert len({id(result) for result in results}) == 4
+
+
+def test_concurrent_async_reads_share_one_request_until_a_write(monkeypatch):
+    calls = []
+
+    async def _handler(request):
+        calls.append(request.method)
+        await asyncio.sleep(0.01)
+        if request.method == "PATCH":
+            return httpx.Response(200, json={})
+        return httpx.Response(200, json={"records": []})
+
+    monkeypatch.setattr(
+        grist_client,
+        "get_async_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(_handler)),
+    )
+    monkeypatch.delenv("PULSE_RUNTIME_MODE", raising=False)
+    client = AsyncGristClient("https://example.test", "doc_async_flight", "token")
+
+    async def _run():
+        await asyncio.gather(*(client.get_records("ProductBatchMaster") for _ in range(5)))
+        first = asyncio.ensure_future(client.get_records("ProductBatchMaster"))
+        await asyncio.sleep(0)
+        await client.patch_record("ProductBatchMaster", 1, {"status": "x"})
+        await asyncio.gather(first, client.get_records("ProductBatchMaster"))
+
+    asyncio.run(_run())
+    assert sorted(calls) == ["GET", "GET", "GET", "PATCH"]
+
+
+def test_get_table_reads_column_oriented_data_with_record_views(monkeypatch):
+    session = _RecordingSession(
+        {"id": [4, 9], "batch_id": [1, 2], "status": ["Cutting Pending", "Cutting Pending"], "product_part": [["L", 3], None]}
+    )
+    monkeypatch.setattr(grist_client, "get_http_session", lambda: session)
+    client = GristClient("https://example.test", "doc_columns", "token")
+
+    table = client.get_table("ProductBatchMS", filter={"batch_id": [1, 2]})
+
+    method, url, kwargs = session.calls[0]
+    assert url == "https://example.test/api/docs/doc_columns/tables/ProductBatchMS/data"
+    assert kwargs["params"] == {"filter": '{"batch_id": [1, 2]}'}
+    assert len(table) == 2
+    assert table.column("status")[0] is table.column("status")[1]
+    assert table.value(9, "batch_id") == 2
+    assert table.get(4)["fields"]["product_part"] == ["L", 3]
+    assert table.get(5) is None
+    records = list(table)
+    assert records[1].get("id") == 9
+    assert records[1].get("fields", {}).get("status") == "Cutting Pending"
+    assert records[0] == {"id": 4, "fields": {"batch_id": 1, "status": "Cutting Pending", "product_part": ["L", 3]}}
+    assert table.to_records()[1] == {"id": 9, "fields": {"batch_id": 2, "status": "Cutting Pending", "product_part": None}}
+
+
+def test_cached_columnar_snapshot_is_dropped_on_write(monkeypatch):
+    session = _RecordingSession({"id": [1], "status": ["Done"]})
+    monkeypatch.setattr(grist_client, "get_http_session", lambda: session)
+    client = GristClient("https://example.test", "doc_columns_cache", "token", use_cache=True)
+    client.invalidate_cache()
+
+    first = client.get_table("ProductBatchMS")
+    assert client.get_table("ProductBatchMS") is first
+    client.patch_record("ProductBatchMS", 1, {"status": "Open"})
+    client.get_table("ProductBatchMS")
+    assert [call[0] for call in session.calls] == ["GET", "PATCH", "GET"]
+
+
+def test_columnar_table_is_smaller_than_record_dicts():
+    rows = 2000
+    payload = {
+        "id": list(range(1, rows + 1)),
+        "batch_id": [row % 40 for row in range(rows)],
+        "current_status": [json.loads('"Cutting Pending"') for _ in range(rows)],
+        "current_stage_name": [json.loads('"Cutting"') for _ in range(rows)],
+        "total_qty": [float(row) for row in range(rows)],
+    }
+
+    def _allocated(build):
+        tracemalloc.start()
+        try:
+            value = build()
+            size = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        assert value
+        return size
+
+    as_records = _allocated(lambda: ColumnarTable.from_payload(payload).to_records())
+    as_columns = _allocated(lambda: ColumnarTable.from_payload(payload))
+    assert as_columns * 3 < as_records
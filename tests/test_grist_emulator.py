@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from io import BytesIO
+
+import pytest
+import requests
+
+from pulse.core.grist_client import AsyncGristClient, GristClient, is_stale
+from pulse.core.resilience import GristUnavailableError
+from pulse.data.production_repo import ProductionRepo
+from pulse.testing.grist_emulator import GristEmulator, seed_default_docs
+
+
+SERVER = "https://grist.invalid"
+
+
+@pytest.fixture
+def emulator():
+    emulator = GristEmulator()
+    seed_default_docs(emulator, "costing", "pulse")
+    with emulator.activate():
+        yield emulator
+
+
+def test_records_crud_filter_sort_and_upsert(emulator):
+    client = GristClient(SERVER, "costing", "key")
+
+    stages = client.get_records("ProcessStage", filter={"process_seq_id": [1]}, sort="-seq_no")
+    assert [record["fields"]["stage_name"] for record in stages] == ["Bending", "Cutting"]
+
+    added = client.add_records("BatchStatusHistory", [{"batch_id": 2, "new_status": "Pending Approval"}])
+    new_id = added["records"][0]["id"]
+    client.patch_records("BatchStatusHistory", [(new_id, {"remarks": "created"})])
+    client.upsert_records("ProcessMaster", [{"process_name": "Cutting", "display_label": "Cut only"}], ["process_name"])
+
+    history = {record["id"]: record["fields"] for record in emulator.records("costing", "BatchStatusHistory")}
+    assert history[new_id]["remarks"] == "created"
+    labels = [record["fields"]["display_label"] for record in emulator.records("costing", "ProcessMaster")]
+    assert labels == ["Cut > Bend", "Cut only"]
+
+    with pytest.raises(requests.HTTPError) as excinfo:
+        client.add_records("BatchStatusHistory", [{"no_such_column": 1}])
+    assert excinfo.value.response.status_code == 400
+
+
+def test_columnar_data_columns_sql_and_attachments(emulator, tmp_path):
+    client = GristClient(SERVER, "costing", "key")
+
+    table = client.get_table("ProductBatchMS")
+    assert table.column("status") == ["Cutting Pending", "In Cutting"]
+    assert "row_cutlist_pdf" in {column["id"] for column in client.get_columns("ProductBatchMS")}
+
+    rows = client.sql("SELECT stage_name, COUNT(*) AS n FROM ProcessStage WHERE seq_no = ? GROUP BY stage_name", [1])
+    assert rows == [{"stage_name": "Cutting", "n": 2}]
+
+    pdf = tmp_path / "cutlist.pdf"
+    pdf.write_bytes(b"%PDF-1.4 test")
+    attachment_id = client.upload_attachment(pdf)
+    assert client.download_attachment(attachment_id) == b"%PDF-1.4 test"
+    streamed = BytesIO()
+    assert client.stream_attachment(attachment_id, streamed, chunk_size=4) == 13
+    assert streamed.getvalue() == b"%PDF-1.4 test"
+
+
+def test_call_counts_show_round_trips_saved_by_the_cache(emulator):
+    repo = ProductionRepo()
+    seed_default_docs(emulator, repo.costing_client.doc_id, repo.pulse_client.doc_id)
+    emulator.reset_calls()
+
+    for _ in range(3):
+        repo.costing_client.get_records("ProductBatchMS")
+
+    assert emulator.call_count("GET", table="ProductBatchMS") == 1
+
+
+def test_async_client_and_latency(emulator):
+    emulator.latency = 0.1
+    client = AsyncGristClient(SERVER, "pulse", "key")
+
+    async def _run():
+        started = time.perf_counter()
+        users, roles = await asyncio.gather(client.get_records("Users"), client.get_records("Roles"))
+        return users, roles, time.perf_counter() - started
+
+    users, roles, elapsed = asyncio.run(_run())
+    assert len(users) == 3 and len(roles) == 3
+    # Both calls overlap on the event loop instead of queueing behind each other.
+    assert 0.1 <= elapsed < 0.19
+    assert emulator.call_count(endpoint="records", doc_id="pulse") == 2
+
+
+def test_injected_overload_serves_stale_snapshot_then_opens_breaker(emulator):
+    client = GristClient(SERVER, "costing", "key", use_cache=True)
+    fresh = client.get_records("ProductBatchMaster")
+    client.invalidate_cache("ProductBatchMaster")
+    emulator.fail_next(503, times=10, method="GET")
+
+    stale = client.get_records("ProductBatchMaster")
+    assert is_stale(stale) and list(stale) == fresh
+
+    for _ in range(4):
+        client.get_records("ProductBatchMaster")
+    with pytest.raises(GristUnavailableError):
+        client.get_columns("ProductBatchMaster")
+
+
+def test_localhost_server_speaks_http():
+    emulator = GristEmulator(api_key="secret")
+    emulator.load_fixture({"doc_id": "d1", "tables": {"Roles": {"records": [{"Role_Name": "Admin"}]}}})
+    server = emulator.serve()
+    try:
+        response = requests.get(f"{server.url}/api/docs/d1/tables/Roles/records", headers={"Authorization": "Bearer secret"}, timeout=5)
+        denied = requests.get(f"{server.url}/api/docs/d1/tables/Roles/records", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert response.json() == {"records": [{"id": 1, "fields": {"Role_Name": "Admin"}}]}
+    assert denied.status_code == 401
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from pulse.data.production_repo import ProductionRepo
+from pulse.integrations import production
+from pulse.tasks.job_pipeline import JobJournal, JobPipeline, job_pipeline
+from pulse.testing.benchmark import SMALL_SCALE, build_bench_data
+from pulse.testing.grist_emulator import GristEmulator
+
+
+def test_steps_run_concurrently_and_resume_skips_finished_ones(tmp_path):
+    pipeline = JobPipeline(journal_dir=tmp_path, retry_delay=0)
+    barrier = threading.Barrier(2, timeout=5)
+    calls = []
+
+    def work(name):
+        calls.append(name)
+        if name in ("left", "right"):
+            barrier.wait()
+        return name.upper()
+
+    async def handler(run):
+        first = await run.step("first", work, "first")
+        await asyncio.gather(run.step("left", work, "left"), run.step("right", work, "right"))
+        assert first == "FIRST"
+
+    pipeline.register("demo", handler)
+    JobJournal(tmp_path).save(
+        {"id": "job-1", "kind": "demo", "payload": {}, "done": {"first": "FIRST"}, "attempts": 1, "created_at": 0}
+    )
+
+    async def scenario():
+        assert await pipeline.resume(bot=None) == 1
+        await pipeline.drain()
+
+    asyncio.run(scenario())
+    assert sorted(calls) == ["left", "right"]
+    assert pipeline.journal.pending() == []
+
+
+def test_failed_job_is_retried_then_reported(tmp_path):
+    pipeline = JobPipeline(journal_dir=tmp_path, max_attempts=2, retry_delay=0)
+    bot = SimpleNamespace(send_message=AsyncMock())
+    attempts = []
+
+    async def handler(run):
+        attempts.append(1)
+        raise RuntimeError("upload refused")
+
+    pipeline.register("demo", handler)
+
+    async def scenario():
+        pipeline.submit("demo", {"title": "Demo", "chat_id": 42}, bot)
+        await pipeline.drain()
+
+    asyncio.run(scenario())
+    assert len(attempts) == 2
+    bot.send_message.assert_awaited_once_with(chat_id=42, text="Demo failed: upload refused")
+    assert pipeline.journal.pending() == []
+
+
+def test_batch_approval_commits_first_and_attaches_cut_lists_in_background(tmp_path, monkeypatch):
+    emulator = GristEmulator()
+    data = build_bench_data(SMALL_SCALE)
+    manager = data.targets["manager"]
+    batch_id = data.targets["pending_batch_id"]
+    monkeypatch.setattr(job_pipeline, "journal", JobJournal(tmp_path))
+    bot = SimpleNamespace(send_message=AsyncMock())
+    with emulator.activate():
+        repo = ProductionRepo()
+        emulator.load_fixture(data.costing, repo.costing_client.doc_id)
+        emulator.load_fixture(data.pulse, repo.pulse_client.doc_id)
+        update = SimpleNamespace(effective_chat=SimpleNamespace(id=777))
+        context = SimpleNamespace(
+            bot=bot,
+            user_data={"user": {"user_id": manager["user_id"], "role": "R01", "name": "Manager"}},
+        )
+
+        async def scenario():
+            approved = await production.approve_batches_by_ids(update, context, [batch_id])
+            fields = ProductionRepo().get_master_by_id(batch_id)["fields"]
+            assert approved and fields["approval_status"] == "Approved"
+            assert not fields.get("ms_cutlist_pdf")
+            assert list(tmp_path.glob("*.json"))
+            await job_pipeline.drain()
+
+        pdfs_at_first_notice = []
+
+        async def check_pdfs_attached(_bot, event_type, *args, **kwargs):
+            if event_type == "ms_stage_pending" and not pdfs_at_first_notice:
+                rows = ProductionRepo().list_ms_rows_for_batch(batch_id)
+                pdfs_at_first_notice.append(all(row["fields"].get("row_cutlist_pdf") for row in rows))
+
+        notify = AsyncMock(side_effect=check_pdfs_attached)
+        monkeypatch.setattr(production, "_notify_event", notify)
+        asyncio.run(scenario())
+        assert pdfs_at_first_notice == [True]
+
+        fields = ProductionRepo().get_master_by_id(batch_id)["fields"]
+        assert fields.get("ms_cutlist_pdf")
+        rows = [row for row in ProductionRepo().list_ms_rows() if production._normalize_ref(row["fields"].get("batch_id")) == batch_id]
+        assert rows and all(row["fields"].get("row_cutlist_pdf") for row in rows)
+        assert "ms_stage_pending" in [call.args[1] for call in notify.await_args_list]
+
+    progress = [call.kwargs["text"] for call in bot.send_message.await_args_list if call.kwargs["chat_id"] == 777]
+    assert progress[0].endswith("preparing cut lists and stage notifications...")
+    assert progress[-1].endswith("first-stage supervisors notified.")
+    assert list(tmp_path.glob("*.json")) == []
+
+
+def test_first_stage_is_notified_even_when_row_pdf_upload_fails(tmp_path, monkeypatch):
+    emulator = GristEmulator()
+    data = build_bench_data(SMALL_SCALE)
+    manager = data.targets["manager"]
+    batch_id = data.targets["pending_batch_id"]
+    pipeline = JobPipeline(journal_dir=tmp_path, max_attempts=2, retry_delay=0)
+    pipeline.register("batch_approval", production._run_batch_approval_job)
+    bot = SimpleNamespace(send_message=AsyncMock())
+    with emulator.activate():
+        repo = ProductionRepo()
+        emulator.load_fixture(data.costing, repo.costing_client.doc_id)
+        emulator.load_fixture(data.pulse, repo.pulse_client.doc_id)
+        updated = production.approve_batch_service(repo, batch_id, manager["costing_ref"])
+        payload = {
+            "title": "Batch cut lists",
+            "batch_id": batch_id,
+            "batch_no": updated["master"]["fields"]["batch_no"],
+            "ms_rows": updated["ms_rows"],
+            "part_ids": updated["part_ids"],
+            "batch_qty": updated["batch_qty"],
+            "chat_id": 777,
+        }
+        upload = MagicMock(side_effect=RuntimeError("attachments unavailable"))
+        notify = AsyncMock()
+        monkeypatch.setattr(production, "_attach_ms_row_cutlist_pdfs", upload)
+        monkeypatch.setattr(production, "_notify_event", notify)
+        notify_first_stage = AsyncMock(wraps=production._notify_ms_first_stage)
+        monkeypatch.setattr(production, "_notify_ms_first_stage", notify_first_stage)
+
+        async def scenario():
+            pipeline.submit("batch_approval", payload, bot)
+            await pipeline.drain()
+
+        asyncio.run(scenario())
+
+    assert upload.call_count == 2
+    assert notify_first_stage.await_count == 1
+    assert "ms_stage_pending" in [call.args[1] for call in notify.await_args_list]
+    bot.send_message.assert_awaited_with(chat_id=777, text="Batch cut lists failed: attachments unavailable")
@@ -320,6 +320,9 @@ class MenuStateRoutingTests(unittest.IsolatedAsyncioTestCase):
                     {"id": 14, "fields": {"batch_no": "B-14", "approval_status": "Pending Approval"}},
                 ]
 
+            def list_ms_rows(self):
+                return self.costing_client.get_records("ProductBatchMS")
+
             def format_product_parts(self, value):
                 return str(value or "")
 
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import socket
+import urllib.request
+from types import SimpleNamespace
+
+from pulse import main as pulse_main
+from pulse.core import grist_client
+from pulse.core.grist_client import GristClient
+from pulse.core.metrics import call_site, endpoint_labels, grist_metrics, instrument_handler, start_metrics_server
+
+
+class _Resp:
+    status_code = 200
+    headers: dict = {}
+
+    def __init__(self, payload):
+        self._payload = payload
+        self.content = json.dumps(payload).encode("utf-8")
+
+    def raise_for_status(self):
+        return None
+
+    def json(self):
+        return self._payload
+
+
+class _Session:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def request(self, method, url, **kwargs):
+        return _Resp(self.payload)
+
+
+def test_endpoint_labels_split_table_and_endpoint():
+    assert endpoint_labels("https://g/api/docs/d1/tables/ProductBatchMS/records", "d1") == ("ProductBatchMS", "records")
+    assert endpoint_labels("https://g/api/docs/d1/sql", "d1") == ("", "sql")
+    assert endpoint_labels("https://g/api/docs/d1/attachments/4/download", "d1") == ("", "attachments")
+
+
+def test_grist_calls_are_attributed_to_the_active_call_site(monkeypatch):
+    grist_metrics.reset()
+    payload = {"records": [{"id": 1, "fields": {}}, {"id": 2, "fields": {}}]}
+    monkeypatch.setattr(grist_client, "get_http_session", lambda: _Session(payload))
+    client = GristClient("https://example.test", "doc_metrics", "token")
+
+    with call_site("state:my_ms_jobs_selection"):
+        client.get_records("ProductBatchMS")
+        client.get_records("ProductBatchMS")
+    client.add_records("Activity_Log", [{"Action": "a"}, {"Action": "b"}, {"Action": "c"}])
+
+    data = grist_metrics.snapshot()
+    read = data[("doc_metrics", "ProductBatchMS", "records", "GET", "state:my_ms_jobs_selection")]
+    assert read["count"] == 2
+    assert read["rows"] == 4
+    assert read["bytes"] == 2 * len(json.dumps(payload))
+    assert sum(read["buckets"]) == 2
+    write = data[("doc_metrics", "Activity_Log", "records", "POST", "unattributed")]
+    assert write["rows"] == 3
+
+    text = grist_metrics.render_prometheus()
+    labels = 'doc="doc_metrics",table="ProductBatchMS",endpoint="records",method="GET",site="state:my_ms_jobs_selection"'
+    assert f"pulse_grist_requests_total{{{labels}}} 2" in text
+    assert f'pulse_grist_request_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert "state:my_ms_jobs_selection GET ProductBatchMS: 2 calls" in grist_metrics.summary()
+    grist_metrics.reset()
+
+
+def test_instrumented_handler_labels_callbacks_without_ids():
+    seen = []
+
+    async def handler(update, context):
+        from pulse.core.metrics import current_call_site
+
+        seen.append(current_call_site())
+
+    wrapped = instrument_handler(pulse_main._call_site_label)(handler)
+    callback = SimpleNamespace(callback_query=SimpleNamespace(data="msb:ov:42:1"))
+    text = SimpleNamespace(callback_query=None)
+    asyncio.run(wrapped(callback, SimpleNamespace(user_data={})))
+    asyncio.run(wrapped(text, SimpleNamespace(user_data={"menu_state": "my_ms_jobs_selection"})))
+
+    assert seen == ["callback:msb:ov", "state:my_ms_jobs_selection"]
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = start_metrics_server(port)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            body = response.read().decode("utf-8")
+        assert "# TYPE pulse_grist_request_seconds histogram" in body
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from pulse.core.unit_of_work import unit_of_work
+from pulse.data.production_repo import ProductionRepo
+from pulse.integrations import production
+from pulse.testing.benchmark import SMALL_SCALE, build_bench_data
+from pulse.testing.grist_emulator import GristEmulator
+
+
+def _per_row(repo, role_name, viewer):
+    return {
+        row["id"]
+        for row in repo.list_ms_rows()
+        if production._is_ms_row_visible_to_role(repo, row["fields"], role_name, viewer_user_id=viewer, row_id=row["id"])
+    }
+
+
+def test_index_matches_per_row_visibility():
+    emulator = GristEmulator()
+    data = build_bench_data(SMALL_SCALE)
+    with emulator.activate():
+        repo = ProductionRepo()
+        emulator.load_fixture(data.costing, repo.costing_client.doc_id)
+        emulator.load_fixture(data.pulse, repo.pulse_client.doc_id)
+
+        viewers = ["", *sorted(repo.costing_user_directory.user_ids)]
+        roles = ["", "Cutting_Supervisor", "Bending_Supervisor", "Production_Supervisor|Cutting_Supervisor"]
+        for viewer in viewers:
+            for role_name in roles:
+                expected = _per_row(repo, role_name, viewer)
+                assert set(repo.ms_visibility.visible_rows(role_name, viewer)) == expected, (viewer, role_name)
+
+
+def test_index_follows_rows_that_change_stage():
+    emulator = GristEmulator()
+    data = build_bench_data(SMALL_SCALE)
+    with emulator.activate():
+        repo = ProductionRepo()
+        emulator.load_fixture(data.costing, repo.costing_client.doc_id)
+        emulator.load_fixture(data.pulse, repo.pulse_client.doc_id)
+        row_id = data.targets["accept_row_id"]
+
+        visible = repo.ms_visibility.visible_rows("Bending_Supervisor")
+        assert visible[row_id] == "handoff"
+        emulator.reset_calls()
+
+        with unit_of_work() as unit:
+            repo.update_ms(row_id, {"current_status": "Completed", "status": "Completed"})
+            # The shared index only moves once Grist has accepted the patch.
+            assert row_id in repo.ms_visibility.visible_rows("Bending_Supervisor")
+            unit.flush()
+            assert row_id not in repo.ms_visibility.visible_rows("Bending_Supervisor")
+        assert emulator.call_count("GET") == 0
+        assert row_id not in repo.ms_visibility.visible_rows("Bending_Supervisor")
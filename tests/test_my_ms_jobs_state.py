@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from pulse.data.production_repo import ProductionRepo
+from pulse.integrations import production
+from pulse.testing.benchmark import SMALL_SCALE, build_bench_data
+from pulse.testing.grist_emulator import GristEmulator
+
+
+def test_my_ms_jobs_state_keeps_row_ids_and_hydrates_the_page():
+    emulator = GristEmulator()
+    data = build_bench_data(SMALL_SCALE)
+    actor = data.targets["cutting"]
+    with emulator.activate():
+        repo = ProductionRepo()
+        emulator.load_fixture(data.costing, repo.costing_client.doc_id)
+        emulator.load_fixture(data.pulse, repo.pulse_client.doc_id)
+        context = SimpleNamespace(user_data={"user": {"user_id": actor["user_id"]}})
+        reply = AsyncMock()
+
+        with patch("pulse.integrations.production._reply", new=reply):
+            asyncio.run(production.start_my_ms_jobs(SimpleNamespace(), context))
+            state = {key: value for key, value in context.user_data.items() if key.startswith("my_ms_jobs")}
+            assert "my_ms_jobs_all_records" not in state
+            assert "my_ms_jobs_creator_by_batch" not in state
+            row_ids = state["my_ms_jobs_selection"]["row_ids"]
+            assert row_ids and all(isinstance(row_id, int) for row_id in row_ids)
+            assert all(isinstance(row_id, int) for row_id in state["my_ms_jobs_all_row_ids"])
+            json.dumps(state)
+
+            asyncio.run(production._show_my_ms_jobs_page(SimpleNamespace(), context))
+
+        page_text = reply.await_args.args[1]
+        first = repo.get_ms_row_by_id(row_ids[0])
+        assert f"1. {repo.format_product_parts(first['fields']['product_part'])}" in page_text
+
+
+def test_my_ms_jobs_reads_grist_off_the_event_loop_thread():
+    emulator = GristEmulator()
+    data = build_bench_data(SMALL_SCALE)
+    actor = data.targets["cutting"]
+    loaders = []
+    real_loader = production._list_all_ms_jobs_for_visibility
+
+    def _recording_loader(repo):
+        loaders.append(threading.get_ident())
+        return real_loader(repo)
+
+    async def _open():
+        await production.start_my_ms_jobs(SimpleNamespace(), context)
+        return threading.get_ident()
+
+    with emulator.activate():
+        repo = ProductionRepo()
+        emulator.load_fixture(data.costing, repo.costing_client.doc_id)
+        emulator.load_fixture(data.pulse, repo.pulse_client.doc_id)
+        context = SimpleNamespace(user_data={"user": {"user_id": actor["user_id"]}})
+
+        with (
+            patch("pulse.integrations.production._reply", new=AsyncMock()),
+            patch("pulse.integrations.production._list_all_ms_jobs_for_visibility", new=_recording_loader),
+        ):
+            loop_thread = asyncio.run(_open())
+
+    assert loaders and loop_thread not in loaders
+    assert context.user_data["my_ms_jobs_selection"]["row_ids"]
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+
 from pulse.notifications import subscriptions
 
 
@@ -83,3 +85,37 @@ def test_get_subscribers_uses_user_role_assignment_for_context_roles(monkeypatch
         context={"recipient_roles": ["Production_Manager"]},
     )
     assert [row.get("user_id") for row in recipients] == ["U_MULTI"]
+
+
+def test_get_subscribers_async_matches_sync_resolution(monkeypatch):
+    class _FakeAsyncClient(_FakeClient):
+        async def get_records(self, table: str) -> list[dict]:
+            return list(self.tables.get(table, []))
+
+    pulse_tables = {
+        "Roles": [{"id": 1, "fields": {"Role_ID": "R01", "Role_Name": "Production_Manager"}}],
+        "Users": [
+            {"id": 1, "fields": {"User_ID": "U_PM", "Telegram_ID": "1001", "Role": 1, "Active": True}},
+            {"id": 2, "fields": {"User_ID": "U_OWNER", "Telegram_ID": "1002", "Role": 1, "Active": True}},
+        ],
+        "Notification_Events": [
+            {"id": 1, "fields": {"Event_ID": "batch_status_changed", "Recipient_Mode": "OWNER_ONLY"}},
+        ],
+        "Notification_Subscriptions": [],
+        "UserRoleAssignment": [],
+    }
+    costing_tables = {
+        "Users": [{"id": 12, "fields": {"User_ID": "U_OWNER"}}],
+        "ProductBatchMaster": [{"id": 501, "fields": {"owner_user": 12}}],
+    }
+    monkeypatch.setattr(subscriptions, "pulse_client", _FakeClient(pulse_tables))
+    monkeypatch.setattr(subscriptions, "costing_client", _FakeClient(costing_tables))
+    monkeypatch.setattr(subscriptions, "async_pulse_client", _FakeAsyncClient(pulse_tables))
+    monkeypatch.setattr(subscriptions, "async_costing_client", _FakeAsyncClient(costing_tables))
+
+    context = {"batch_id": 501, "recipient_roles": ["Production_Manager"]}
+    expected = subscriptions.get_subscribers("batch_status_changed", context=context)
+    recipients = asyncio.run(subscriptions.get_subscribers_async("batch_status_changed", context=context))
+
+    assert recipients == expected
+    assert [row.get("user_id") for row in recipients] == ["U_OWNER", "U_PM"]
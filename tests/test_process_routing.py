@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from pulse.data.process_routing import ProcessRouting
+from pulse.data.production_repo import ProductionRepo
+from pulse.testing.grist_emulator import GristEmulator, seed_default_docs
+
+
+def test_routing_orders_stages_and_resolves_roles_and_labels():
+    routing = ProcessRouting(
+        masters=[
+            {"id": 1, "fields": {"process_name": "Cutting - Bending", "display_label": "", "legacy_process_seq_text": "Cutting - Bending"}},
+        ],
+        stages=[
+            {"id": 11, "fields": {"process_seq_id": 1, "stage_name": "Bending", "seq_no": 2, "supervisor_role": "Bend_Sup"}},
+            {"id": 10, "fields": {"process_seq_id": 1, "stage_name": "Cutting", "seq_no": 1, "resolved_role_name": "Cut_Sup"}},
+            {"id": 12, "fields": {"process_seq_id": 2, "stage_name": "Welding", "seq_no": 1, "supervisor_role": "Weld_Sup"}},
+        ],
+    )
+
+    assert routing.seq_id("Cutting - Bending") == 1
+    assert routing.stages_for(1) == ["Cutting", "Bending"]
+    assert routing.stages_for("Painting - Packing") == ["Painting", "Packing"]
+    assert routing.display_label(1) == "Cutting - Bending"
+    assert routing.stage_role(1, "Cutting") == "Cut_Sup"
+    # Unknown (process, stage) pairs fall back to the stage-wide mapping.
+    assert routing.stage_role(9, "Welding") == "Weld_Sup"
+    assert routing.stage_ids[(1, "Bending")] == (11,)
+
+
+def test_repo_lookups_reuse_one_compiled_routing_until_a_write():
+    emulator = GristEmulator()
+    with emulator.activate():
+        repo = ProductionRepo()
+        costing, _ = seed_default_docs(emulator, repo.costing_client.doc_id, repo.pulse_client.doc_id)
+        emulator.reset_calls()
+
+        for _ in range(50):
+            assert repo.get_process_stage_names(1) == ["Cutting", "Bending"]
+            assert repo.get_process_display_label(2) == "Cut"
+            assert repo.get_stage_role_for_process_stage(1, "Bending")
+        assert emulator.call_count("GET") == 2
+
+        repo.costing_client.patch_record("ProcessMaster", 2, {"display_label": "Cut only"})
+        assert repo.get_process_display_label(2) == "Cut only"
+        assert emulator.call_count("GET", table="ProcessMaster") == 2
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from pulse.core.columnar import ColumnarTable
+from pulse.data.production_repo import ProductionRepo
+
+
+class _FakeCostingClient:
+    def __init__(self, tables: dict[str, list[dict]] | None = None, columns: dict[str, list[str]] | None = None):
+        self.tables = tables or {}
+        self.columns = columns or {}
+        self.sql_calls: list[tuple[str, list]] = []
+        self.sql_results: list[list[dict]] = []
+        self.sql_error: Exception | None = None
+
+    def get_records(self, table: str, filter=None, sort=None, limit=None):
+        return list(self.tables.get(table, []))
+
+    def get_table(self, table: str):
+        return ColumnarTable.from_records(self.get_records(table))
+
+    def get_columns(self, table: str):
+        return [{"id": column_id, "fields": {"type": "Text"}} for column_id in self.columns.get(table, [])]
+
+    def sql(self, query, args=None):
+        self.sql_calls.append((query, list(args or [])))
+        if self.sql_error:
+            raise self.sql_error
+        return self.sql_results.pop(0)
+
+
+def _repo(client: _FakeCostingClient) -> ProductionRepo:
+    repo = ProductionRepo()
+    repo.costing_client = client
+    return repo
+
+
+def test_child_status_counts_are_grouped_server_side():
+    client = _FakeCostingClient(
+        columns={
+            "ProductBatchMS": ["batch_id", "status", "current_status"],
+            "ProductBatchCNC": ["batch_id", "status"],
+            "ProductBatchStore": ["batch_id"],
+        }
+    )
+    client.sql_results.append([{"status": "Done", "row_count": 2}, {"status": "In Cutting", "row_count": 1}])
+
+    assert sorted(_repo(client).list_child_statuses(7)) == ["Done", "Done", "In Cutting"]
+    query, args = client.sql_calls[0]
+    assert "COALESCE(NULLIF(status, ''), NULLIF(current_status, ''))" in query
+    assert "ProductBatchStore" not in query
+    assert args == [7, 7]
+
+
+def test_child_status_counts_fall_back_to_table_scan():
+    client = _FakeCostingClient(
+        tables={
+            "ProductBatchMS": [
+                {"id": 1, "fields": {"batch_id": 7, "current_status": "Done"}},
+                {"id": 2, "fields": {"batch_id": 8, "current_status": "Done"}},
+            ],
+        },
+        columns={"ProductBatchMS": ["batch_id", "current_status"]},
+    )
+    client.sql_error = RuntimeError("sql endpoint unavailable")
+
+    assert _repo(client).count_child_statuses(7) == {"Done": 1}
+
+
+def test_max_batch_sequence_only_reads_matching_month():
+    client = _FakeCostingClient()
+    client.sql_results.append(
+        [{"batch_no": "FEB26-M1-MS-004"}, {"batch_no": "FEB26-M2-MCS-011"}, {"batch_no": "FEB26-bad"}]
+    )
+
+    assert _repo(client).get_max_batch_sequence("FEB26") == 11
+    assert client.sql_calls[0][1] == ["FEB26-%"]
+
+
+def test_update_ms_for_batch_sends_one_bulk_patch():
+    class _BulkClient(_FakeCostingClient):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.patches: list[tuple[str, list]] = []
+
+        def patch_records(self, table, updates, chunk_size=None):
+            self.patches.append((table, list(updates)))
+
+    client = _BulkClient(
+        tables={"ProductBatchMS": [{"id": 1, "fields": {"batch_id": 7}}, {"id": 2, "fields": {"batch_id": 7}}]},
+    )
+    _repo(client).update_ms_for_batch(7, {"scheduled_date": "2026-03-01"})
+
+    assert client.patches == [
+        ("ProductBatchMS", [(1, {"scheduled_date": "2026-03-01"}), (2, {"scheduled_date": "2026-03-01"})])
+    ]
+
+
+class _SchemaClient(_FakeCostingClient):
+    server = "https://example.test"
+
+    def __init__(self, doc_id: str, columns: list[dict]):
+        super().__init__()
+        self.doc_id = doc_id
+        self.column_defs = columns
+        self.get_columns_calls = 0
+        self.added: list[tuple[str, str, str]] = []
+
+    def get_columns(self, table: str):
+        self.get_columns_calls += 1
+        return list(self.column_defs)
+
+    def add_column(self, table: str, column_id: str, col_type: str):
+        self.added.append((table, column_id, col_type))
+        self.column_defs.append({"id": column_id, "fields": {"type": col_type}})
+
+
+def test_schema_checks_share_one_column_fetch_across_repos():
+    client = _SchemaClient(
+        "doc_schema_shared",
+        [
+            {"id": "batch_id", "fields": {"type": "Ref:ProductBatchMaster"}},
+            {"id": "status", "fields": {"type": "Text"}},
+            {"id": "batch_no", "fields": {"type": "Text", "isFormula": True}},
+        ],
+    )
+
+    first = _repo(client)
+    assert first.filter_table_fields("ProductBatchMS", {"status": "Done", "batch_no": "B1", "x": 1}) == {"status": "Done"}
+    second = _repo(client)
+    assert second.get_column_type("ProductBatchMS", "batch_id") == "Ref:ProductBatchMaster"
+    assert second.get_ms_table_column_ids() == {"batch_id", "status", "batch_no"}
+    assert client.get_columns_calls == 1
+
+
+def test_ensure_ms_workflow_columns_reloads_schema_only_after_adding():
+    client = _SchemaClient("doc_schema_ensure", [{"id": "batch_id", "fields": {"type": "Int"}}])
+    repo = _repo(client)
+
+    repo.ensure_ms_workflow_columns()
+    assert [column_id for _, column_id, _ in client.added] == [
+        "next_stage_name",
+        "current_stage_role_name",
+        "row_cutlist_pdf",
+        "supervisor_remarks",
+    ]
+    assert "supervisor_remarks" in repo.get_ms_table_column_ids()
+
+    repo.ensure_ms_workflow_columns()
+    assert len(client.added) == 4
+    assert client.get_columns_calls == 2
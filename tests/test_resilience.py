@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+import requests
+
+from pulse import main as pulse_main
+from pulse.core import grist_client, resilience
+from pulse.core.grist_client import GristClient, is_stale
+from pulse.core.resilience import CircuitBreaker, DocGuard, GristUnavailableError, TokenBucket
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Resp:
+    def __init__(self, status_code=200, payload=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._payload = payload if payload is not None else {}
+        self.content = b""
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(response=self)
+
+    def json(self):
+        return self._payload
+
+
+class _ScriptedSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append(method)
+        result = self.responses.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_token_bucket_spaces_bursts_and_backs_off_on_retry_after():
+    clock = _Clock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+    assert bucket.reserve(10) == 0
+    assert bucket.reserve(10) == 0
+    assert bucket.reserve(10) == pytest.approx(0.5)
+
+    bucket.throttled(retry_after=4)
+    assert bucket.rate == 1
+    assert bucket.reserve(10) == pytest.approx(4)
+    assert bucket.reserve(1) is None
+
+    bucket.succeeded()
+    assert bucket.rate == pytest.approx(1.1)
+
+
+def test_circuit_breaker_opens_then_probes_once():
+    clock = _Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    breaker.failed()
+    assert breaker.allow()
+    breaker.failed()
+    assert not breaker.allow()
+    assert breaker.retry_in() == 30
+
+    clock.now = 30
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.failed()
+    assert not breaker.allow()
+
+    clock.now = 60
+    assert breaker.allow()
+    breaker.succeeded()
+    assert breaker.allow()
+
+
+def test_open_breaker_serves_stale_reads_and_rejects_writes(monkeypatch):
+    guard = DocGuard(rate=100, burst=100, failure_threshold=1, reset_timeout=30)
+    monkeypatch.setitem(resilience._guards, ("https://example.test", "doc_breaker"), guard)
+    session = _ScriptedSession(
+        [
+            _Resp(payload={"records": [{"id": 1, "fields": {"batch_id": 3}}]}),
+            _Resp(status_code=200),
+            _Resp(status_code=503),
+        ]
+    )
+    monkeypatch.setattr(grist_client, "get_http_session", lambda: session)
+    client = GristClient("https://example.test", "doc_breaker", "token", use_cache=True)
+    client.invalidate_cache()
+
+    assert not is_stale(client.get_records("ProductBatchMS"))
+    client.patch_record("ProductBatchMS", 1, {"status": "Done"})
+    stale = client.get_records("ProductBatchMS", filter={"batch_id": [3]})
+    assert is_stale(stale)
+    assert stale == [{"id": 1, "fields": {"batch_id": 3}}]
+    assert guard.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(GristUnavailableError, match="try again in about 30 seconds"):
+        client.patch_record("ProductBatchMS", 1, {"status": "Open"})
+    assert is_stale(client.get_records("ProductBatchMS"))
+    assert session.calls == ["GET", "PATCH", "GET"]
+
+
+def test_blocking_calls_on_the_event_loop_never_sleep_behind_the_limiter(monkeypatch):
+    guard = DocGuard(rate=0.5, burst=1)
+    monkeypatch.setitem(resilience._guards, ("https://example.test", "doc_loop"), guard)
+    session = _ScriptedSession([_Resp(payload={"records": []})])
+    monkeypatch.setattr(grist_client, "get_http_session", lambda: session)
+    monkeypatch.setattr(grist_client.time, "sleep", lambda _: pytest.fail("slept on the event loop"))
+    client = GristClient("https://example.test", "doc_loop", "token")
+
+    async def handler():
+        client.get_records("Users")
+        with pytest.raises(GristUnavailableError):
+            client.get_records("Users")
+
+    asyncio.run(handler())
+    assert session.calls == ["GET"]
+
+
+def test_uncached_reads_fail_fast_when_breaker_is_open(monkeypatch):
+    guard = DocGuard(failure_threshold=1)
+    monkeypatch.setitem(resilience._guards, ("https://example.test", "doc_breaker_plain"), guard)
+    session = _ScriptedSession([requests.ConnectionError()])
+    monkeypatch.setattr(grist_client, "get_http_session", lambda: session)
+    client = GristClient("https://example.test", "doc_breaker_plain", "token")
+
+    with pytest.raises(requests.ConnectionError):
+        client.get_records("Users")
+    with pytest.raises(GristUnavailableError):
+        client.get_records("Users")
+    assert session.calls == ["GET"]
+
+
+def test_error_handler_answers_callback_with_retry_message():
+    query = SimpleNamespace(answer=AsyncMock())
+    update = SimpleNamespace(callback_query=query, effective_message=None)
+    context = SimpleNamespace(error=GristUnavailableError(12))
+
+    asyncio.run(pulse_main.error_handler(update, context))
+
+    query.answer.assert_awaited_once_with("Grist is busy right now. Please try again in about 12 seconds.", show_alert=True)
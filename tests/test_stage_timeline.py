@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from pulse.data.production_repo import ProductionRepo
+from pulse.data.stage_timeline import StageTimelineIndex
+from pulse.integrations import production
+from pulse.testing.benchmark import SMALL_SCALE, build_bench_data
+from pulse.testing.grist_emulator import GristEmulator
+
+
+def _history(*entries):
+    return [
+        {"id": pos, "fields": {"entity_type": kind, "batch_id": 7, "entity_id": row_id, "new_status": status, "timestamp": ts}}
+        for pos, (kind, row_id, status, ts) in enumerate(entries, start=1)
+    ]
+
+
+def test_timeline_keeps_first_entry_per_stage_in_timestamp_order():
+    index = StageTimelineIndex(
+        _history(
+            ("MS", 1, "In Bending", "2026-01-03T09:00:00"),
+            ("MS", 1, "Cutting Pending", "2026-01-01T09:00:00"),
+            ("MS", 1, "Bending Pending", "2026-01-02T09:00:00"),
+            ("MS", 1, "Done", "2026-01-04T09:00:00"),
+            ("MS", 1, "Completed", "2026-01-05T09:00:00"),
+            ("Master", 1, "Cutting Pending", "2025-12-01T09:00:00"),
+        )
+    )
+
+    timeline = index.row(7, 1)
+    assert timeline.started("cutting") == "2026-01-01T09:00:00"
+    assert timeline.completed("Cutting", "Bending") == "2026-01-02T09:00:00"
+    assert timeline.completed("Bending") == "2026-01-04T09:00:00"
+    assert index.row(7, 2).started("Cutting") is None
+    assert len(index.timestamps(7)) == 5
+
+
+def test_batch_summary_folds_history_once_until_it_changes():
+    emulator = GristEmulator()
+    data = build_bench_data(SMALL_SCALE)
+    batch_id = data.targets["summary_batch_id"]
+    batch_no = data.targets["summary_batch_no"]
+    with emulator.activate():
+        repo = ProductionRepo()
+        emulator.load_fixture(data.costing, repo.costing_client.doc_id)
+        emulator.load_fixture(data.pulse, repo.pulse_client.doc_id)
+
+        first = production._build_ms_batch_summary_text(repo, batch_id, batch_no)
+        assert "Timeline: " in first
+        emulator.reset_calls()
+        assert production._build_ms_batch_summary_text(repo, batch_id, batch_no) == first
+        assert emulator.call_count("GET", table="BatchStatusHistory") == 0
+
+        row = repo.list_ms_rows_for_batch(batch_id)[0]
+        current_stage = row["fields"]["current_stage_name"]
+        repo.costing_client.add_records(
+            "BatchStatusHistory",
+            [
+                {
+                    "entity_type": "MS",
+                    "batch_id": batch_id,
+                    "entity_id": row["id"],
+                    "new_status": f"{current_stage} Pending",
+                    "timestamp": "2000-01-01T00:00:00",
+                }
+            ],
+        )
+        assert repo.stage_timelines.row(batch_id, row["id"]).started(current_stage) == "2000-01-01T00:00:00"
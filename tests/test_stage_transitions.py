@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from pulse.data.production_repo import ProductionRepo
+from pulse.integrations import production
+from pulse.testing.benchmark import SMALL_SCALE, build_bench_data
+from pulse.testing.grist_emulator import GristEmulator
+
+
+def _load(emulator, data):
+    repo = ProductionRepo()
+    emulator.load_fixture(data.costing, repo.costing_client.doc_id)
+    emulator.load_fixture(data.pulse, repo.pulse_client.doc_id)
+    return repo
+
+
+def test_stage_done_on_many_rows_writes_once_and_notifies_once_per_group():
+    emulator = GristEmulator()
+    data = build_bench_data(SMALL_SCALE)
+    actor = data.targets["cutting"]
+    batch_id = data.targets["done_batch_id"]
+    with emulator.activate():
+        repo = _load(emulator, data)
+        row_ids = [
+            row["id"]
+            for row in production._rows_for_batch_and_role(repo, batch_id, actor["role"])
+            if production._plan_ms_stage_done(repo, row["id"], actor["costing_ref"], "")["action"] == "handoff"
+        ]
+        assert len(row_ids) > 1
+        context = SimpleNamespace(bot=SimpleNamespace(), user_data={"user": {"user_id": actor["user_id"]}})
+        notify = AsyncMock()
+        emulator.reset_calls()
+
+        with patch("pulse.integrations.production._notify_event", new=notify):
+            done = asyncio.run(production._mark_ms_rows_stage_done(repo, context, row_ids, actor["costing_ref"]))
+
+        assert done == len(row_ids)
+        assert emulator.call_count("PATCH", table="ProductBatchMS") == 1
+        assert emulator.call_count("PATCH", table="ProductBatchMaster") <= 1
+        statuses = {repo.get_ms_row_by_id(row_id)["fields"]["current_status"] for row_id in row_ids}
+        assert statuses == {production._MS_PENDING_CONFIRMATION}
+        handoffs = [call.args[2] for call in notify.await_args_list if "Stage Confirmation Required" in call.args[2]]
+        assert len(handoffs) == 1
+        assert f"Stage Confirmation Required ({len(row_ids)} rows)" in handoffs[0]
+
+        assert repo.flush_status_history()
+        history = repo.costing_client.get_records("BatchStatusHistory")
+        done_history = [
+            row
+            for row in history
+            if row["fields"]["entity_id"] in row_ids and row["fields"]["remarks"].startswith("Current stage marked done")
+        ]
+        assert len(done_history) == len(row_ids)
+
+
+def test_bulk_hold_patches_selected_rows_together():
+    emulator = GristEmulator()
+    data = build_bench_data(SMALL_SCALE)
+    actor = data.targets["cutting"]
+    batch_id = data.targets["done_batch_id"]
+    with emulator.activate():
+        repo = _load(emulator, data)
+        row_ids = [row["id"] for row in production._rows_for_batch_and_role(repo, batch_id, actor["role"])][:3]
+        context = SimpleNamespace(
+            bot=SimpleNamespace(),
+            user_data={
+                "user": {"user_id": actor["user_id"]},
+                "menu_state": production.MY_MS_JOBS_BULK_ACTION_STATE,
+                "my_ms_jobs_bulk_action": {"selected_ids": row_ids, "selected_rows": [{"id": row_id} for row_id in row_ids]},
+            },
+        )
+        notify = AsyncMock()
+        emulator.reset_calls()
+
+        with (
+            patch("pulse.integrations.production._notify_event", new=notify),
+            patch("pulse.integrations.production._reply", new=AsyncMock()),
+            patch("pulse.integrations.production._show_my_ms_jobs_page", new=AsyncMock()),
+        ):
+            asyncio.run(production.handle_production_state_text(SimpleNamespace(), context, production._MS_BULK_ACTION_HOLD))
+
+        assert emulator.call_count("PATCH", table="ProductBatchMS") == 1
+        assert all(repo.get_ms_row_by_id(row_id)["fields"]["current_status"] == "On Hold" for row_id in row_ids)
+        assert notify.await_count == 1
+        assert "Parts:\n1. " in notify.await_args.args[2]
+
+
+def test_failed_hand_off_notification_still_counts_rows_and_recomputes_status():
+    emulator = GristEmulator()
+    data = build_bench_data(SMALL_SCALE)
+    actor = data.targets["cutting"]
+    batch_id = data.targets["done_batch_id"]
+    with emulator.activate():
+        repo = _load(emulator, data)
+        row_ids = [
+            row["id"]
+            for row in production._rows_for_batch_and_role(repo, batch_id, actor["role"])
+            if production._plan_ms_stage_done(repo, row["id"], actor["costing_ref"], "")["action"] == "handoff"
+        ]
+        context = SimpleNamespace(bot=SimpleNamespace(), user_data={"user": {"user_id": actor["user_id"]}})
+        recalculate = MagicMock(wraps=production.recalculate_master_overall_status)
+
+        with (
+            patch("pulse.integrations.production._notify_event", new=AsyncMock(side_effect=RuntimeError("telegram down"))),
+            patch("pulse.integrations.production.recalculate_master_overall_status", new=recalculate),
+        ):
+            done = asyncio.run(production._mark_ms_rows_stage_done(repo, context, row_ids, actor["costing_ref"]))
+
+        assert done == len(row_ids)
+        recalculate.assert_called_once_with(repo, batch_id, actor["costing_ref"])
+        assert all(repo.get_ms_row_by_id(row_id)["fields"]["current_status"] == production._MS_PENDING_CONFIRMATION for row_id in row_ids)
@@ -34,17 +34,22 @@ def test_grist_client_allows_writes_for_test_doc(monkeypatch):
     called = {"post": False}
 
     class _Resp:
+        status_code = 200
+        headers = {}
+        content = b"{}"
+
         def raise_for_status(self):
             return None
 
         def json(self):
             return {}
 
-    def _fake_post(*args, **kwargs):
-        called["post"] = True
-        return _Resp()
+    class _Session:
+        def request(self, method, *args, **kwargs):
+            called["post"] = method == "POST"
+            return _Resp()
 
-    monkeypatch.setattr("pulse.core.grist_client.requests.post", _fake_post)
+    monkeypatch.setattr("pulse.core.grist_client.get_http_session", lambda: _Session())
     client = GristClient("https://example.test", "doc_test", "token")
     client.add_records("SomeTable", [{"a": 1}])
     assert called["post"] is True
@@ -220,9 +225,10 @@ def test_batch_created_notification_sends_cta_only_to_approver(monkeypatch):
     ]
 
     monkeypatch.setattr(
-        "pulse.notifications.dispatcher.get_subscribers",
-        lambda event_type, context=None: recipients,
+        "pulse.notifications.dispatcher.get_subscribers_async",
+        AsyncMock(return_value=recipients),
     )
+    monkeypatch.setattr("pulse.notifications.dispatcher.log_event_async", AsyncMock())
 
     batch_id = 9
     asyncio.run(
@@ -253,8 +259,8 @@ def test_create_batch_submit_sends_single_creator_confirmation(monkeypatch):
         def get_costing_user_ref_by_user_id(self, user_id):
             return 77
 
-        def get_existing_batch_numbers(self):
-            return []
+        def get_max_batch_sequence(self, month_key):
+            return 0
 
         def create_master_batch(self, fields):
             return 501
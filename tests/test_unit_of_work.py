@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pulse.core.grist_client import GristClient
+from pulse.core.unit_of_work import unit_of_work
+from pulse.data.production_repo import ProductionRepo
+from pulse.testing.grist_emulator import GristEmulator, seed_default_docs
+
+
+def _in_other_thread(fn):
+    # A plain thread has no unit of work, like another handler or a job step.
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(fn).result()
+
+
+def test_reads_inside_a_unit_hit_grist_once_per_table():
+    emulator = GristEmulator()
+    with emulator.activate():
+        repo = ProductionRepo()
+        seed_default_docs(emulator, repo.costing_client.doc_id, repo.pulse_client.doc_id)
+        client = GristClient(repo.costing_client.server, repo.costing_client.doc_id, "key")
+        emulator.reset_calls()
+
+        with unit_of_work():
+            for _ in range(5):
+                assert client.get_records("ProcessStage")
+            client.patch_record("ProcessStage", 1, {"seq_no": 9})
+            assert client.get_records("ProcessStage")[0]["fields"]["seq_no"] == 9
+        client.get_records("ProcessStage")
+
+        assert emulator.call_count("GET", table="ProcessStage") == 3
+
+
+def test_batch_patches_are_visible_at_once_and_sent_together():
+    emulator = GristEmulator()
+    with emulator.activate():
+        repo = ProductionRepo()
+        seed_default_docs(emulator, repo.costing_client.doc_id, repo.pulse_client.doc_id)
+        emulator.reset_calls()
+
+        with unit_of_work():
+            repo.update_ms(1, {"status": "Done"})
+            repo.update_ms(2, {"status": "Done"})
+            repo.update_ms(1, {"current_status": "Done"})
+            repo.update_ms(2, {"current_status": "Done"})
+            assert repo.get_ms_row_by_id(1)["fields"]["status"] == "Done"
+            assert repo.count_child_statuses(1).get("Done") == 2
+            assert emulator.call_count("PATCH") == 0
+            assert emulator.call_count("POST", endpoint="sql") == 0
+
+        assert emulator.call_count("PATCH", table="ProductBatchMS") == 1
+        fresh = ProductionRepo().costing_client.get_records("ProductBatchMS", filter={"id": [1]})
+        assert fresh[0]["fields"]["current_status"] == "Done"
+
+
+def test_server_side_reads_flush_pending_patches_first():
+    emulator = GristEmulator()
+    with emulator.activate():
+        repo = ProductionRepo()
+        seed_default_docs(emulator, repo.costing_client.doc_id, repo.pulse_client.doc_id)
+
+        with unit_of_work():
+            repo.update_ms(2, {"status": "On Hold"})
+            rows = repo.costing_client.get_records("ProductBatchMS", filter={"status": ["On Hold"]})
+            assert [row["id"] for row in rows] == [2]
+
+
+def test_failed_flush_keeps_rows_queued_and_never_masks_the_handler_error():
+    emulator = GristEmulator()
+    with emulator.activate():
+        repo = ProductionRepo()
+        seed_default_docs(emulator, repo.costing_client.doc_id, repo.pulse_client.doc_id)
+
+        with unit_of_work() as unit:
+            repo.update_ms(1, {"status": "On Hold"})
+            emulator.fail_next(400, method="PATCH", table="ProductBatchMS")
+            with pytest.raises(Exception):
+                unit.flush()
+            assert unit.has_pending(repo.costing_client.server, repo.costing_client.doc_id, "ProductBatchMS")
+            unit.flush()
+        fresh = ProductionRepo().costing_client.get_records("ProductBatchMS", filter={"id": [1]})
+        assert fresh[0]["fields"]["status"] == "On Hold"
+
+        with pytest.raises(KeyError):
+            with unit_of_work():
+                repo.update_ms(2, {"status": "On Hold"})
+                emulator.fail_next(400, method="PATCH", table="ProductBatchMS")
+                raise KeyError("handler failed")
+
+
+def test_unsent_patches_stay_private_to_their_unit():
+    emulator = GristEmulator()
+    with emulator.activate():
+        repo = ProductionRepo()
+        seed_default_docs(emulator, repo.costing_client.doc_id, repo.pulse_client.doc_id)
+        repo.get_ms_row_by_id(1)
+
+        def shared_status():
+            return ProductionRepo().get_ms_row_by_id(1)["fields"]["status"]
+
+        before = shared_status()
+        with unit_of_work() as unit:
+            repo.update_ms(1, {"status": "On Hold"})
+            assert repo.get_ms_row_by_id(1)["fields"]["status"] == "On Hold"
+            assert _in_other_thread(shared_status) == before
+            emulator.fail_next(400, method="PATCH", table="ProductBatchMS")
+            with pytest.raises(Exception):
+                unit.flush()
+            assert _in_other_thread(shared_status) == before
+            unit.flush()
+            assert _in_other_thread(shared_status) == "On Hold"
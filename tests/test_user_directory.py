@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from pulse.data.production_repo import ProductionRepo
+from pulse.data.user_directory import PulseUserDirectory
+from pulse.testing.grist_emulator import GristEmulator, seed_default_docs
+
+
+def test_directory_merges_primary_and_assigned_roles():
+    directory = PulseUserDirectory(
+        users=[
+            {"id": 1, "fields": {"User_ID": "U1", "Telegram_ID": "101", "Role": 1, "Active": True}},
+            {"id": 2, "fields": {"User_ID": "U2", "Telegram_ID": "102", "Role": 2, "Active": True}},
+            {"id": 3, "fields": {"User_ID": "", "Telegram_ID": "103", "Role": 2, "Active": True}},
+            {"id": 4, "fields": {"User_ID": "U4", "Telegram_ID": "104", "Role": 2, "Active": False}},
+        ],
+        roles=[
+            {"id": 1, "fields": {"Role_ID": "R01", "Role_Name": "Manager"}},
+            {"id": 2, "fields": {"Role_ID": "R02", "Role_Name": "Supervisor"}},
+        ],
+        assignments=[
+            {"id": 1, "fields": {"User": 1, "Role": 2, "Active": True}},
+            {"id": 2, "fields": {"User": "U2", "Role": 1, "Active": True}},
+            {"id": 3, "fields": {"User": 2, "Role": 2, "Active": False}},
+        ],
+    )
+
+    assert directory.role_names_for("U1") == ["Manager", "Supervisor"]
+    assert directory.role_names_for("102") == ["Supervisor", "Manager"]
+    assert [user["id"] for user in directory.active_users_with_role_names(["Supervisor"])] == [1, 2]
+    assert [user["id"] for user in directory.users_with_role_refs([1])] == [1]
+    assert directory.active_primary_role_telegrams(["Supervisor"]) == ["102", "103"]
+    assert directory.role_ref_by_code["R02"] == 2
+
+
+def test_role_lookups_share_one_load_and_refresh_only_written_tables():
+    emulator = GristEmulator()
+    with emulator.activate():
+        repo = ProductionRepo()
+        seed_default_docs(emulator, repo.costing_client.doc_id, repo.pulse_client.doc_id)
+        emulator.reset_calls()
+
+        for _ in range(20):
+            assert [user["id"] for user in repo.get_active_users_by_role_names(["Production_Manager"])] == [1]
+            assert repo.get_costing_user_ref_by_user_id("U_UNKNOWN") is None
+        assert emulator.call_count("GET") == 4
+
+        repo.pulse_client.add_records("UserRoleAssignment", [{"User": 2, "Role": 1, "Active": True}])
+        assert repo.get_role_names_by_user_id("U_SUP_CUT") == ["Cutting_Supervisor", "Production_Manager"]
+        assert emulator.call_count("GET", table="UserRoleAssignment") == 2
+        assert emulator.call_count("GET", table="Users") == 2
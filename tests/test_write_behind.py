@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import time
+
+import requests
+
+from pulse.core import logger
+from pulse.core.write_behind import WriteBehindQueue
+
+
+class _FakeClient:
+    def __init__(self, failures: list[Exception] | None = None, reject=None):
+        self.calls: list[list[dict]] = []
+        self.failures = list(failures or [])
+        self.reject = reject
+
+    def add_records(self, table: str, records: list[dict]):
+        if self.failures:
+            raise self.failures.pop(0)
+        if self.reject and any(self.reject(row) for row in records):
+            raise ValueError("rejected")
+        self.calls.append(list(records))
+        return {"records": [{"id": pos} for pos, _ in enumerate(records)]}
+
+
+def _http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+def test_rows_are_sent_in_bulk_once_batch_size_is_reached():
+    client = _FakeClient()
+    queue = WriteBehindQueue(client, "Activity_Log", batch_size=3, flush_interval=60)
+    for pos in range(3):
+        queue.enqueue({"Action": f"a{pos}"})
+
+    deadline = time.monotonic() + 2
+    while not client.calls and time.monotonic() < deadline:
+        time.sleep(0.005)
+    queue.close()
+
+    assert client.calls == [[{"Action": "a0"}, {"Action": "a1"}, {"Action": "a2"}]]
+
+
+def test_transient_failures_keep_rows_queued_in_order():
+    client = _FakeClient(failures=[requests.ConnectionError(), _http_error(503)])
+    queue = WriteBehindQueue(client, "BatchStatusHistory", batch_size=100, flush_interval=60)
+    queue.enqueue({"entity_id": 1})
+    queue.enqueue({"entity_id": 2})
+
+    assert queue.flush() is False
+    queue.enqueue({"entity_id": 3})
+    assert queue.flush() is False
+    assert queue.pending() == 3
+    assert queue.flush() is True
+    assert client.calls == [[{"entity_id": 1}, {"entity_id": 2}, {"entity_id": 3}]]
+    queue.close()
+
+
+def test_rejected_row_does_not_block_the_rest_of_the_batch():
+    client = _FakeClient(reject=lambda row: row.get("entity_id") == 2)
+    queue = WriteBehindQueue(client, "BatchStatusHistory", batch_size=100, flush_interval=60)
+    for entity_id in (1, 2, 3):
+        queue.enqueue({"entity_id": entity_id})
+
+    assert queue.flush() is True
+    assert client.calls == [[{"entity_id": 1}], [{"entity_id": 3}]]
+    assert queue.dropped == 1
+    queue.close()
+
+
+def test_unsent_rows_are_spooled_on_close_and_replayed(tmp_path):
+    spool = tmp_path / "history.jsonl"
+    down = _FakeClient(failures=[requests.ConnectionError()] * 10)
+    queue = WriteBehindQueue(down, "BatchStatusHistory", flush_interval=60, spool_path=spool)
+    queue.enqueue({"entity_id": 7})
+    queue.close()
+    assert spool.exists()
+
+    up = _FakeClient()
+    replay = WriteBehindQueue(up, "BatchStatusHistory", flush_interval=60, spool_path=spool)
+    assert not spool.exists()
+    assert replay.flush() is True
+    assert up.calls == [[{"entity_id": 7}]]
+    replay.close()
+
+
+def test_activity_rows_resolve_user_refs_with_one_users_lookup(monkeypatch):
+    class _UsersClient:
+        def __init__(self):
+            self.reads = 0
+
+        def get_records(self, table: str):
+            self.reads += 1
+            return [{"id": 5, "fields": {"User_ID": "U_PM"}}, {"id": 6, "fields": {"User_ID": "U_SUP"}}]
+
+    users = _UsersClient()
+    monkeypatch.setattr(logger, "client", users)
+    rows = logger._resolve_user_refs(
+        [
+            logger._activity_payload("U_PM", "notification_sent:x", "Success"),
+            logger._activity_payload(" U_SUP ", "notification_sent:x", "Success"),
+            logger._activity_payload(9, "notification_sent:x", "Success"),
+            logger._activity_payload("U_GONE", "notification_failed:x", "boom"),
+        ]
+    )
+
+    assert [row["User"] for row in rows] == [5, 6, 9, None]
+    assert users.reads == 1
+
+
+def test_loaded_spool_survives_a_crash_before_the_first_flush(tmp_path):
+    spool = tmp_path / "history.jsonl"
+    spool.write_text('{"entity_id": 7}\n', encoding="utf-8")
+
+    # Loaded, then the process dies before anything is flushed.
+    WriteBehindQueue(_FakeClient(), "BatchStatusHistory", flush_interval=60, spool_path=spool)
+    spool.write_text('{"entity_id": 8}\n', encoding="utf-8")
+
+    up = _FakeClient()
+    replay = WriteBehindQueue(up, "BatchStatusHistory", flush_interval=60, spool_path=spool)
+    assert list(tmp_path.iterdir()) == [tmp_path / "history.jsonl.loading"]
+    assert replay.flush() is True
+    assert up.calls == [[{"entity_id": 7}, {"entity_id": 8}]]
+    assert list(tmp_path.iterdir()) == []
+    replay.close()